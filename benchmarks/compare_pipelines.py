@@ -0,0 +1,212 @@
+"""
+Pipeline Benchmark
+==================
+
+Runs the train and predict phases of the claude, gemini and gpt pipelines on
+shared-data/data.csv and on synthetically upsampled copies, and reports fit
+time, predict throughput, peak memory and macro-F1 side by side.
+
+Protocol (identical for every pipeline):
+- 80/20 stratified split with random_state=42 on the original data.
+- The training part is upsampled by drawing rows with replacement per class
+  (class ratios are preserved exactly); the test part is tiled by the same
+  factor for the predict throughput measurement.
+- Macro-F1 is always computed on the original (non-upsampled) test split.
+- Every (pipeline, scale) case runs in a fresh process, so peak RSS is not
+  polluted by earlier cases.
+
+Usage:
+    python benchmarks/compare_pipelines.py                     # scales 1 10 100 1000
+    python benchmarks/compare_pipelines.py --scales 1 10 --pipelines claude gpt
+"""
+
+import argparse
+import importlib.util
+import json
+import multiprocessing
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+DATA_PATH = PROJECT_ROOT / "shared-data" / "data.csv"
+OUTPUT_PATH = Path(__file__).resolve().parent / "pipeline_benchmark.json"
+
+PIPELINES = ["claude", "gemini", "gpt"]
+DEFAULT_SCALES = [1, 10, 100, 1000]
+RANDOM_STATE = 42
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_mb():
+    """Peak resident set size of the current process in MB (None if unavailable)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def load_pipeline_module(name):
+    """Import <name>/dropout_prediction.py under a unique module name."""
+    pipeline_dir = PROJECT_ROOT / name
+    sys.path.insert(0, str(pipeline_dir))
+    spec = importlib.util.spec_from_file_location(f"{name}_pipeline",
+                                                  pipeline_dir / "dropout_prediction.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# ═══════════════════════════════════════════════════════════════
+# PIPELINE SPECS: fit(X, y) -> state, predict(state, X) -> labels
+# ═══════════════════════════════════════════════════════════════
+
+def fit_claude(module, X, y):
+    from sklearn.preprocessing import StandardScaler
+    feature_engineer = module.FeatureEngineer().fit(X)
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(feature_engineer.transform(X))
+    model = module.build_ensemble().fit(X_scaled, y)
+    return feature_engineer, scaler, model
+
+
+def predict_claude(state, X):
+    feature_engineer, scaler, model = state
+    return model.predict(scaler.transform(feature_engineer.transform(X)))
+
+
+def fit_gemini(module, X, y):
+    # Scaled numerics and integer codes for the nominal columns, as in gemini's pipeline
+    preprocessor = module.Preprocessor()
+    # Grid search is part of gemini's training cost; no fold cache for fair timings
+    search = module.make_search(cache_dir=None).fit(preprocessor.fit_transform(X), y)
+    return preprocessor, search.best_estimator_
+
+
+def predict_gemini(state, X):
+    preprocessor, model = state
+    return model.predict(preprocessor.transform(X))
+
+
+def fit_gpt(module, X, y):
+    return module.build_pipeline(X).fit(X, y)
+
+
+def predict_gpt(state, X):
+    return state.predict(X)
+
+
+SPECS = {
+    "claude": (fit_claude, predict_claude),
+    "gemini": (fit_gemini, predict_gemini),
+    "gpt": (fit_gpt, predict_gpt),
+}
+
+
+# ═══════════════════════════════════════════════════════════════
+# DATA
+# ═══════════════════════════════════════════════════════════════
+
+def upsample_stratified(X, y, factor, rng):
+    """Draw factor * n rows with replacement, keeping the per-class counts proportional."""
+    if factor == 1:
+        return X, y
+    index = np.concatenate([
+        rng.choice(np.flatnonzero(y == label), size=int((y == label).sum()) * factor, replace=True)
+        for label in np.unique(y)
+    ])
+    rng.shuffle(index)
+    return X.iloc[index].reset_index(drop=True), y[index]
+
+
+def load_split():
+    sys.path.insert(0, str(DATA_PATH.parent))
+    from data_loader import load_data, TARGET_COLUMN
+    from sklearn.model_selection import train_test_split
+
+    df = load_data(DATA_PATH)
+    X = df.drop(columns=[TARGET_COLUMN])
+    y = df[TARGET_COLUMN].cat.codes.to_numpy()
+    return train_test_split(X, y, test_size=0.2, random_state=RANDOM_STATE, stratify=y)
+
+
+def run_case(pipeline, scale):
+    """Train + predict one pipeline at one scale (runs in a fresh process)."""
+    from sklearn.metrics import f1_score
+
+    X_train, X_test, y_train, y_test = load_split()
+    rng = np.random.default_rng(RANDOM_STATE)
+    X_train_big, y_train_big = upsample_stratified(X_train, y_train, scale, rng)
+    X_test_big = X_test.iloc[np.arange(len(X_test) * scale) % len(X_test)]
+
+    module = load_pipeline_module(pipeline)
+    fit, predict = SPECS[pipeline]
+
+    start = time.perf_counter()
+    state = fit(module, X_train_big, y_train_big)
+    fit_time = time.perf_counter() - start
+    rss_fit = peak_rss_mb()
+
+    start = time.perf_counter()
+    predict(state, X_test_big)
+    predict_time = time.perf_counter() - start
+    rss_predict = peak_rss_mb()
+
+    macro_f1 = f1_score(y_test, predict(state, X_test), average="macro")
+
+    return {
+        "pipeline": pipeline,
+        "scale": scale,
+        "train_rows": len(X_train_big),
+        "predict_rows": len(X_test_big),
+        "fit_time_seconds": round(fit_time, 3),
+        "predict_rows_per_second": round(len(X_test_big) / predict_time, 1),
+        "peak_rss_fit_mb": rss_fit,
+        "peak_rss_predict_mb": rss_predict,
+        "macro_f1": round(float(macro_f1), 4),
+    }
+
+
+def print_table(results):
+    print(f"\n{'pipeline':<8} {'scale':>6} {'train rows':>11} {'fit (s)':>9} "
+          f"{'predict rows/s':>15} {'peak RSS (MB)':>14} {'macro F1':>9}")
+    for r in results:
+        rss = r["peak_rss_predict_mb"]
+        rss = f"{rss:>14.1f}" if rss is not None else f"{'n/a':>14}"
+        print(f"{r['pipeline']:<8} {r['scale']:>6} {r['train_rows']:>11,} {r['fit_time_seconds']:>9.2f} "
+              f"{r['predict_rows_per_second']:>15,.0f} {rss} {r['macro_f1']:>9.4f}")
+
+
+def run(pipelines, scales, output_path=OUTPUT_PATH):
+    results = []
+    context = multiprocessing.get_context("spawn")
+    for scale in scales:
+        for pipeline in pipelines:
+            print(f"Running {pipeline} at {scale}x ...", flush=True)
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                results.append(pool.submit(run_case, pipeline, scale).result())
+
+    print_table(results)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump({"protocol": {"split": "80/20 stratified", "random_state": RANDOM_STATE,
+                                "f1_on": "original test split"},
+                   "results": results}, f, indent=2)
+    print(f"\nResults written to {output_path}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pipelines", nargs="+", choices=PIPELINES, default=PIPELINES)
+    parser.add_argument("--scales", type=int, nargs="+", default=DEFAULT_SCALES,
+                        help="Upsampling factors of the training data")
+    parser.add_argument("--output", type=Path, default=OUTPUT_PATH)
+    args = parser.parse_args()
+    run(args.pipelines, args.scales, args.output)
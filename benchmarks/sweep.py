@@ -0,0 +1,333 @@
+"""
+Model Sweep
+===========
+
+Trains every candidate configuration of the three pipelines on the same
+80/20 split (stratified, random_state=42) and ranks them in one leaderboard
+by macro-F1, ties broken by fit time.
+
+Registered model specs (REGISTRY):
+- claude  FeatureEngineer + StandardScaler + RF/GB soft-voting ensemble, one
+          candidate per boosting backend ('exact', 'hist')
+- gemini  Preprocessor + RandomForest, one candidate per point of gemini's
+          search grid (the sweep replaces the grid search)
+- gpt     the default-RF Pipeline of build_pipeline
+
+Scheduling:
+- All candidates run in one process pool of cpus // threads_per_task
+  workers, longest expected fit first, so the CPU budget stays busy until
+  the end.
+- Every task gets threads_per_task threads in total. Nested n_jobs=-1
+  (VotingClassifier over a RandomForest with n_jobs=-1) would otherwise
+  start one thread per core at every level: meta-estimators are set to
+  n_jobs=1 and only the innermost estimators get the task's threads.
+  OpenMP/BLAS pools (HistGradientBoosting) are capped with threadpoolctl.
+- The split is loaded once in the parent and placed in one shared memory
+  block (train rows first, then test rows). Workers map the block and
+  build their DataFrames on top of it without copying or re-parsing.
+
+Usage:
+    python benchmarks/sweep.py                          # all specs, all cores
+    python benchmarks/sweep.py --cpus 8 --threads-per-task 2 --models claude gpt
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+from pathlib import Path
+
+import numpy as np
+
+from compare_pipelines import load_pipeline_module, load_split, peak_rss_mb, RANDOM_STATE
+
+OUTPUT_PATH = Path(__file__).resolve().parent / "sweep_leaderboard.json"
+ALIGNMENT = 64
+
+
+# ═══════════════════════════════════════════════════════════════
+# MODEL SPECS
+# ═══════════════════════════════════════════════════════════════
+
+class ModelSpec:
+    """
+    One pipeline variant of the sweep.
+
+    candidates(module) -> list of parameter dicts
+    build(module, X, params) -> unfitted estimator taking the raw feature DataFrame
+    cost(params) -> relative fit time, only used to order the queue
+    """
+
+    def __init__(self, name, pipeline, candidates, build, cost=lambda params: 1.0):
+        self.name = name
+        self.pipeline = pipeline
+        self.candidates = candidates
+        self.build = build
+        self.cost = cost
+
+
+REGISTRY = {}
+
+
+def register(spec):
+    REGISTRY[spec.name] = spec
+    return spec
+
+
+def _build_claude(module, X, params):
+    from sklearn.pipeline import make_pipeline
+    from sklearn.preprocessing import StandardScaler
+    return make_pipeline(module.FeatureEngineer(), StandardScaler(),
+                         module.build_ensemble(params["boosting"]))
+
+
+def _gemini_candidates(module):
+    from sklearn.model_selection import ParameterGrid
+    return list(ParameterGrid(module.make_search(cache_dir=None).param_grid))
+
+
+def _build_gemini(module, X, params):
+    from sklearn.base import clone
+    from sklearn.pipeline import make_pipeline
+    forest = clone(module.make_search(cache_dir=None).estimator).set_params(**params)
+    return make_pipeline(module.Preprocessor(), forest)
+
+
+def _build_gpt(module, X, params):
+    pipeline = module.build_pipeline(X)
+    return pipeline.set_params(**{f"model__{key}": value for key, value in params.items()})
+
+
+register(ModelSpec(
+    "claude", "claude",
+    candidates=lambda module: [{"boosting": backend} for backend in module.BOOSTING_BACKENDS],
+    build=_build_claude,
+    # Single-threaded exact GradientBoosting dominates (~20 s vs ~3 s for 'hist')
+    cost=lambda params: 20.0 if params["boosting"] == "exact" else 3.0,
+))
+register(ModelSpec(
+    "gemini", "gemini",
+    candidates=_gemini_candidates,
+    build=_build_gemini,
+    cost=lambda params: params["n_estimators"] / 100 * (1.3 if params["max_depth"] is None else 1.0),
+))
+register(ModelSpec(
+    "gpt", "gpt",
+    candidates=lambda module: [{}],
+    build=_build_gpt,
+))
+
+
+# ═══════════════════════════════════════════════════════════════
+# THREAD BUDGET
+# ═══════════════════════════════════════════════════════════════
+
+def _has_sub_estimators(estimator):
+    """True for meta-estimators (VotingClassifier, Pipeline, ColumnTransformer, ...)."""
+    from sklearn.base import BaseEstimator
+    for value in estimator.get_params(deep=False).values():
+        if isinstance(value, BaseEstimator):
+            return True
+        if isinstance(value, (list, tuple)) and any(
+                isinstance(item, tuple) and any(isinstance(v, BaseEstimator) for v in item)
+                for item in value):
+            return True
+    return False
+
+
+def limit_n_jobs(estimator, threads):
+    """
+    Give the thread budget to the innermost estimators only.
+
+    Every n_jobs parameter of a meta-estimator is set to 1, every other
+    n_jobs to `threads`, so nested parallelism cannot multiply.
+    """
+    params = estimator.get_params(deep=True)
+    updates = {}
+    for key in params:
+        if key != "n_jobs" and not key.endswith("__n_jobs"):
+            continue
+        owner = estimator if key == "n_jobs" else params[key[:-len("__n_jobs")]]
+        updates[key] = 1 if _has_sub_estimators(owner) else threads
+    estimator.set_params(**updates)
+    return updates
+
+
+# ═══════════════════════════════════════════════════════════════
+# SHARED DATA
+# ═══════════════════════════════════════════════════════════════
+
+def share_split():
+    """
+    Copy the split into one shared memory block.
+
+    Returns (block, layout); layout is a small picklable description of the
+    arrays in the block that workers use to attach.
+    """
+    X_train, X_test, y_train, y_test = load_split()
+    arrays = {f"X:{col}": np.concatenate([X_train[col].to_numpy(), X_test[col].to_numpy()])
+              for col in X_train.columns}
+    arrays["y"] = np.concatenate([y_train, y_test])
+
+    entries, offset = [], 0
+    for name, values in arrays.items():
+        entries.append((name, values.dtype.str, offset))
+        offset += -(-values.nbytes // ALIGNMENT) * ALIGNMENT
+    block = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+    for (name, dtype, start), values in zip(entries, arrays.values()):
+        np.ndarray(values.shape, dtype, buffer=block.buf, offset=start)[:] = values
+    layout = {"name": block.name, "n_rows": len(arrays["y"]), "n_train": len(y_train),
+              "entries": entries}
+    return block, layout
+
+
+_SHARED = {}
+
+
+def _attach(layout):
+    """Pool initializer: map the shared block and build read-only train/test views."""
+    import pandas as pd
+
+    block = shared_memory.SharedMemory(name=layout["name"])
+    n_rows, n_train = layout["n_rows"], layout["n_train"]
+    columns = {}
+    for name, dtype, offset in layout["entries"]:
+        values = np.ndarray(n_rows, dtype, buffer=block.buf, offset=offset)
+        values.flags.writeable = False
+        columns[name] = values
+    y = columns.pop("y")
+    X = pd.DataFrame({name[2:]: values for name, values in columns.items()}, copy=False)
+    _SHARED.update(block=block, modules={},
+                   X_train=X.iloc[:n_train], X_test=X.iloc[n_train:],
+                   y_train=y[:n_train], y_test=y[n_train:])
+
+
+def _module(pipeline):
+    modules = _SHARED["modules"]
+    if pipeline not in modules:
+        modules[pipeline] = load_pipeline_module(pipeline)
+    return modules[pipeline]
+
+
+# ═══════════════════════════════════════════════════════════════
+# TASKS
+# ═══════════════════════════════════════════════════════════════
+
+def run_candidate(spec_name, params, threads):
+    """Fit and score one candidate (runs in a pool worker)."""
+    from sklearn.metrics import balanced_accuracy_score, f1_score
+    from threadpoolctl import threadpool_limits
+
+    spec = REGISTRY[spec_name]
+    # Import first: threadpool_limits only caps libraries that are already loaded
+    module = _module(spec.pipeline)
+    X_train, X_test = _SHARED["X_train"], _SHARED["X_test"]
+    y_train, y_test = _SHARED["y_train"], _SHARED["y_test"]
+
+    with threadpool_limits(limits=threads):
+        estimator = spec.build(module, X_train, params)
+        limit_n_jobs(estimator, threads)
+        start = time.perf_counter()
+        estimator.fit(X_train, y_train)
+        fit_time = time.perf_counter() - start
+        start = time.perf_counter()
+        y_pred = estimator.predict(X_test)
+        predict_time = time.perf_counter() - start
+
+    return {
+        "model": spec_name,
+        "params": dict(params),
+        "macro_f1": round(float(f1_score(y_test, y_pred, average="macro")), 4),
+        "balanced_accuracy": round(float(balanced_accuracy_score(y_test, y_pred)), 4),
+        "fit_time_seconds": round(fit_time, 3),
+        "predict_time_seconds": round(predict_time, 4),
+        "threads": threads,
+        "worker_pid": os.getpid(),
+        "worker_peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def rank(results):
+    """Leaderboard order (macro-F1 desc, fit time asc) plus a Pareto flag."""
+    board = sorted(results, key=lambda r: (-r["macro_f1"], r["fit_time_seconds"]))
+    best_time = float("inf")
+    for position, entry in enumerate(board, 1):
+        entry["rank"] = position
+        # Sorted by F1: an entry is on the F1/fit-time front if it is faster than all better ones
+        entry["pareto"] = entry["fit_time_seconds"] < best_time
+        best_time = min(best_time, entry["fit_time_seconds"])
+    return board
+
+
+def print_leaderboard(board):
+    print(f"\n{'rank':>4}  {'model':<7} {'params':<52} {'macro F1':>9} {'fit (s)':>8} {'threads':>7}")
+    for entry in board:
+        params = ", ".join(f"{k}={v}" for k, v in entry["params"].items()) or "default"
+        marker = " *" if entry["pareto"] else ""
+        print(f"{entry['rank']:>4}  {entry['model']:<7} {params:<52} {entry['macro_f1']:>9.4f} "
+              f"{entry['fit_time_seconds']:>8.2f} {entry['threads']:>7}{marker}")
+    print("(* = no other candidate is both better and faster)")
+
+
+def run(models, cpus, threads_per_task, output_path=OUTPUT_PATH):
+    threads = max(1, min(threads_per_task, cpus))
+    workers = max(1, cpus // threads)
+
+    tasks = []
+    for name in models:
+        spec = REGISTRY[name]
+        module = load_pipeline_module(spec.pipeline)
+        tasks.extend((spec.cost(params), name, params) for params in spec.candidates(module))
+    # Longest expected fit first (LPT): short tasks fill the gaps at the end
+    tasks.sort(key=lambda task: -task[0])
+    print(f"{len(tasks)} candidates on {workers} worker(s) x {threads} thread(s) "
+          f"(CPU budget {cpus})", flush=True)
+
+    block, layout = share_split()
+    start = time.perf_counter()
+    results = []
+    try:
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                 initializer=_attach, initargs=(layout,)) as pool:
+            futures = {pool.submit(run_candidate, name, params, threads): name
+                       for _, name, params in tasks}
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                print(f"  {result['model']:<7} {result['params']} -> macro F1 {result['macro_f1']:.4f} "
+                      f"in {result['fit_time_seconds']:.2f}s", flush=True)
+    finally:
+        block.close()
+        block.unlink()
+    wall_time = time.perf_counter() - start
+
+    board = rank(results)
+    print_leaderboard(board)
+    total_fit = sum(r["fit_time_seconds"] for r in results)
+    print(f"\nWall time {wall_time:.1f}s for {total_fit:.1f}s of fits "
+          f"({total_fit / wall_time:.1f}x parallel on a budget of {cpus} CPUs)")
+
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump({"protocol": {"split": "80/20 stratified", "random_state": RANDOM_STATE,
+                                "ranking": "macro_f1 desc, fit_time asc"},
+                   "budget": {"cpus": cpus, "workers": workers, "threads_per_task": threads},
+                   "wall_time_seconds": round(wall_time, 2),
+                   "leaderboard": board}, f, indent=2)
+    print(f"Leaderboard written to {output_path}")
+    return board
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--models", nargs="+", choices=list(REGISTRY), default=list(REGISTRY))
+    parser.add_argument("--cpus", type=int, default=os.cpu_count(),
+                        help="CPU budget of the whole sweep")
+    parser.add_argument("--threads-per-task", type=int, default=1,
+                        help="Threads of one candidate fit (workers = cpus // threads)")
+    parser.add_argument("--output", type=Path, default=OUTPUT_PATH)
+    args = parser.parse_args()
+    run(args.models, args.cpus, args.threads_per_task, args.output)
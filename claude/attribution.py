@@ -0,0 +1,388 @@
+"""
+Feature Attribution
+===================
+
+Why is a student flagged? Two views on the fitted soft-voting ensemble:
+
+Global - permutation importance:
+    The drop in macro-F1 when one column of the test set is shuffled.
+    Columns are processed in parallel (threads, so the model and the
+    baseline predictions are shared, not pickled). The baseline predictions
+    act as a prediction cache: a shuffled column only changes the rows whose
+    value actually changed (many columns are binary or categorical), so only
+    those rows are re-predicted - all repeats of a column in one call.
+    Predictions apply the model's decision rule (calibration.py), so the
+    baseline is the headline macro-F1 of result.json.
+
+Local - per-student contributions on the tree structure:
+    Every tree node gets its expected output, the cover-weighted mean of
+    the leaves below it (TreeSHAP's E[f(x) | path so far]). Walking a row
+    down a tree, each step from a node to its child changes the expectation;
+    that change is credited to the node's split feature. Per tree, the
+    credits sum to leaf value - root expectation, so per student
+
+        expected_value + contributions.sum(features) == predict_proba(x)
+
+    holds exactly. All trees and rows are walked level by level on the flat
+    node arrays of compiled_trees.py; no re-prediction is needed.
+
+    Boosting members are attributed on their raw (log-odds) scores and
+    mapped to probabilities with the softmax Jacobian averaged along the
+    straight line from the base score to the row's score (integrated
+    gradients of the link function), which preserves the exact sum.
+
+    Unlike exact TreeSHAP, a feature's credit depends on where along the
+    path it is split (the path-dependent "Saabas" decomposition). In return
+    it costs one pass over the tree depth for a whole batch, fast enough
+    to attach top features to every row of a batch scoring run.
+"""
+
+import time
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.ensemble import (
+    GradientBoostingClassifier, HistGradientBoostingClassifier, RandomForestClassifier
+)
+
+from compiled_trees import FlatTrees, CompiledEnsemble, TREE_LEAF, DEFAULT_BLOCK_SIZE
+from metrics import confusion_matrices, metrics_from_confusion
+
+DEFAULT_N_REPEATS = 5
+DEFAULT_TOP_K = 3
+# Larger batches are predicted by sklearn, which beats the compiled trees above ~1k rows
+COMPILED_MAX_ROWS = 1000
+
+# Gauss-Legendre rule on [0, 1] for the averaged softmax Jacobian; 32 nodes keep the
+# quadrature error below 1e-12 even for logit steps of +-15
+_GL_NODES, _GL_WEIGHTS = np.polynomial.legendre.leggauss(32)
+_GL_NODES = (_GL_NODES + 1) / 2
+_GL_WEIGHTS = _GL_WEIGHTS / 2
+
+
+def _softmax(raw):
+    raw = raw - raw.max(axis=-1, keepdims=True)
+    np.exp(raw, out=raw)
+    raw /= raw.sum(axis=-1, keepdims=True)
+    return raw
+
+
+class _HistTree:
+    """sklearn Tree-like view of a HistGradientBoosting predictor (numeric splits only)."""
+
+    def __init__(self, predictor):
+        nodes = predictor.nodes
+        if nodes['is_categorical'].any():
+            raise TypeError("Categorical splits cannot be attributed")
+        is_leaf = nodes['is_leaf'].astype(bool)
+        self.node_count = len(nodes)
+        # Child indices are uint32; cast first so TREE_LEAF (-1) does not wrap around
+        self.children_left = np.where(is_leaf, TREE_LEAF, nodes['left'].astype(np.intp))
+        self.children_right = np.where(is_leaf, TREE_LEAF, nodes['right'].astype(np.intp))
+        self.feature = nodes['feature_idx'].astype(np.intp)
+        self.threshold = nodes['num_threshold']
+        self.missing_go_to_left = nodes['missing_go_to_left']
+        self.max_depth = int(nodes['depth'].max())
+        self.weighted_n_node_samples = nodes['count'].astype(np.float64)
+        # Leaf values already include the learning rate
+        self.value = nodes['value'][:, None, None]
+
+
+class _TreeMember:
+    """One base estimator: flat trees, expected output per node, scale, prior and link."""
+
+    def __init__(self, trees, expected, scale, init, softmax):
+        self.trees = trees
+        self.expected = expected
+        self.scale = scale
+        self.init = init
+        self.softmax = softmax
+        # Output with no feature information: prior + expectation at every root
+        self.base_raw = init + scale * expected[trees.roots].sum(axis=0)
+        self.base_proba = _softmax(self.base_raw.copy()) if softmax else self.base_raw
+
+    @staticmethod
+    def _expectations(trees, node_values, cover):
+        """Cover-weighted mean leaf value below every node."""
+        is_leaf = trees.left == np.arange(len(trees.left))
+        w_left = cover[trees.left][:, None]
+        w_right = cover[trees.right][:, None]
+        expected = node_values
+        # Each sweep fixes one more level from the bottom; max_depth sweeps reach the roots
+        for _ in range(trees.max_depth):
+            inner = (w_left * expected[trees.left] + w_right * expected[trees.right]) / (w_left + w_right)
+            expected = np.where(is_leaf[:, None], node_values, inner)
+        return expected
+
+    @classmethod
+    def _from_trees(cls, trees, n_classes, scale, init, softmax):
+        if softmax:
+            # One scalar tree per class and stage: its payload goes to column (tree % n_classes)
+            flat = FlatTrees.from_trees(trees, lambda t: t.value[:, 0, 0])
+            tree_class = np.repeat(np.arange(len(trees)) % n_classes, [t.node_count for t in trees])
+            node_values = np.zeros((len(flat.values), n_classes))
+            node_values[np.arange(len(flat.values)), tree_class] = flat.values
+        else:
+            # sklearn stores per-node class fractions in tree_.value
+            flat = FlatTrees.from_trees(trees, lambda t: t.value[:, 0, :])
+            node_values = flat.values
+        cover = np.concatenate([t.weighted_n_node_samples for t in trees]).astype(np.float64)
+        return cls(flat, cls._expectations(flat, node_values, cover), scale, init, softmax)
+
+    @classmethod
+    def from_estimator(cls, est, n_classes, n_features):
+        if isinstance(est, RandomForestClassifier):
+            trees = [e.tree_ for e in est.estimators_]
+            return cls._from_trees(trees, n_classes, 1.0 / len(trees), np.zeros(n_classes), False)
+        if getattr(est, 'n_trees_per_iteration_', n_classes) < 3:
+            raise TypeError("Only multiclass (>= 3 classes) boosting can be attributed")
+        if isinstance(est, GradientBoostingClassifier):
+            # Stage-major order (stage 0: class 0..K-1, stage 1: ...), as in predict_stages
+            trees = [e.tree_ for e in est.estimators_.ravel()]
+            init = est._raw_predict_init(np.zeros((1, n_features), dtype=np.float32))[0]
+            return cls._from_trees(trees, n_classes, float(est.learning_rate), init, True)
+        if isinstance(est, HistGradientBoostingClassifier):
+            trees = [_HistTree(p) for stage in est._predictors for p in stage]
+            return cls._from_trees(trees, n_classes, 1.0, est._baseline_prediction.ravel(), True)
+        raise TypeError(f"Cannot attribute {type(est).__name__}")
+
+    def raw_contributions(self, X):
+        """Contributions to the raw output, shape (n_rows, n_features, n_classes)."""
+        trees = self.trees
+        n_rows, n_features = X.shape
+        n_classes = self.expected.shape[1]
+        X_flat = np.ascontiguousarray(X, dtype=np.float32).ravel()
+        row_base = np.arange(n_rows, dtype=np.intp) * n_features
+        out = np.zeros((n_classes, n_rows * n_features))
+
+        nodes = np.repeat(trees.roots.astype(np.intp)[:, None], n_rows, axis=1)
+        for _ in range(trees.max_depth):
+            index = trees.feature[nodes] + row_base
+            x = X_flat[index]
+            go_left = x <= trees.threshold32[nodes]
+            if trees.has_missing_left:
+                go_left |= np.isnan(x) & trees.missing_left[nodes]
+            next_nodes = trees.children[2 * nodes + 1 - go_left]
+            # Change of expectation on this step, credited to the split feature
+            # (zero for rows already in a leaf, which points to itself)
+            delta = self.expected[next_nodes] - self.expected[nodes]
+            for k in range(n_classes):
+                out[k] += np.bincount(index.ravel(), weights=delta[..., k].ravel(),
+                                      minlength=n_rows * n_features)
+            nodes = next_nodes
+        return self.scale * out.reshape(n_classes, n_rows, n_features).transpose(1, 2, 0)
+
+    def contributions(self, X):
+        """Contributions to the class probabilities; sum to predict_proba(X) - base_proba."""
+        phi = self.raw_contributions(X)
+        if not self.softmax:
+            return phi
+        step = phi.sum(axis=1)
+        n_classes = step.shape[1]
+        jacobian = np.zeros((len(step), n_classes, n_classes))
+        for t, w in zip(_GL_NODES, _GL_WEIGHTS):
+            p = _softmax(self.base_raw + t * step)
+            jacobian += w * (p[:, :, None] * np.eye(n_classes) - p[:, :, None] * p[:, None, :])
+        return np.einsum('rkj,rfj->rfk', jacobian, phi)
+
+
+class TreeAttributor:
+    """Per-student feature contributions to the class probabilities of a soft-voting ensemble."""
+
+    def __init__(self, members, weights=None, block_size=DEFAULT_BLOCK_SIZE):
+        self.members = members
+        self.weights = np.ones(len(members)) if weights is None else np.asarray(weights, dtype=float)
+        self.block_size = block_size
+        # Probabilities before looking at any feature (training-cover-weighted mean output)
+        self.expected_value = np.average([m.base_proba for m in members], axis=0,
+                                         weights=self.weights)
+
+    @classmethod
+    def from_voting(cls, ensemble):
+        """Attributor for a fitted soft VotingClassifier of RF / GB / HistGB members."""
+        if ensemble.voting != 'soft':
+            raise ValueError("Only soft voting can be attributed")
+        n_classes = len(ensemble.classes_)
+        members = [_TreeMember.from_estimator(est, n_classes, ensemble.n_features_in_)
+                   for est in ensemble.estimators_]
+        return cls(members, ensemble.weights)
+
+    def _contributions_block(self, X):
+        return np.tensordot(self.weights / self.weights.sum(),
+                            [m.contributions(X) for m in self.members], axes=1)
+
+    def contributions(self, X):
+        """
+        Shape (n_rows, n_features, n_classes).
+
+        expected_value + contributions(X).sum(axis=1) equals the ensemble's
+        predict_proba(X) up to floating point rounding.
+        """
+        X = np.asarray(X, dtype=np.float32)
+        return np.concatenate([self._contributions_block(X[start:start + self.block_size])
+                               for start in range(0, max(len(X), 1), self.block_size)])
+
+    def top_contributions(self, X, k=DEFAULT_TOP_K, target=None):
+        """
+        The k features with the largest absolute contribution per row.
+
+        target: class index per row (default: the predicted class).
+        Returns (feature indices, contributions), both of shape (n_rows, k),
+        and the reconstructed probabilities.
+        """
+        phi = self.contributions(X)
+        proba = self.expected_value + phi.sum(axis=1)
+        target = proba.argmax(axis=1) if target is None else np.asarray(target)
+        phi = phi[np.arange(len(phi)), :, target]
+        k = min(k, phi.shape[1])
+        top = np.argpartition(-np.abs(phi), k - 1, axis=1)[:, :k]
+        top_phi = np.take_along_axis(phi, top, axis=1)
+        order = np.argsort(-np.abs(top_phi), axis=1)
+        return (np.take_along_axis(top, order, axis=1),
+                np.take_along_axis(top_phi, order, axis=1), proba)
+
+
+def _permuted_predictions(predict, X, baseline_pred, column, n_repeats, random_state):
+    """Predicted labels for n_repeats shuffles of one column: shape (n_repeats, n_rows)."""
+    rng = np.random.default_rng([random_state, column])
+    values = X[:, column]
+    rows, replaced = [], []
+    for _ in range(n_repeats):
+        permuted = values[rng.permutation(len(values))]
+        changed = np.flatnonzero(permuted != values)
+        rows.append(changed)
+        replaced.append(permuted[changed])
+
+    # Rows whose value did not change keep their cached baseline prediction;
+    # the changed rows of all repeats are predicted in one call
+    preds = np.tile(baseline_pred, (n_repeats, 1))
+    changed_rows = np.concatenate(rows)
+    if len(changed_rows):
+        X_changed = X[changed_rows]
+        X_changed[:, column] = np.concatenate(replaced)
+        pred_changed = predict(X_changed)
+        offsets = np.cumsum([0] + [len(r) for r in rows])
+        for r in range(n_repeats):
+            preds[r, rows[r]] = pred_changed[offsets[r]:offsets[r + 1]]
+    return preds, len(changed_rows)
+
+
+def permutation_importance(predict_proba, X, y, n_classes, n_repeats=DEFAULT_N_REPEATS,
+                           n_jobs=None, random_state=42, decision=None):
+    """
+    Drop in macro-F1 per shuffled column.
+
+    decision is the model's DecisionRule (calibration.py) or None for argmax.
+    Returns (baseline macro-F1, drops of shape (n_features, n_repeats),
+    fraction of rows that had to be re-predicted).
+    """
+    X = np.asarray(X)
+    y = np.asarray(y)
+    n_rows, n_features = X.shape
+
+    def predict(X_):
+        proba = predict_proba(X_)
+        return proba.argmax(axis=1) if decision is None else decision.predict(proba)
+
+    baseline_pred = predict(X)
+    outputs = Parallel(n_jobs=n_jobs, prefer="threads")(
+        delayed(_permuted_predictions)(predict, X, baseline_pred, j, n_repeats, random_state)
+        for j in range(n_features)
+    )
+    preds = np.stack([p for p, _ in outputs])
+    repredicted = sum(n for _, n in outputs) / (n_features * n_repeats * n_rows)
+
+    # All (column, repeat) prediction sets scored in one vectorized pass
+    n_sets = n_features * n_repeats
+    cms = confusion_matrices(np.tile(y, n_sets), preds.ravel(), np.repeat(np.arange(n_sets), n_rows),
+                             n_sets, n_classes)
+    permuted_f1 = metrics_from_confusion(cms)["macro_f1_score"].reshape(n_features, n_repeats)
+    baseline = metrics_from_confusion(
+        confusion_matrices(y, baseline_pred, np.zeros(n_rows, dtype=np.int64), 1, n_classes)
+    )["macro_f1_score"][0]
+    return baseline, baseline - permuted_f1, repredicted
+
+
+def explain_model(model, X, y, feature_names, class_names, n_repeats=DEFAULT_N_REPEATS,
+                  n_jobs=None, random_state=42, decision=None):
+    """
+    Global permutation importance and tree-path contributions on (X, y).
+
+    decision is the model's DecisionRule, applied to the importance
+    predictions like to the reported metrics (None: argmax).
+
+    Returns the JSON-serializable `feature_attribution` block of result.json.
+    """
+    print("\n" + "=" * 60)
+    print("FEATURE ATTRIBUTION")
+    print("=" * 60)
+    start = time.perf_counter()
+
+    try:
+        compiled = CompiledEnsemble.from_voting(model)
+    except TypeError:
+        compiled = None
+
+    def predict_proba(X_):
+        # Compiled trees are faster on small batches only (identical probabilities)
+        if compiled is not None and len(X_) <= COMPILED_MAX_ROWS:
+            return compiled.predict_proba(X_)
+        return model.predict_proba(X_)
+
+    baseline, drops, repredicted = permutation_importance(
+        predict_proba, X, y, len(class_names), n_repeats, n_jobs, random_state, decision
+    )
+    print(f"Permutation importance: {len(feature_names)} columns x {n_repeats} repeats, "
+          f"{repredicted:.0%} of rows re-predicted")
+
+    try:
+        attributor = TreeAttributor.from_voting(model)
+    except TypeError as e:
+        # e.g. binary boosting or categorical splits: permutation importance only
+        attributor = None
+        print(f"Tree-path contributions skipped ({e})")
+    if attributor is not None:
+        phi = attributor.contributions(X)
+        predicted = (attributor.expected_value + phi.sum(axis=1)).argmax(axis=1)
+        # Mean |contribution| to the class each student is assigned to
+        phi_predicted = np.abs(phi[np.arange(len(phi)), :, predicted])
+        mean_abs = phi_predicted.mean(axis=0)
+        mean_abs_per_class = {
+            name: np.abs(phi[:, :, i]).mean(axis=0) for i, name in enumerate(class_names)
+        }
+
+    features = [
+        {
+            "feature": str(name),
+            "importance_mean": round(float(drops[j].mean()), 4),
+            "importance_std": round(float(drops[j].std()), 4),
+            "mean_abs_contribution": (round(float(mean_abs[j]), 4)
+                                      if attributor is not None else None),
+            "mean_abs_contribution_per_class": ({
+                cls: round(float(values[j]), 4) for cls, values in mean_abs_per_class.items()
+            } if attributor is not None else None),
+        }
+        for j, name in enumerate(feature_names)
+    ]
+    features.sort(key=lambda f: f["importance_mean"], reverse=True)
+    elapsed = time.perf_counter() - start
+
+    print("\nTop features (macro-F1 drop when shuffled | mean |contribution|):")
+    for f in features[:10]:
+        contribution = (f"{f['mean_abs_contribution']:.4f}"
+                        if f['mean_abs_contribution'] is not None else "n/a")
+        print(f"  {f['feature'][:45]:<45} {f['importance_mean']:+.4f} ± {f['importance_std']:.4f}"
+              f" | {contribution}")
+    print(f"Completed in {elapsed:.1f}s")
+
+    return {
+        "metric": "macro_f1_score",
+        "baseline_score": round(float(baseline), 4),
+        "n_repeats": n_repeats,
+        "random_state": random_state,
+        "expected_value": ({
+            name: round(float(p), 4) for name, p in zip(class_names, attributor.expected_value)
+        } if attributor is not None else None),
+        "features": features,
+        "wall_time_seconds": round(elapsed, 2),
+    }
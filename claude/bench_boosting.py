@@ -0,0 +1,82 @@
+"""
+Boosting Backend Benchmark
+==========================
+
+Fit time of the ensemble's boosting member for both backends of
+build_boosting ('exact' GradientBoostingClassifier vs 'hist'
+HistGradientBoostingClassifier) on the scaled engineered features.
+
+Larger training sets are created by tiling the training split of
+shared-data/data.csv. Macro-F1 is always measured on the original test split,
+so the quality of both backends stays comparable.
+
+Usage:
+    python bench_boosting.py                           # 4k and 1M rows ('exact' up to 100k)
+    python bench_boosting.py --sizes 3539 100000
+    python bench_boosting.py --skip-exact-above 1000000  # 'exact' at 1M rows too (hours)
+"""
+
+import argparse
+import os
+import time
+import warnings
+
+import numpy as np
+from sklearn.metrics import f1_score
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+
+from dropout_prediction import (
+    DATA_PATH, SPLIT_RANDOM_STATE, BOOSTING_BACKENDS, build_boosting, load_data
+)
+from features import FeatureEngineer
+
+DEFAULT_SIZES = [4_424, 1_000_000]
+# The single-threaded exact backend needs hours at 1M rows; skipped above this by default
+DEFAULT_SKIP_EXACT_ABOVE = 100_000
+
+
+def load_split():
+    """Scaled engineered train/test split, as in train_model."""
+    df = load_data(DATA_PATH)
+    X_raw = df.drop('Target', axis=1)
+    X = FeatureEngineer().fit(X_raw).transform(X_raw)
+    y = df['Target'].cat.codes.to_numpy()
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.2, random_state=SPLIT_RANDOM_STATE, stratify=y
+    )
+    scaler = StandardScaler().fit(X_train)
+    return scaler.transform(X_train), scaler.transform(X_test), y_train, y_test
+
+
+def run(sizes, skip_exact_above=None):
+    X_train, X_test, y_train, y_test = load_split()
+    print(f"CPU cores: {os.cpu_count()}\n")
+
+    print(f"{'rows':>12}  {'backend':>8}  {'fit (s)':>9}  {'iterations':>10}  {'macro F1':>9}")
+    for n_rows in sizes:
+        index = np.arange(n_rows) % len(X_train)
+        X, y = X_train[index], y_train[index]
+        for backend in BOOSTING_BACKENDS:
+            if backend == 'exact' and skip_exact_above is not None and n_rows > skip_exact_above:
+                print(f"{n_rows:>12,}  {backend:>8}  {'-':>9}  {'-':>10}  {'-':>9}")
+                continue
+            model = build_boosting(backend)
+            start = time.perf_counter()
+            model.fit(X, y)
+            fit_time = time.perf_counter() - start
+            iterations = getattr(model, 'n_iter_', None) or model.n_estimators_
+            macro_f1 = f1_score(y_test, model.predict(X_test), average='macro')
+            print(f"{n_rows:>12,}  {backend:>8}  {fit_time:>9.2f}  {iterations:>10}  {macro_f1:>9.4f}")
+        del X, y
+
+
+if __name__ == "__main__":
+    warnings.filterwarnings('ignore')
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--skip-exact-above", type=int, default=DEFAULT_SKIP_EXACT_ABOVE,
+                        help="Skip the single-threaded exact backend above this size "
+                             "(it needs hours at 1M rows on few cores; default: %(default)s)")
+    args = parser.parse_args()
+    run(args.sizes, args.skip_exact_above)
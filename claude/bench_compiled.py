@@ -0,0 +1,74 @@
+"""
+Compiled Ensemble Benchmark
+===========================
+
+Compares CompiledEnsemble.predict_proba against the persisted sklearn
+VotingClassifier at several batch sizes and checks that both return
+bit-identical probabilities.
+
+Rows are sampled from the scaled engineered features of shared-data/data.csv
+(tiled for large batches).
+
+Usage:
+    python bench_compiled.py                       # 1, 1k and 1M rows
+    python bench_compiled.py --sizes 1 100 10000
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+
+from compiled_trees import CompiledEnsemble
+
+SCRIPT_DIR = Path(__file__).parent
+DATA_PATH = SCRIPT_DIR.parent / "shared-data" / "data.csv"
+MODEL_PATH = SCRIPT_DIR / "model.joblib"
+
+sys.path.insert(0, str(DATA_PATH.parent))
+from data_loader import load_data  # noqa: E402
+
+DEFAULT_SIZES = [1, 1_000, 1_000_000]
+
+
+def best_of(func, repeats):
+    """Best wall time of `repeats` calls and the last result."""
+    best, result = float('inf'), None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run(sizes, model_path=MODEL_PATH):
+    artifact = joblib.load(model_path)
+    model = artifact["model"]
+    X_base = artifact["scaler"].transform(artifact["feature_engineer"].transform(load_data(DATA_PATH)))
+
+    compile_time, compiled = best_of(lambda: CompiledEnsemble.from_voting(model), 1)
+    print(f"Compiled {sum(e.trees.n_trees for e in compiled.estimators)} trees "
+          f"in {compile_time * 1000:.1f} ms\n")
+
+    print(f"{'rows':>10}  {'sklearn':>12}  {'compiled':>12}  {'speedup':>8}  identical")
+    for n_rows in sizes:
+        X = X_base[np.arange(n_rows) % len(X_base)]
+        repeats = 20 if n_rows <= 1_000 else 1
+
+        sk_time, expected = best_of(lambda: model.predict_proba(X), repeats)
+        fast_time, got = best_of(lambda: compiled.predict_proba(X), repeats)
+        identical = np.array_equal(expected, got)
+
+        print(f"{n_rows:>10,}  {sk_time * 1000:>10.2f}ms  {fast_time * 1000:>10.2f}ms  "
+              f"{sk_time / fast_time:>7.1f}x  {identical}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--model", type=Path, default=MODEL_PATH)
+    args = parser.parse_args()
+    run(args.sizes, args.model)
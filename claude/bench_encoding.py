@@ -0,0 +1,104 @@
+"""
+Categorical Encoding Benchmark
+==============================
+
+Compares the encodings of the nominal code columns (Course, Application mode,
+occupations, ...) for the linear streaming model:
+
+    dense one-hot   sklearn OneHotEncoder(sparse_output=False), float32
+    CSR one-hot     CategoricalEncoder.one_hot
+    target          CategoricalEncoder.target_encode (dense float32)
+    codes           CategoricalEncoder.transform (uint8, what the trees get)
+
+and reports encode time, matrix memory and the time of one
+SGDClassifier.partial_fit pass over the encoded rows (scaled numeric columns
+included). Larger datasets are created by tiling the rows of
+shared-data/data.csv.
+
+Usage:
+    python bench_encoding.py                       # 100k and 1M rows
+    python bench_encoding.py --sizes 4424 3000000
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.linear_model import SGDClassifier
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+SCRIPT_DIR = Path(__file__).parent
+DATA_PATH = SCRIPT_DIR.parent / "shared-data" / "data.csv"
+sys.path.insert(0, str(DATA_PATH.parent))
+from data_loader import load_data  # noqa: E402
+from categorical_encoding import CategoricalEncoder, NOMINAL_COLUMNS  # noqa: E402
+
+DEFAULT_SIZES = [100_000, 1_000_000]
+
+
+def nbytes(matrix):
+    if sp.issparse(matrix):
+        return matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes
+    return matrix.nbytes
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def sgd_pass(X, y):
+    model = SGDClassifier(loss='log_loss', alpha=1e-4, average=True, random_state=42)
+    _, seconds = timed(lambda: model.partial_fit(X, y, classes=np.arange(3)))
+    return seconds
+
+
+def run(sizes):
+    base = load_data(DATA_PATH, mmap=False)
+    y_base = base['Target'].cat.codes.to_numpy()
+    features = base.drop(columns='Target')
+    numeric_columns = [col for col in features.columns if col not in NOMINAL_COLUMNS]
+
+    encoder = CategoricalEncoder().fit(features[NOMINAL_COLUMNS], y_base)
+    dense_encoder = OneHotEncoder(sparse_output=False, handle_unknown='ignore',
+                                  dtype=np.float32).fit(features[NOMINAL_COLUMNS])
+    scaler = StandardScaler().fit(features[numeric_columns].to_numpy(np.float32))
+
+    encodings = {
+        "dense one-hot": lambda C: dense_encoder.transform(C),
+        "CSR one-hot": lambda C: encoder.one_hot(C),
+        "target": lambda C: encoder.target_encode(C),
+        "codes": lambda C: encoder.transform(C),
+    }
+
+    print(f"{'rows':>10}  {'encoding':<14} {'encode s':>9} {'matrix MB':>10} {'SGD pass s':>11}")
+    for n_rows in sizes:
+        rows = np.arange(n_rows) % len(base)
+        codes = features[NOMINAL_COLUMNS].iloc[rows].reset_index(drop=True)
+        numeric = scaler.transform(features[numeric_columns].iloc[rows].to_numpy(np.float32))
+        y = y_base[rows]
+        for name, encode in encodings.items():
+            encoded, encode_seconds = timed(lambda: encode(codes))
+            if name == "codes":
+                fit = "-"
+            elif sp.issparse(encoded):
+                fit = f"{sgd_pass(sp.hstack([sp.csr_matrix(numeric), encoded], format='csr'), y):.2f}"
+            else:
+                fit = f"{sgd_pass(np.hstack([numeric, encoded]), y):.2f}"
+            print(f"{n_rows:>10,}  {name:<14} {encode_seconds:>9.2f} "
+                  f"{nbytes(encoded) / 1e6:>10.1f} {fit:>11}")
+            del encoded
+        print()
+
+    print(f"Code columns: {len(NOMINAL_COLUMNS)}, one-hot width: {int(encoder.n_codes_.sum())}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    args = parser.parse_args()
+    run(args.sizes)
@@ -0,0 +1,116 @@
+"""
+Feature Engineering Microbenchmark
+==================================
+
+Compares the vectorized FeatureEngineer against the original pandas
+implementation of preprocess_data's feature engineering and reports
+rows/second at several dataset sizes.
+
+Larger datasets are created by tiling the rows of shared-data/data.csv.
+
+Usage:
+    python bench_features.py                      # 4k, 1M and 10M rows
+    python bench_features.py --sizes 4424 100000  # custom sizes
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from features import FeatureEngineer, ENGINEERED_FEATURES
+
+SCRIPT_DIR = Path(__file__).parent
+DATA_PATH = SCRIPT_DIR.parent / "shared-data" / "data.csv"
+
+DEFAULT_SIZES = [4_424, 1_000_000, 10_000_000]
+
+
+def pandas_engineer_features(X):
+    """Reference implementation (the former pandas code in preprocess_data)."""
+    X_engineered = X.copy()
+    X_engineered['sem1_approval_rate'] = np.where(
+        X['Curricular units 1st sem (enrolled)'] > 0,
+        X['Curricular units 1st sem (approved)'] / X['Curricular units 1st sem (enrolled)'],
+        0
+    )
+    X_engineered['sem2_approval_rate'] = np.where(
+        X['Curricular units 2nd sem (enrolled)'] > 0,
+        X['Curricular units 2nd sem (approved)'] / X['Curricular units 2nd sem (enrolled)'],
+        0
+    )
+    total_enrolled = (X['Curricular units 1st sem (enrolled)'] +
+                      X['Curricular units 2nd sem (enrolled)'])
+    total_approved = (X['Curricular units 1st sem (approved)'] +
+                      X['Curricular units 2nd sem (approved)'])
+    X_engineered['total_approval_rate'] = np.where(
+        total_enrolled > 0, total_approved / total_enrolled, 0
+    )
+    X_engineered['avg_grade'] = (
+        X['Curricular units 1st sem (grade)'] + X['Curricular units 2nd sem (grade)']
+    ) / 2
+    X_engineered['grade_improvement'] = (
+        X['Curricular units 2nd sem (grade)'] - X['Curricular units 1st sem (grade)']
+    )
+    X_engineered['total_credited'] = (
+        X['Curricular units 1st sem (credited)'] + X['Curricular units 2nd sem (credited)']
+    )
+    total_evaluations = (X['Curricular units 1st sem (evaluations)'] +
+                         X['Curricular units 2nd sem (evaluations)'])
+    X_engineered['evaluation_efficiency'] = np.where(
+        total_evaluations > 0, total_approved / total_evaluations, 0
+    )
+    X_engineered['financial_stress'] = X['Debtor'] + (1 - X['Tuition fees up to date'])
+    X_engineered['age_deviation'] = X['Age at enrollment'] - 19
+    return X_engineered
+
+
+def best_of(func, repeats):
+    """Best wall time of `repeats` calls."""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(sizes, repeats=3, skip_pandas_above=1_000_000):
+    base = pd.read_csv(DATA_PATH, sep=';').drop('Target', axis=1)
+    engineer = FeatureEngineer().fit(base)
+
+    # Sanity check: same features as the reference implementation, up to
+    # float32 rounding (inputs are cast before the arithmetic)
+    expected = pandas_engineer_features(base).to_numpy(dtype=np.float32)
+    np.testing.assert_allclose(engineer.transform(base), expected, rtol=1e-5, atol=1e-5)
+
+    print(f"{'rows':>12}  {'FeatureEngineer rows/s':>24}  {'pandas rows/s':>15}  {'speedup':>8}")
+    for n_rows in sizes:
+        X = base.iloc[np.arange(n_rows) % len(base)].reset_index(drop=True)
+
+        fast = best_of(lambda: engineer.transform(X), repeats)
+        fast_rate = n_rows / fast
+
+        if n_rows <= skip_pandas_above:
+            slow = best_of(lambda: pandas_engineer_features(X), repeats)
+            slow_rate = f"{n_rows / slow:>15,.0f}"
+            speedup = f"{slow / fast:>7.1f}x"
+        else:
+            slow_rate, speedup = f"{'-':>15}", f"{'-':>8}"
+
+        print(f"{n_rows:>12,}  {fast_rate:>24,.0f}  {slow_rate}  {speedup}")
+        del X
+
+    print(f"\nEngineered features: {len(ENGINEERED_FEATURES)} (float32 output)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--skip-pandas-above", type=int, default=1_000_000,
+                        help="Skip the (slow, memory hungry) pandas baseline above this size")
+    args = parser.parse_args()
+    run(args.sizes, args.repeats, args.skip_pandas_above)
@@ -0,0 +1,218 @@
+"""
+Startup Benchmark
+=================
+
+Cold-start time of every CLI subcommand and of the scoring service, checked
+against import-time budgets. Each entry is started as a fresh interpreter
+with --help: interpreter start, imports and argument parsing, but no work.
+
+--help never reaches the pipeline imports behind dispatch, so the cold
+commands `predict` and `drift` also run for real on the first rows of the
+dataset with the persisted model (skipped if there is none). Besides their
+time, their imports (python -X importtime) must not contain the modules of
+other modes: attribution without --explain, cross-validation, streaming
+and incremental training, slice metrics, the similarity index or what-if.
+
+Budgets are overheads in milliseconds above a floor measured on the same
+machine, so they hold on faster and slower hardware alike:
+
+    python    bare interpreter (python -c pass)
+    sklearn   pandas + scikit-learn, which the scoring service needs at
+              startup (unpickling the model)
+
+Subcommand arguments only need defaults.py, so every `cli.py <command>
+--help` is measured against the bare interpreter; the cold commands load
+the model and are measured against the sklearn floor.
+
+Floor and entry are started alternately and the fastest start of each
+counts, so load changes on the machine affect both alike.
+
+An entry over budget lists its slowest imports (python -X importtime).
+The exit status is 1 if any budget is exceeded or a cold command imports a
+module of another mode, so the benchmark can guard the startup time in
+scheduled checks.
+
+Usage:
+    python bench_startup.py
+    python cli.py bench --repeats 10 --json
+"""
+
+import argparse
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).parent
+DATA_PATH = SCRIPT_DIR.parent / "shared-data" / "data.csv"
+MODEL_PATH = SCRIPT_DIR / "model.joblib"
+DEFAULT_REPEATS = 5
+SLOWEST_IMPORTS = 5
+COLD_ROWS = 5
+
+FLOORS = {
+    "python": "pass",
+    "sklearn": "import pandas, sklearn.ensemble",
+}
+
+# name: (arguments after the interpreter, floor, budget in ms above the floor)
+STARTUP_BUDGETS = {
+    "help": (["cli.py", "--help"], "python", 150),
+    "bench": (["cli.py", "bench", "--help"], "python", 150),
+    "train": (["cli.py", "train", "--help"], "python", 150),
+    "predict": (["cli.py", "predict", "--help"], "python", 150),
+    "evaluate": (["cli.py", "evaluate", "--help"], "python", 150),
+    "retrain": (["cli.py", "retrain", "--help"], "python", 150),
+    "drift": (["cli.py", "drift", "--help"], "python", 150),
+    "export": (["cli.py", "export", "--help"], "python", 150),
+    "whatif": (["cli.py", "whatif", "--help"], "python", 150),
+    "index": (["cli.py", "index", "--help"], "python", 150),
+    "service": (["predict_service.py", "--help"], "sklearn", 150),
+}
+
+# Modules of other modes, which a cold predict or drift must not import
+OTHER_MODES = ["attribution", "cross_validation", "streaming_training",
+               "incremental_training", "slice_metrics", "similar_students", "what_if"]
+
+# name: (arguments, floor, budget in ms above the floor, modules that must stay unloaded);
+# {rows} is a CSV with the first COLD_ROWS rows of the dataset, {out} a scratch directory
+COLD_COMMANDS = {
+    "predict-5": (["cli.py", "predict", "{rows}", "-o", "{out}/predictions.csv", "--quiet"],
+                  "sklearn", 750, OTHER_MODES),
+    "drift-5": (["cli.py", "drift", "{rows}", "-o", "{out}/drift_report.json", "--quiet"],
+                "sklearn", 750, OTHER_MODES),
+}
+
+
+def _start(args):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, *args], cwd=SCRIPT_DIR, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def cold_start(args, floor_args, repeats):
+    """Fastest wall times in seconds of `python <args>` and `python <floor_args>`."""
+    best, best_floor = float("inf"), float("inf")
+    for _ in range(repeats):
+        best_floor = min(best_floor, _start(floor_args))
+        best = min(best, _start(args))
+    return best, best_floor
+
+
+def _import_times(args):
+    """(module, nesting level, cumulative ms) of every import, from python -X importtime."""
+    completed = subprocess.run([sys.executable, "-X", "importtime", *args], cwd=SCRIPT_DIR,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    imports = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        # Nesting is two spaces per level after the separator's own space
+        level = (len(name) - len(name.lstrip()) - 1) // 2
+        imports.append((name.strip(), level, int(cumulative) / 1000))
+    return imports
+
+
+def slowest_imports(args, n=SLOWEST_IMPORTS):
+    """The n imports of the entry script with the largest cumulative time (ms)."""
+    imports = [(module, ms) for module, level, ms in _import_times(args) if level <= 1]
+    return sorted(imports, key=lambda item: -item[1])[:n]
+
+
+def unexpected_imports(args, forbidden):
+    """The modules of `forbidden` that `python <args>` imports, in import order."""
+    imported = [module for module, _, _ in _import_times(args)]
+    return [module for module in imported if module in forbidden]
+
+
+def _write_rows(path, n=COLD_ROWS):
+    with open(DATA_PATH, encoding="utf-8") as source:
+        lines = [source.readline() for _ in range(n + 1)]
+    path.write_text("".join(lines), encoding="utf-8")
+
+
+def run(repeats=DEFAULT_REPEATS, only=None):
+    """Measure all (or `only` the named) entries; returns the report dict."""
+    known = list(STARTUP_BUDGETS) + list(COLD_COMMANDS)
+    names = only or known
+    unknown = set(names) - set(known)
+    if unknown:
+        raise ValueError(f"Unknown entries {sorted(unknown)}, expected {known}")
+
+    with tempfile.TemporaryDirectory() as scratch:
+        rows = Path(scratch) / "rows.csv"
+        _write_rows(rows)
+        return _measure(names, repeats, {"rows": str(rows), "out": scratch})
+
+
+def _measure(names, repeats, placeholders):
+    floors, entries, skipped = {}, [], []
+    for name in names:
+        if name in COLD_COMMANDS:
+            if not MODEL_PATH.exists():
+                skipped.append(name)
+                continue
+            args, floor, budget_ms, forbidden = COLD_COMMANDS[name]
+            args = [arg.format(**placeholders) for arg in args]
+        else:
+            (args, floor, budget_ms), forbidden = STARTUP_BUDGETS[name], None
+        seconds, floor_seconds = cold_start(args, ["-c", FLOORS[floor]], repeats)
+        floors[floor] = min(floors.get(floor, float("inf")), floor_seconds)
+        overhead_ms = (seconds - floor_seconds) * 1000
+        entry = {
+            "name": name,
+            "command": " ".join(Path(arg).name if arg.startswith(placeholders["out"]) else arg
+                                for arg in args),
+            "seconds": round(seconds, 3),
+            "floor": floor,
+            "overhead_ms": round(overhead_ms, 1),
+            "budget_ms": budget_ms,
+            "passed": overhead_ms <= budget_ms,
+        }
+        if forbidden is not None:
+            entry["unexpected_imports"] = unexpected_imports(args, forbidden)
+            entry["passed"] = entry["passed"] and not entry["unexpected_imports"]
+        if overhead_ms > budget_ms:
+            entry["slowest_imports"] = [{"module": module, "ms": round(ms, 1)}
+                                        for module, ms in slowest_imports(args)]
+        entries.append(entry)
+
+    return {
+        "repeats": repeats,
+        "floors": {floor: round(seconds, 3) for floor, seconds in floors.items()},
+        "entries": entries,
+        "skipped": skipped,
+        "passed": all(entry["passed"] for entry in entries),
+    }
+
+
+def print_report(report):
+    print("Floors: " + ", ".join(f"{floor} {seconds:.3f}s"
+                                 for floor, seconds in report["floors"].items()))
+    print(f"{'entry':<10} {'command':<50} {'cold start':>10} {'floor':>8} "
+          f"{'overhead':>10} {'budget':>8}")
+    for entry in report["entries"]:
+        status = "ok" if entry["passed"] else "OVER"
+        print(f"{entry['name']:<10} {entry['command']:<50} {entry['seconds']:>9.3f}s "
+              f"{entry['floor']:>8} {entry['overhead_ms']:>8.0f}ms {entry['budget_ms']:>6}ms  "
+              f"{status}")
+        for item in entry.get("slowest_imports", []):
+            print(f"{'':<12}{item['module']:<40} {item['ms']:>8.1f}ms")
+        if entry.get("unexpected_imports"):
+            print(f"{'':<12}imports other modes: {', '.join(entry['unexpected_imports'])}")
+    if report["skipped"]:
+        print(f"Skipped (no model at {MODEL_PATH.name}): {', '.join(report['skipped'])}")
+    print("\nAll entries within budget" if report["passed"] else "\nStartup budget exceeded")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS)
+    parser.add_argument("--only", nargs="+", metavar="NAME")
+    args = parser.parse_args()
+    report = run(args.repeats, args.only)
+    print_report(report)
+    sys.exit(0 if report["passed"] else 1)
@@ -0,0 +1,233 @@
+"""
+Probability Calibration and Decision Thresholds
+===============================================
+
+Soft voting averages the uncalibrated RandomForest and boosting
+probabilities, and the argmax of that average under-predicts the minority
+"Enrolled" class. This stage works on out-of-fold probabilities of the
+training rows (cross_validation.out_of_fold_proba, cached by the pipeline),
+so nothing here refits a model:
+
+- Calibration: temperature scaling (one T for all classes, chosen by the
+  log-loss over a grid of temperatures evaluated in one array operation) or
+  one-vs-rest isotonic regression with renormalized rows.
+- Decision thresholds: the predicted class is argmax(w * p) with one weight
+  per class (for two classes exactly a probability threshold). The weight
+  of the most frequent class is fixed to 1; all combinations of the other
+  weights on a log grid are scored at once - predictions of every grid point
+  -> one bincount of confusion matrices -> macro-F1 (metrics.py) - so
+  re-tuning costs milliseconds.
+
+The fitted DecisionRule is stored with the model artifact and applied by
+'predict' and the prediction service.
+"""
+
+import itertools
+import time
+
+import numpy as np
+from scipy.special import softmax
+from sklearn.isotonic import IsotonicRegression
+
+from defaults import CALIBRATION_METHODS, DEFAULT_CALIBRATION
+from metrics import confusion_matrices, metrics_from_confusion
+
+TEMPERATURE_GRID = np.geomspace(0.25, 4.0, 161)
+# Relative class weights searched for every class but the reference class
+WEIGHT_GRID = np.geomspace(0.25, 4.0, 25)
+# Grid points scored per array pass (bounds the (points, rows) prediction matrix)
+GRID_BLOCK_SIZE = 256
+EPSILON = 1e-12
+
+
+def log_loss(proba, y):
+    """Mean negative log-likelihood of the true classes."""
+    return float(-np.log(np.clip(proba[np.arange(len(y)), y], EPSILON, None)).mean())
+
+
+class IdentityCalibration:
+    """Raw probabilities (method 'none')."""
+
+    def fit(self, proba, y):
+        return self
+
+    def transform(self, proba):
+        return np.asarray(proba, dtype=np.float64)
+
+    def describe(self):
+        return {"method": "none"}
+
+
+class TemperatureScaling:
+    """softmax(log p / T) with the T of lowest log-loss on the calibration rows."""
+
+    def __init__(self, grid=TEMPERATURE_GRID):
+        self.grid = grid
+
+    def fit(self, proba, y):
+        log_p = np.log(np.clip(proba, EPSILON, None))
+        # Shape (n_temperatures, n_rows, n_classes): all temperatures in one pass;
+        # log p <= 0, so the largest class term is exp(0) after the shift by max(log p)
+        z = (log_p - log_p.max(axis=1, keepdims=True))[None] / self.grid[:, None, None]
+        nll = (np.log(np.exp(z).sum(axis=2)) - z[:, np.arange(len(y)), y]).mean(axis=1)
+        self.temperature_ = float(self.grid[nll.argmin()])
+        return self
+
+    def transform(self, proba):
+        return softmax(np.log(np.clip(proba, EPSILON, None)) / self.temperature_, axis=1)
+
+    def describe(self):
+        return {"method": "temperature", "temperature": round(self.temperature_, 4)}
+
+
+class IsotonicCalibration:
+    """One monotone map per class (one-vs-rest); rows are renormalized to sum to 1."""
+
+    def fit(self, proba, y):
+        self.regressors_ = [
+            IsotonicRegression(y_min=0.0, y_max=1.0, out_of_bounds='clip').fit(proba[:, k], y == k)
+            for k in range(proba.shape[1])
+        ]
+        return self
+
+    def transform(self, proba):
+        calibrated = np.column_stack([r.predict(proba[:, k]) for k, r in enumerate(self.regressors_)])
+        total = calibrated.sum(axis=1, keepdims=True)
+        uniform = np.full_like(calibrated, 1.0 / calibrated.shape[1])
+        return np.divide(calibrated, total, out=uniform, where=total > 0)
+
+    def describe(self):
+        return {"method": "isotonic"}
+
+
+def make_calibrator(method=DEFAULT_CALIBRATION):
+    if method == "temperature":
+        return TemperatureScaling()
+    if method == "isotonic":
+        return IsotonicCalibration()
+    if method == "none":
+        return IdentityCalibration()
+    raise ValueError(f"Unknown calibration method {method!r}, expected one of {CALIBRATION_METHODS}")
+
+
+def weighted_argmax(proba, weights):
+    """argmax(w * p) for every row w of weights -> int array (n_points, n_rows)."""
+    # One comparison pass per class over contiguous (n_points, n_rows) arrays;
+    # much faster than argmax along a length-K axis
+    best = weights[:, :1] * proba[None, :, 0]
+    y_pred = np.zeros(best.shape, dtype=np.intp)
+    for k in range(1, proba.shape[1]):
+        score = weights[:, k:k + 1] * proba[None, :, k]
+        np.copyto(y_pred, k, where=score > best)
+        np.maximum(best, score, out=best)
+    return y_pred
+
+
+def grid_macro_f1(proba, y, weights, block_size=GRID_BLOCK_SIZE):
+    """Macro-F1 of argmax(w * p) for every row w of weights (shape (n_points, n_classes))."""
+    n_rows, n_classes = proba.shape
+    scores = np.empty(len(weights))
+    for start in range(0, len(weights), block_size):
+        block = weights[start:start + block_size]
+        y_pred = weighted_argmax(proba, block)
+        groups = np.repeat(np.arange(len(block)), n_rows)
+        cm = confusion_matrices(np.tile(y, len(block)), y_pred.ravel(), groups, len(block), n_classes)
+        scores[start:start + len(block)] = metrics_from_confusion(cm)["macro_f1_score"]
+    return scores
+
+
+def search_class_weights(proba, y, grid=WEIGHT_GRID):
+    """
+    Class weights maximizing macro-F1 of argmax(w * p) on (proba, y).
+
+    Ties go to the weights closest to 1 (smallest total |log w|), so equal
+    scores never move the decision further from the plain argmax.
+    """
+    n_classes = proba.shape[1]
+    reference = int(np.bincount(y, minlength=n_classes).argmax())
+    free = [k for k in range(n_classes) if k != reference]
+    weights = np.ones((len(grid) ** len(free), n_classes))
+    weights[:, free] = np.array(list(itertools.product(grid, repeat=len(free))))
+
+    scores = grid_macro_f1(proba, y, weights)
+    best = np.flatnonzero(scores == scores.max())
+    best = best[np.abs(np.log(weights[best])).sum(axis=1).argmin()]
+    return weights[best], float(scores[best]), len(weights)
+
+
+class DecisionRule:
+    """Calibrated probabilities and weighted argmax on top of the ensemble's predict_proba."""
+
+    def __init__(self, calibrator, class_weights):
+        self.calibrator = calibrator
+        self.class_weights = np.asarray(class_weights, dtype=np.float64)
+
+    def predict_proba(self, proba):
+        """Calibrated class probabilities."""
+        return self.calibrator.transform(proba)
+
+    def decide(self, calibrated):
+        """Class indices from already calibrated probabilities."""
+        return weighted_argmax(calibrated, self.class_weights[None])[0]
+
+    def predict(self, proba):
+        """Class indices from the ensemble's raw probabilities."""
+        return self.decide(self.predict_proba(proba))
+
+
+def _macro_f1_and_recall(y_true, y_pred, n_classes):
+    metrics = metrics_from_confusion(
+        confusion_matrices(y_true, y_pred, np.zeros(len(y_true)), 1, n_classes)[0]
+    )
+    return float(metrics["macro_f1_score"]), metrics["recall"]
+
+
+def fit_decision_rule(proba, y, class_names, method=DEFAULT_CALIBRATION):
+    """
+    Fit calibration and class weights on out-of-fold probabilities.
+
+    Returns (DecisionRule, report dict for result.json).
+    """
+    start = time.perf_counter()
+    proba = np.asarray(proba, dtype=np.float64)
+    y = np.asarray(y)
+    n_classes = len(class_names)
+
+    calibrator = make_calibrator(method).fit(proba, y)
+    calibrated = calibrator.transform(proba)
+    weights, tuned_f1, n_points = search_class_weights(calibrated, y)
+    rule = DecisionRule(calibrator, weights)
+    elapsed = time.perf_counter() - start
+
+    argmax_f1, argmax_recall = _macro_f1_and_recall(y, proba.argmax(axis=1), n_classes)
+    _, tuned_recall = _macro_f1_and_recall(y, rule.decide(calibrated), n_classes)
+    report = {
+        "calibration": calibrator.describe(),
+        "class_weights": {name: round(float(w), 4) for name, w in zip(class_names, weights)},
+        "grid_points": n_points,
+        "fit_seconds": round(elapsed, 4),
+        "out_of_fold": {
+            "n_samples": int(len(y)),
+            "log_loss_raw": round(log_loss(proba, y), 4),
+            "log_loss_calibrated": round(log_loss(calibrated, y), 4),
+            "macro_f1_argmax": round(argmax_f1, 4),
+            "macro_f1_tuned": round(tuned_f1, 4),
+            "recall_argmax": {n: round(float(r), 4) for n, r in zip(class_names, argmax_recall)},
+            "recall_tuned": {n: round(float(r), 4) for n, r in zip(class_names, tuned_recall)},
+        },
+    }
+    return rule, report
+
+
+def compare_on_test(rule, proba, y, class_names):
+    """Argmax vs. decision rule on held-out rows; returns (tuned predictions, report dict)."""
+    n_classes = len(class_names)
+    y_pred = rule.predict(proba)
+    argmax_f1, argmax_recall = _macro_f1_and_recall(y, proba.argmax(axis=1), n_classes)
+    tuned_f1, tuned_recall = _macro_f1_and_recall(y, y_pred, n_classes)
+    return y_pred, {
+        "macro_f1_argmax": round(argmax_f1, 4),
+        "macro_f1_tuned": round(tuned_f1, 4),
+        "recall_argmax": {n: round(float(r), 4) for n, r in zip(class_names, argmax_recall)},
+        "recall_tuned": {n: round(float(r), 4) for n, r in zip(class_names, tuned_recall)},
+    }
@@ -0,0 +1,382 @@
+"""
+Student Dropout Prediction - Command Line
+=========================================
+
+One entry point for every mode of the pipeline:
+
+    train      train, evaluate and persist the ensemble (or the streaming model)
+    predict    score a semicolon CSV with the persisted ensemble
+    evaluate   metrics of the persisted ensemble without retraining
+    retrain    warm-start update with new labeled records
+    drift      drift check of a new cohort
+    export     compact (quantized, optionally pruned) model file for scoring
+    whatif     dropout risk of one student under a grid of feature changes
+    index      similar-students index over a labeled CSV (predict --similar)
+    bench      startup benchmark against the import-time budgets
+
+Only the standard library is imported at startup. Argument defaults come
+from defaults.py (standard library only), so `--help` of every subcommand
+starts without pandas and scikit-learn. A subcommand imports the pipeline
+when it runs, and dropout_prediction.py imports scikit-learn and the
+pipeline modules inside the functions of each mode, so scheduled jobs load
+nothing beyond what their mode needs.
+
+Every subcommand accepts --quiet (no progress output; training also skips
+the exploratory statistics of the dataset) and --json (quiet, plus one JSON
+document with the outcome on stdout). Errors go to stderr as a traceback;
+under --json a failure prints {"command", "error", "type"} on stdout
+instead and exits with status 1.
+
+Usage:
+    python cli.py train --boosting hist
+    python cli.py predict new_students.csv -o predictions.csv --json
+    python cli.py evaluate --quiet && echo ok
+    python dropout_prediction.py predict new_students.csv    # same CLI
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+DESCRIPTION = "Student dropout prediction pipeline"
+
+
+def _output_arguments():
+    """Parent parser with the output options shared by all subcommands."""
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("-q", "--quiet", action="store_true",
+                        help="No progress output (training skips the data exploration)")
+    parser.add_argument("--json", action="store_true",
+                        help="Print one JSON document with the outcome (implies --quiet)")
+    return parser
+
+
+# ═══════════════════════════════════════════════════════════════
+# ARGUMENTS PER SUBCOMMAND (imported only for the selected one)
+# ═══════════════════════════════════════════════════════════════
+
+def _train_arguments(parser):
+    from defaults import (
+        BOOSTING_BACKENDS, DEFAULT_BOOSTING_BACKEND, DATA_PATH, STREAMING_MODEL_PATH,
+        DEFAULT_N_SPLITS, DEFAULT_N_REPEATS, DEFAULT_CALIBRATE, CALIBRATION_METHODS,
+        DEFAULT_CALIBRATION,
+        DEFAULT_MAX_BYTES, CATEGORICAL_ENCODINGS, DEFAULT_CATEGORICAL_ENCODING,
+        DEFAULT_STREAMING_CHUNK_SIZE, DEFAULT_EPOCHS
+    )
+    parser.add_argument("--boosting", choices=BOOSTING_BACKENDS, default=DEFAULT_BOOSTING_BACKEND,
+                        help="Boosting member: 'exact' GradientBoosting or multi-threaded "
+                             "'hist' HistGradientBoosting with early stopping")
+    parser.add_argument("--cv", action="store_true",
+                        help="Additionally run repeated stratified K-fold CV and add "
+                             "means with bootstrap confidence intervals to result.json")
+    parser.add_argument("--cv-splits", type=int, default=DEFAULT_N_SPLITS)
+    parser.add_argument("--cv-repeats", type=int, default=DEFAULT_N_REPEATS)
+    parser.add_argument("--cv-jobs", type=int, default=None,
+                        help="Worker processes for the CV folds (default: all cores)")
+    parser.add_argument("--no-explain", action="store_true",
+                        help="Skip permutation importance and tree-path attributions")
+    decision = parser.add_mutually_exclusive_group()
+    decision.add_argument("--calibrate", dest="calibrate", action="store_true",
+                          default=DEFAULT_CALIBRATE,
+                          help="Fit calibration and class weights on out-of-fold predictions "
+                               "(refits the ensemble once per split) and report their metrics "
+                               "as the headline")
+    decision.add_argument("--argmax", dest="calibrate", action="store_false",
+                          help="Predict the argmax of the soft-vote probabilities (default)")
+    parser.add_argument("--calibration", choices=CALIBRATION_METHODS, default=DEFAULT_CALIBRATION,
+                        help="Probability calibration applied before the class weights are "
+                             "tuned (with --calibrate)")
+    parser.add_argument("--calibration-splits", type=int, default=DEFAULT_N_SPLITS,
+                        help="Folds of the out-of-fold pass over the training split "
+                             "(with --calibrate)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Recompute every stage instead of using the stage cache")
+    parser.add_argument("--cache-max-mb", type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024),
+                        help="Size limit of the stage cache (least recently used "
+                             "entries are evicted)")
+    parser.add_argument("--streaming", action="store_true",
+                        help="Out-of-core mode: stream the CSV in chunks and train an "
+                             "incremental SGD model (bounded memory)")
+    parser.add_argument("--data", type=Path, default=DATA_PATH,
+                        help="Semicolon CSV with Target column (streaming mode)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_STREAMING_CHUNK_SIZE,
+                        help="Rows per chunk in streaming mode")
+    parser.add_argument("--epochs", type=int, default=DEFAULT_EPOCHS,
+                        help="Passes over the training rows in streaming mode")
+    parser.add_argument("--categorical", choices=CATEGORICAL_ENCODINGS,
+                        default=DEFAULT_CATEGORICAL_ENCODING,
+                        help="Encoding of the nominal code columns for the linear "
+                             "streaming model: sparse one-hot, target frequencies or "
+                             "scaled codes")
+    parser.add_argument("--model", type=Path, default=STREAMING_MODEL_PATH,
+                        help="Artifact path of the streaming model")
+
+
+def _predict_arguments(parser):
+    from defaults import MODEL_PATH, PREDICT_CHUNK_SIZE, SIMILAR_INDEX_PATH
+    parser.add_argument("input", type=Path, help="CSV file to score")
+    parser.add_argument("-o", "--output", type=Path, default=Path("predictions.csv"),
+                        help="Output CSV with per-student class probabilities")
+    parser.add_argument("--model", type=Path, default=MODEL_PATH,
+                        help="Model artifact written by 'train' or a compact export")
+    parser.add_argument("--chunk-size", type=int, default=PREDICT_CHUNK_SIZE,
+                        help="Rows per chunk (bounds memory use)")
+    parser.add_argument("--explain", type=int, default=0, metavar="K",
+                        help="Add the K features contributing most to each prediction")
+    parser.add_argument("--similar", type=int, default=0, metavar="K",
+                        help="Add the K most similar historical students and their outcomes")
+    parser.add_argument("--index", type=Path, default=SIMILAR_INDEX_PATH,
+                        help="Similar-students index written by 'train' or 'index'")
+
+
+def _evaluate_arguments(parser):
+    from defaults import MODEL_PATH
+    parser.add_argument("input", type=Path, nargs="?", default=None,
+                        help="Labeled semicolon CSV (default: the test split of data.csv)")
+    parser.add_argument("--model", type=Path, default=MODEL_PATH,
+                        help="Model artifact written by 'train'")
+
+
+def _retrain_arguments(parser):
+    from defaults import (
+        MODEL_PATH, DEFAULT_NEW_TREES, DEFAULT_NEW_STAGES, DEFAULT_RECENT_ROWS, DEFAULT_MAX_TREES
+    )
+    parser.add_argument("delta", type=Path, help="Semicolon CSV of new records with Target")
+    parser.add_argument("--model", type=Path, default=MODEL_PATH,
+                        help="Model artifact to update (written back in place)")
+    parser.add_argument("--new-trees", type=int, default=DEFAULT_NEW_TREES,
+                        help="Trees added to the RandomForest")
+    parser.add_argument("--new-rounds", type=int, default=DEFAULT_NEW_STAGES,
+                        help="Boosting rounds added to the boosting member")
+    parser.add_argument("--recent-rows", type=int, default=DEFAULT_RECENT_ROWS,
+                        help="Most recent training rows fitted together with the delta")
+    parser.add_argument("--max-trees", type=int, default=DEFAULT_MAX_TREES,
+                        help="Forest size limit; the oldest trees are dropped (0: no limit)")
+    parser.add_argument("--compare-full", action="store_true",
+                        help="Also run a full retrain to measure time and macro-F1")
+    parser.add_argument("--if-drifted", action="store_true",
+                        help="Only update if the delta drifts from the training data "
+                             "(for scheduled runs)")
+
+
+def _drift_arguments(parser):
+    from defaults import MODEL_PATH, DRIFT_REPORT_PATH, PREDICT_CHUNK_SIZE
+    parser.add_argument("input", type=Path, help="CSV file of the new cohort")
+    parser.add_argument("-o", "--output", type=Path, default=DRIFT_REPORT_PATH,
+                        help="JSON report with PSI/KS per feature")
+    parser.add_argument("--model", type=Path, default=MODEL_PATH,
+                        help="Model artifact written by 'train' (holds the reference)")
+    parser.add_argument("--chunk-size", type=int, default=PREDICT_CHUNK_SIZE,
+                        help="Rows per chunk (bounds memory use)")
+
+
+def _export_arguments(parser):
+    from defaults import MODEL_PATH, COMPACT_MODEL_PATH, VALUE_BITS, DEFAULT_VALUE_BITS
+    parser.add_argument("--model", type=Path, default=MODEL_PATH,
+                        help="Model artifact written by 'train'")
+    parser.add_argument("-o", "--output", type=Path, default=COMPACT_MODEL_PATH,
+                        help="Compact model file")
+    parser.add_argument("--bits", type=int, choices=VALUE_BITS, default=DEFAULT_VALUE_BITS,
+                        help="Bits per quantized leaf value")
+    parser.add_argument("--prune-tolerance", type=float, default=None, metavar="TOL",
+                        help="Prune trees, depth and boosting stages while the macro-F1 on a "
+                             "validation slice of the training split drops by at most TOL "
+                             "(default: no pruning)")
+
+
+def _grid_axis(text):
+    """'COLUMN=V1,V2,...' -> (column, [values])"""
+    column, sep, values = text.rpartition("=")
+    try:
+        if not sep or not column:
+            raise ValueError
+        return column, [float(v) for v in values.split(",")]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected COLUMN=V1,V2,..., got {text!r}")
+
+
+def _whatif_arguments(parser):
+    from defaults import MODEL_PATH, WHAT_IF_TOP
+    parser.add_argument("input", type=Path, help="Semicolon CSV with the student")
+    parser.add_argument("--row", type=int, default=0, help="Row of the student in the CSV")
+    parser.add_argument("--set", type=_grid_axis, action="append", default=[],
+                        metavar="COLUMN=V1,V2", help="Absolute values to try for a column")
+    parser.add_argument("--add", type=_grid_axis, action="append", default=[],
+                        metavar="COLUMN=D1,D2", help="Changes of the student's value to try")
+    parser.add_argument("--top", type=int, default=WHAT_IF_TOP,
+                        help="Scenarios listed (lowest dropout risk first)")
+    parser.add_argument("--model", type=Path, default=MODEL_PATH,
+                        help="Model artifact written by 'train'")
+
+
+def _index_arguments(parser):
+    from defaults import (
+        MODEL_PATH, SIMILAR_INDEX_PATH, PREDICT_CHUNK_SIZE, INDEX_METHODS, DEFAULT_INDEX_METHOD,
+        DEFAULT_CANDIDATES
+    )
+    parser.add_argument("input", type=Path, nargs="?", default=None,
+                        help="Labeled semicolon CSV of historical students (default: data.csv)")
+    parser.add_argument("-o", "--output", type=Path, default=SIMILAR_INDEX_PATH,
+                        help="Index file")
+    parser.add_argument("--model", type=Path, default=MODEL_PATH,
+                        help="Model artifact whose feature transformer and scaler are used")
+    parser.add_argument("--method", choices=INDEX_METHODS, default=DEFAULT_INDEX_METHOD,
+                        help="KD-tree or exact blocked brute-force search")
+    parser.add_argument("--components", type=int, default=None,
+                        help="Random projection for the KD-tree (e.g. 24 for millions of "
+                             "students); candidates are re-ranked by exact distance")
+    parser.add_argument("--candidates", type=int, default=DEFAULT_CANDIDATES,
+                        help="Candidates per query re-ranked with --components")
+    parser.add_argument("--chunk-size", type=int, default=PREDICT_CHUNK_SIZE,
+                        help="Rows per chunk while reading the CSV")
+
+
+def _bench_arguments(parser):
+    from bench_startup import DEFAULT_REPEATS
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS,
+                        help="Cold starts per entry (the fastest counts)")
+    parser.add_argument("--only", nargs="+", metavar="NAME",
+                        help="Measure only these entries")
+
+
+# ═══════════════════════════════════════════════════════════════
+# SUBCOMMANDS (return the JSON payload)
+# ═══════════════════════════════════════════════════════════════
+
+def _train(args):
+    if args.streaming:
+        from dropout_prediction import main_streaming
+        results = main_streaming(args.data, args.chunk_size, args.epochs, args.model,
+                                 args.categorical)
+        return {"mode": "streaming", "model": str(args.model), **results["evaluation_metrics"]}
+    from dropout_prediction import main, run_summary
+    results = main(args.boosting, args.cv, args.cv_splits, args.cv_repeats, args.cv_jobs,
+                   use_cache=not args.no_cache, cache_max_bytes=args.cache_max_mb * 1024 * 1024,
+                   explain=not args.no_explain, calibration_method=args.calibration,
+                   calibrate=args.calibrate, calibration_splits=args.calibration_splits,
+                   explore=not (args.quiet or args.json))
+    return {"mode": "ensemble", "boosting": args.boosting, **run_summary(results)}
+
+
+def _predict(args):
+    from dropout_prediction import predict
+    start = time.perf_counter()
+    n_rows = predict(args.input, args.output, args.model, args.chunk_size, args.explain,
+                     args.similar, args.index)
+    return {"rows": n_rows, "output": str(args.output),
+            "seconds": round(time.perf_counter() - start, 3)}
+
+
+def _evaluate(args):
+    from dropout_prediction import evaluate_saved
+    results = evaluate_saved(args.input, args.model)
+    return {
+        "input": "test split" if args.input is None else str(args.input),
+        **results["evaluation_metrics"],
+        "per_class_metrics": results["per_class_metrics"],
+        "confusion_matrix": results["confusion_matrix"],
+    }
+
+
+def _retrain(args):
+    from dropout_prediction import main_retrain
+    report = main_retrain(args.delta, args.model, args.new_trees, args.new_rounds,
+                          args.recent_rows, args.max_trees, args.compare_full, args.if_drifted)
+    return {"updated": False} if report is None else {"updated": True, **report}
+
+
+def _drift(args):
+    from dropout_prediction import check_drift
+    report = check_drift(args.input, args.output, args.model, args.chunk_size)
+    return {key: report[key] for key in ("rows", "retrain_recommended", "drifted_features")}
+
+
+def _export(args):
+    from dropout_prediction import export_compact
+    return export_compact(args.model, args.output, args.prune_tolerance, args.bits)
+
+
+def _whatif(args):
+    from dropout_prediction import what_if
+    return what_if(args.input, args.row, dict(args.set), dict(args.add), args.model, args.top)
+
+
+def _index(args):
+    from dropout_prediction import build_similarity_index
+    return build_similarity_index(args.input, args.model, args.output, args.method,
+                                  args.components, args.candidates, args.chunk_size)
+
+
+def _bench(args):
+    from bench_startup import run, print_report
+    report = run(args.repeats, args.only)
+    print_report(report)
+    return report
+
+
+# name: (help, argument registration, run)
+COMMANDS = {
+    "train": ("Train, evaluate and persist the ensemble", _train_arguments, _train),
+    "predict": ("Score a semicolon CSV with the persisted ensemble", _predict_arguments, _predict),
+    "evaluate": ("Evaluate the persisted ensemble without retraining", _evaluate_arguments,
+                 _evaluate),
+    "retrain": ("Update the persisted ensemble with new labeled records (warm start)",
+                _retrain_arguments, _retrain),
+    "drift": ("Check a new cohort CSV for drift against the training data", _drift_arguments,
+              _drift),
+    "export": ("Write a compact quantized (optionally pruned) model file for scoring",
+               _export_arguments, _export),
+    "whatif": ("Dropout risk of one student under a grid of feature changes",
+               _whatif_arguments, _whatif),
+    "index": ("Build the similar-students index over a labeled CSV", _index_arguments, _index),
+    "bench": ("Measure the startup time of every subcommand against its import budget",
+              _bench_arguments, _bench),
+}
+DEFAULT_COMMAND = "train"
+
+
+def build_parser(command=None):
+    """Parser with all subcommands; only `command` gets its (import-heavy) arguments."""
+    parser = argparse.ArgumentParser(description=DESCRIPTION)
+    subparsers = parser.add_subparsers(dest="command")
+    output = _output_arguments()
+    for name, (help_text, add_arguments, _) in COMMANDS.items():
+        subparser = subparsers.add_parser(name, help=help_text, parents=[output])
+        if name == command:
+            add_arguments(subparser)
+    return parser
+
+
+def main(argv=None):
+    """Parse argv, run the subcommand; returns the process exit status."""
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if not argv or argv[0] not in COMMANDS and argv[0] not in ("-h", "--help"):
+        # No subcommand: train (options apply to it)
+        argv.insert(0, DEFAULT_COMMAND)
+    args = build_parser(argv[0]).parse_args(argv)
+
+    quiet = args.quiet or args.json
+    try:
+        with open(os.devnull, "w") as devnull, \
+                contextlib.redirect_stdout(devnull if quiet else sys.stdout):
+            payload = COMMANDS[args.command][2](args)
+    except Exception as e:
+        if not args.json:
+            raise
+        # Scripts parse stdout; the error is a JSON document like the outcome
+        print(json.dumps({"command": args.command, "error": str(e), "type": type(e).__name__},
+                         indent=2, ensure_ascii=False))
+        return 1
+
+    if args.json:
+        print(json.dumps({"command": args.command, **payload}, indent=2, ensure_ascii=False,
+                         default=str))
+    return 0 if payload.get("passed", True) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,506 @@
+"""
+Compact Model Format
+====================
+
+Small-footprint export of the soft-voting ensemble (RandomForest +
+GradientBoosting) for processes that only score: the pickled artifact holds
+every sklearn tree object and takes long to unpickle, this format is one
+flat file that is memory-mapped and evaluated in place.
+
+Per node (compare the float64/int32 arrays of compiled_trees.py):
+
+    feature    uint8    split feature (uint16 above 256 features)
+    threshold  float32  float32_floor of the split threshold; takes exactly
+                        sklearn's branches on float32 inputs
+    children   int16    [left, right] per node, relative to the tree root
+                        (int32 for trees above 32767 nodes)
+    values     RF: uint8/uint16 class fractions (fixed point, 1 / (2^bits - 1))
+               GB: int8/int16 leaf values with one scale per estimator
+
+Leaf values are the only lossy part. Optionally the ensemble is pruned:
+prune() finds, on validation rows, the smallest RandomForest (number of
+trees, maximum depth) and the fewest boosting stages whose macro-F1 is at
+most `tolerance` below the unpruned model, and truncate() cuts an ensemble
+to such sizes. All candidates of one dimension are scored in one pass
+(cumulative sums over trees and stages, one bincount of confusion matrices).
+Depth pruning applies to the forest only: its inner nodes store the class
+fractions of their samples, while boosting inner nodes have no line-search
+leaf values.
+
+File layout: 8-byte magic, uint64 header length, JSON header (estimator
+metadata and the dtype/shape/offset of every array), then the arrays, each
+aligned to 64 bytes. The small preprocessing objects (scaler, feature
+transformer, label encoder, decision rule) are one pickled byte array.
+load() maps the file read-only and wraps the arrays without copying.
+"""
+
+import json
+import pickle
+
+import numpy as np
+
+from compiled_trees import CompiledEnsemble, CompiledForest, CompiledBoosting
+from defaults import VALUE_BITS, DEFAULT_VALUE_BITS
+from metrics import confusion_matrices, metrics_from_confusion
+
+MAGIC = b"DRPCMPT1"
+ALIGNMENT = 64
+
+# Rows evaluated per block; bounds the (n_trees, block) node index arrays
+DEFAULT_BLOCK_SIZE = 256
+
+# Lower bounds of prune(): a few hundred validation rows cannot tell a stump
+# forest from the full one, and such a model does not generalize
+MIN_TREE_FRACTION = 0.25
+MIN_DEPTH = 6
+MIN_STAGE_FRACTION = 0.25
+
+
+def _index_dtype(max_value):
+    return np.int16 if max_value <= np.iinfo(np.int16).max else np.int32
+
+
+def node_depths(children, roots, n_nodes):
+    """Depth of every node (root: 0), children being root-relative [left, right] pairs."""
+    depth = np.zeros(n_nodes, dtype=np.int32)
+    tree_roots = roots.astype(np.intp)
+    frontier, frontier_roots, level = tree_roots, tree_roots, 0
+    while len(frontier):
+        depth[frontier] = level
+        left = children[2 * frontier].astype(np.intp) + frontier_roots
+        right = children[2 * frontier + 1].astype(np.intp) + frontier_roots
+        inner = left != frontier
+        frontier = np.concatenate([left[inner], right[inner]])
+        frontier_roots = np.concatenate([frontier_roots[inner], frontier_roots[inner]])
+        level += 1
+    return depth
+
+
+class CompactTrees:
+    """Concatenated trees with narrow dtypes; children are relative to each tree's root."""
+
+    def __init__(self, feature, threshold, children, roots, values, max_depth, missing_left=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.roots = roots
+        self.values = values
+        self.max_depth = max_depth
+        self.missing_left = missing_left
+
+    @classmethod
+    def from_flat(cls, flat, values):
+        """Compact compiled_trees.FlatTrees with already quantized per-node values."""
+        n_nodes = len(flat.feature)
+        tree_root = np.repeat(flat.roots, np.diff(np.append(flat.roots, n_nodes)))
+        children = np.column_stack([flat.left - tree_root, flat.right - tree_root]).ravel()
+        feature_dtype = np.uint8 if flat.feature.max(initial=0) < 256 else np.uint16
+        return cls(
+            feature=flat.feature.astype(feature_dtype),
+            threshold=flat.threshold32,
+            children=children.astype(_index_dtype(children.max(initial=0))),
+            roots=flat.roots.astype(np.int32),
+            values=values,
+            max_depth=int(flat.max_depth),
+            missing_left=flat.missing_left if flat.has_missing_left else None,
+        )
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    def depths(self):
+        return node_depths(self.children, self.roots, self.n_nodes)
+
+    def nodes_per_tree(self, depth):
+        """Node counts of every tree up to every depth: shape (n_trees, max_depth + 1)."""
+        tree = np.repeat(np.arange(self.n_trees), np.diff(np.append(self.roots, self.n_nodes)))
+        counts = np.zeros((self.n_trees, self.max_depth + 1), dtype=np.int64)
+        np.add.at(counts, (tree, depth), 1)
+        return counts.cumsum(axis=1)
+
+    def truncate(self, n_trees, max_depth=None, depth=None):
+        """The first n_trees trees, cut at max_depth (nodes at that depth become leaves)."""
+        max_depth = self.max_depth if max_depth is None else max_depth
+        if depth is None:
+            depth = self.depths()
+        end = self.roots[n_trees] if n_trees < self.n_trees else self.n_nodes
+        keep = depth[:end] <= max_depth
+        new_index = np.cumsum(keep) - 1
+
+        old = np.flatnonzero(keep)
+        old_root = np.repeat(self.roots[:n_trees], np.diff(np.append(self.roots[:n_trees], end)))[old]
+        new_root = new_index[old_root]
+        children = self.children.reshape(-1, 2)[old].astype(np.intp) + old_root[:, None]
+        is_leaf = (children[:, 0] == old) | (depth[old] == max_depth)
+        children = np.where(is_leaf[:, None], new_index[old][:, None], new_index[children])
+        children -= new_root[:, None]
+
+        return CompactTrees(
+            feature=self.feature[old],
+            threshold=self.threshold[old],
+            children=children.ravel().astype(self.children.dtype),
+            roots=new_index[self.roots[:n_trees]].astype(np.int32),
+            values=self.values[old],
+            max_depth=int(min(max_depth, depth[old].max(initial=0))),
+            missing_left=None if self.missing_left is None else self.missing_left[old],
+        )
+
+    def apply(self, X, max_depth=None):
+        """
+        Node reached by every (tree, row) after max_depth levels: shape (n_trees, n_rows).
+
+        X must be a float32 array. Same branches as compiled_trees.FlatTrees.apply;
+        with a smaller max_depth the walk stops at inner nodes of that depth.
+        """
+        n_rows, n_features = X.shape
+        X_flat = np.ascontiguousarray(X).ravel()
+        row_base = np.arange(n_rows, dtype=np.intp) * n_features
+        roots = self.roots.astype(np.intp)[:, None]
+
+        nodes = np.zeros((self.n_trees, n_rows), dtype=np.intp)
+        for _ in range(self.max_depth if max_depth is None else max_depth):
+            nodes += roots
+            x = X_flat[self.feature[nodes] + row_base]
+            go_left = x <= self.threshold[nodes]
+            if self.missing_left is not None:
+                go_left |= np.isnan(x) & self.missing_left[nodes]
+            # children holds [left, right] per node: index 2 * node + (not go_left)
+            nodes = self.children[2 * nodes + 1 - go_left].astype(np.intp)
+        return nodes + roots
+
+    def arrays(self):
+        arrays = {"feature": self.feature, "threshold": self.threshold,
+                  "children": self.children, "roots": self.roots, "values": self.values}
+        if self.missing_left is not None:
+            arrays["missing_left"] = self.missing_left
+        return arrays
+
+
+class CompactForest:
+    """RandomForest with fixed-point class fractions."""
+
+    kind = 'rf'
+
+    def __init__(self, trees, scale):
+        self.trees = trees
+        self.scale = scale
+
+    @classmethod
+    def from_compiled(cls, compiled, value_bits=DEFAULT_VALUE_BITS):
+        levels = 2 ** value_bits - 1
+        values = np.rint(compiled.trees.values * levels).astype(np.uint8 if value_bits == 8 else np.uint16)
+        return cls(CompactTrees.from_flat(compiled.trees, values), 1.0 / levels)
+
+    def tree_proba(self, X, max_depth=None):
+        """Class fractions per tree: shape (n_trees, n_rows, n_classes), fixed point."""
+        return self.trees.values[self.trees.apply(X, max_depth)]
+
+    def predict_proba(self, X):
+        summed = self.tree_proba(X).sum(axis=0, dtype=np.int64)
+        return summed * (self.scale / self.trees.n_trees)
+
+    def truncated(self, n_trees, max_depth=None, depth=None):
+        return CompactForest(self.trees.truncate(n_trees, max_depth, depth), self.scale)
+
+    def meta(self):
+        return {"kind": self.kind, "scale": self.scale, "max_depth": self.trees.max_depth}
+
+    @classmethod
+    def from_meta(cls, meta, trees):
+        return cls(trees, meta["scale"])
+
+
+class CompactBoosting:
+    """Multiclass GradientBoosting with integer leaf values and one scale."""
+
+    kind = 'gb'
+
+    def __init__(self, trees, scale, init_raw, learning_rate, n_classes):
+        self.trees = trees
+        self.scale = scale
+        self.init_raw = np.asarray(init_raw, dtype=np.float64)
+        self.learning_rate = learning_rate
+        self.n_classes = n_classes
+
+    @classmethod
+    def from_compiled(cls, compiled, value_bits=DEFAULT_VALUE_BITS):
+        levels = 2 ** (value_bits - 1) - 1
+        scale = max(float(np.abs(compiled.trees.values).max(initial=0)), 1e-12) / levels
+        values = np.rint(compiled.trees.values / scale).astype(np.int8 if value_bits == 8 else np.int16)
+        return cls(CompactTrees.from_flat(compiled.trees, values), scale, compiled.init_raw,
+                   compiled.learning_rate, compiled.n_classes)
+
+    @property
+    def n_stages(self):
+        return self.trees.n_trees // self.n_classes
+
+    def stage_raw(self, X):
+        """Summed integer leaf values per stage: shape (n_stages, n_classes, n_rows)."""
+        leaves = self.trees.apply(X)
+        return self.trees.values[leaves].astype(np.int64).reshape(self.n_stages, self.n_classes, -1)
+
+    def proba_from_raw(self, summed):
+        """Class probabilities from summed integer leaf values of shape (..., n_classes, n_rows)."""
+        raw = self.init_raw[:, None] + (self.learning_rate * self.scale) * summed
+        raw = np.swapaxes(raw, -1, -2)
+        raw = raw - raw.max(axis=-1, keepdims=True)
+        np.exp(raw, out=raw)
+        return raw / raw.sum(axis=-1, keepdims=True)
+
+    def predict_proba(self, X):
+        return self.proba_from_raw(self.stage_raw(X).sum(axis=0))
+
+    def truncated(self, n_stages):
+        return CompactBoosting(self.trees.truncate(n_stages * self.n_classes), self.scale,
+                               self.init_raw, self.learning_rate, self.n_classes)
+
+    def meta(self):
+        return {"kind": self.kind, "scale": self.scale, "max_depth": self.trees.max_depth,
+                "init_raw": self.init_raw.tolist(), "learning_rate": self.learning_rate,
+                "n_classes": self.n_classes}
+
+    @classmethod
+    def from_meta(cls, meta, trees):
+        return cls(trees, meta["scale"], meta["init_raw"], meta["learning_rate"], meta["n_classes"])
+
+
+_COMPACT_KINDS = {cls.kind: cls for cls in (CompactForest, CompactBoosting)}
+
+
+class CompactEnsemble:
+    """Soft-voting ensemble of compact base estimators (predict_proba on scaled features)."""
+
+    def __init__(self, estimators, weights=None, block_size=DEFAULT_BLOCK_SIZE):
+        self.estimators = estimators
+        self.weights = weights
+        self.block_size = block_size
+
+    @classmethod
+    def from_compiled(cls, compiled, value_bits=DEFAULT_VALUE_BITS):
+        """Quantize a compiled_trees.CompiledEnsemble."""
+        if value_bits not in VALUE_BITS:
+            raise ValueError(f"value_bits must be one of {VALUE_BITS}")
+        estimators = []
+        for est in compiled.estimators:
+            if isinstance(est, CompiledForest):
+                estimators.append(CompactForest.from_compiled(est, value_bits))
+            elif isinstance(est, CompiledBoosting):
+                estimators.append(CompactBoosting.from_compiled(est, value_bits))
+            else:
+                raise TypeError(f"Cannot compact {type(est).__name__}")
+        return cls(estimators, compiled.weights)
+
+    @classmethod
+    def from_voting(cls, ensemble, value_bits=DEFAULT_VALUE_BITS):
+        return cls.from_compiled(CompiledEnsemble.from_voting(ensemble), value_bits)
+
+    @property
+    def n_nodes(self):
+        return sum(est.trees.n_nodes for est in self.estimators)
+
+    def _predict_block(self, X):
+        probas = np.asarray([est.predict_proba(X) for est in self.estimators])
+        return np.average(probas, axis=0, weights=self.weights)
+
+    def predict_proba(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        if X.shape[0] <= self.block_size:
+            return self._predict_block(X)
+        return np.concatenate([self._predict_block(X[start:start + self.block_size])
+                               for start in range(0, X.shape[0], self.block_size)])
+
+    def save(self, path, objects=None):
+        """
+        Write the ensemble (and optionally small picklable objects) to one file.
+
+        Returns the file size in bytes.
+        """
+        arrays, estimators = {}, []
+        for i, est in enumerate(self.estimators):
+            estimators.append(est.meta())
+            arrays.update({f"est{i}_{name}": a for name, a in est.trees.arrays().items()})
+        if objects is not None:
+            arrays["objects"] = np.frombuffer(pickle.dumps(objects), dtype=np.uint8)
+
+        layout, offset = {}, 0
+        for name, a in arrays.items():
+            layout[name] = {"dtype": a.dtype.str, "shape": list(a.shape), "offset": offset}
+            offset += -(-a.nbytes // ALIGNMENT) * ALIGNMENT
+        header = json.dumps({"estimators": estimators, "weights": self.weights,
+                             "arrays": layout}).encode("utf-8")
+        # Arrays start at the next aligned offset after magic, length and header
+        data_start = -(-(len(MAGIC) + 8 + len(header)) // ALIGNMENT) * ALIGNMENT
+
+        with open(path, "wb") as f:
+            f.write(MAGIC)
+            f.write(np.uint64(len(header)).tobytes())
+            f.write(header)
+            for name, a in arrays.items():
+                f.seek(data_start + layout[name]["offset"])
+                f.write(np.ascontiguousarray(a).tobytes())
+            f.truncate(data_start + offset)
+        return data_start + offset
+
+
+def load(path, block_size=DEFAULT_BLOCK_SIZE):
+    """
+    Map a compact model file; returns (CompactEnsemble, objects or None).
+
+    The node arrays are read-only views of the mapping (no copy); pages are
+    read from disk when a prediction first touches them.
+    """
+    mapping = np.memmap(path, dtype=np.uint8, mode="r")
+    if bytes(mapping[:len(MAGIC)]) != MAGIC:
+        raise ValueError(f"{path} is not a compact model file")
+    header_length = int(mapping[len(MAGIC):len(MAGIC) + 8].view(np.uint64)[0])
+    header_end = len(MAGIC) + 8 + header_length
+    header = json.loads(bytes(mapping[len(MAGIC) + 8:header_end]))
+    data_start = -(-header_end // ALIGNMENT) * ALIGNMENT
+
+    def array(name):
+        spec = header["arrays"][name]
+        return np.ndarray(spec["shape"], dtype=np.dtype(spec["dtype"]), buffer=mapping,
+                          offset=data_start + spec["offset"])
+
+    estimators = []
+    for i, meta in enumerate(header["estimators"]):
+        prefix = f"est{i}_"
+        trees = CompactTrees(
+            feature=array(prefix + "feature"), threshold=array(prefix + "threshold"),
+            children=array(prefix + "children"), roots=array(prefix + "roots"),
+            values=array(prefix + "values"), max_depth=meta["max_depth"],
+            missing_left=(array(prefix + "missing_left")
+                          if prefix + "missing_left" in header["arrays"] else None),
+        )
+        estimators.append(_COMPACT_KINDS[meta["kind"]].from_meta(meta, trees))
+    objects = pickle.loads(bytes(array("objects"))) if "objects" in header["arrays"] else None
+    return CompactEnsemble(estimators, header["weights"], block_size), objects
+
+
+def is_compact(path):
+    """True if path is a compact model file (checked by its magic bytes)."""
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def load_artifact(path, block_size=DEFAULT_BLOCK_SIZE):
+    """A compact file as a scoring artifact: {"model": CompactEnsemble, **saved objects}."""
+    model, objects = load(path, block_size)
+    return {"model": model, **(objects or {})}
+
+
+# ═══════════════════════════════════════════════════════════════
+# PRUNING ON HELD-OUT ROWS
+# ═══════════════════════════════════════════════════════════════
+
+def _macro_f1(probas, y, decision):
+    """Macro-F1 of every candidate in probas (shape (n_candidates, n_rows, n_classes))."""
+    n_candidates, n_rows, n_classes = probas.shape
+    flat = probas.reshape(-1, n_classes)
+    y_pred = flat.argmax(axis=1) if decision is None else decision.predict(flat)
+    cm = confusion_matrices(np.tile(y, n_candidates), y_pred,
+                            np.repeat(np.arange(n_candidates), n_rows), n_candidates, n_classes)
+    return metrics_from_confusion(cm)["macro_f1_score"]
+
+
+def _weighted(probas, weights):
+    """Soft vote of candidate-stacked member probabilities [(n_candidates, n_rows, K), ...]."""
+    weights = np.ones(len(probas)) if weights is None else np.asarray(weights, dtype=np.float64)
+    return sum(w * p for w, p in zip(weights, probas)) / weights.sum()
+
+
+def _members(ensemble):
+    """Positions of the one forest and the one boosting member."""
+    forests = [i for i, est in enumerate(ensemble.estimators) if est.kind == 'rf']
+    boosters = [i for i, est in enumerate(ensemble.estimators) if est.kind == 'gb']
+    if len(forests) != 1 or len(boosters) != 1:
+        raise ValueError("Pruning expects one forest and one boosting member")
+    return forests[0], boosters[0]
+
+
+def truncate(ensemble, rf_trees, rf_max_depth, gb_stages):
+    """The ensemble with its forest cut to rf_trees trees of rf_max_depth and gb_stages stages."""
+    forest, booster = _members(ensemble)
+    estimators = list(ensemble.estimators)
+    estimators[forest] = estimators[forest].truncated(rf_trees, rf_max_depth)
+    estimators[booster] = estimators[booster].truncated(gb_stages)
+    return CompactEnsemble(estimators, ensemble.weights, ensemble.block_size)
+
+
+def prune(ensemble, X, y, tolerance, decision=None):
+    """
+    Smallest forest (trees, depth) and boosting (stages) within `tolerance` macro-F1.
+
+    Every candidate is scored against the unpruned ensemble: forest sizes
+    (with the full boosting) may use half the tolerance, the number of
+    stages (with the chosen forest) the rest, so the combined configuration
+    stays within `tolerance`. Sizes never go below MIN_TREE_FRACTION of the
+    trees, MIN_DEPTH and MIN_STAGE_FRACTION of the stages.
+
+    X are scaled rows the ensemble was not fitted on, y their labels;
+    decision is the model's DecisionRule (calibration.py) or None for
+    argmax. Returns the pruned CompactEnsemble and a report of the chosen
+    sizes and scores on these rows (biased if they are also the reported
+    test rows: score the result on other rows).
+    """
+    X = np.asarray(X, dtype=np.float32)
+    forest, booster = _members(ensemble)
+    rf, gb = ensemble.estimators[forest], ensemble.estimators[booster]
+    order = [forest, booster]
+    weights = None if ensemble.weights is None else [ensemble.weights[i] for i in order]
+
+    gb_stages = gb.stage_raw(X)
+    gb_full = gb.proba_from_raw(gb_stages.sum(axis=0))
+    base_f1 = float(_macro_f1(_weighted([rf.predict_proba(X)[None], gb_full[None]], weights),
+                              y, decision)[0])
+    floor = base_f1 - tolerance
+
+    # Forest: every (depth, number of trees) in one cumulative sum per depth
+    depth = rf.trees.depths()
+    nodes = rf.trees.nodes_per_tree(depth).cumsum(axis=0)    # (n_trees, depth + 1)
+    best = (rf.trees.n_trees, rf.trees.max_depth, int(nodes[-1, -1]), base_f1)
+    n_trees = np.arange(1, rf.trees.n_trees + 1)
+    min_trees = max(1, int(np.ceil(MIN_TREE_FRACTION * rf.trees.n_trees)))
+    for max_depth in range(rf.trees.max_depth, min(MIN_DEPTH, rf.trees.max_depth) - 1, -1):
+        summed = rf.tree_proba(X, max_depth).cumsum(axis=0, dtype=np.int64)
+        rf_proba = summed * (rf.scale / n_trees[:, None, None])
+        scores = _macro_f1(_weighted([rf_proba, gb_full[None]], weights), y, decision)
+        sizes = nodes[:, max_depth]
+        for k in np.flatnonzero(scores >= base_f1 - tolerance / 2):
+            if k + 1 >= min_trees and sizes[k] < best[2]:
+                best = (int(k) + 1, max_depth, int(sizes[k]), float(scores[k]))
+    rf_trees, rf_depth, _, _ = best
+    pruned_rf = rf.truncated(rf_trees, rf_depth, depth)
+
+    # Boosting: every number of stages from the cumulative stage sums, scored
+    # together with the pruned forest against the unpruned ensemble
+    gb_proba = gb.proba_from_raw(gb_stages.cumsum(axis=0))
+    min_stages = max(1, int(np.ceil(MIN_STAGE_FRACTION * gb.n_stages)))
+    scores = _macro_f1(_weighted([pruned_rf.predict_proba(X)[None], gb_proba], weights),
+                       y, decision)
+    passing = np.flatnonzero(scores[min_stages - 1:] >= floor)
+    if len(passing):
+        n_stages = int(passing[0]) + min_stages
+    else:
+        # No stage count keeps the pruned forest within the tolerance: keep both whole
+        rf_trees, pruned_rf, n_stages = rf.trees.n_trees, rf, gb.n_stages
+    pruned_gb = gb.truncated(n_stages)
+
+    estimators = list(ensemble.estimators)
+    estimators[forest], estimators[booster] = pruned_rf, pruned_gb
+    pruned = CompactEnsemble(estimators, ensemble.weights, ensemble.block_size)
+    final_f1 = float(_macro_f1(pruned.predict_proba(X)[None], y, decision)[0])
+    return pruned, {
+        "tolerance": tolerance,
+        "macro_f1_before": round(base_f1, 4),
+        "macro_f1_after": round(final_f1, 4),
+        "rf_trees": [rf.trees.n_trees, rf_trees],
+        "rf_max_depth": [rf.trees.max_depth, pruned_rf.trees.max_depth],
+        "gb_stages": [gb.n_stages, n_stages],
+        "nodes": [ensemble.n_nodes, pruned.n_nodes],
+    }
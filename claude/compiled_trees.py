@@ -0,0 +1,347 @@
+"""
+Compiled Tree Ensemble
+======================
+
+Flattens the fitted soft-voting ensemble (RandomForest + GradientBoosting)
+into contiguous node arrays and evaluates all trees at once with NumPy.
+
+sklearn's predict_proba walks every tree separately through per-estimator
+Python calls (200 RF trees, 150 x 3 GB trees), which dominates latency for
+small batches. Here each base estimator becomes one FlatTrees block:
+
+    feature    int32   split feature per node (0 for leaves)
+    threshold  float64 split threshold per node
+    left/right int32   global child indices (leaves point to themselves)
+    missing_left bool  NaN goes to the left child
+    roots      int32   root node of every tree
+    values     float64 leaf payload (RF: class fractions, GB: raw value)
+
+Traversal advances the current node of every (tree, row) pair one level per
+step, so the number of NumPy operations depends on the tree depth, not on
+the number of trees or rows.
+
+Probabilities are bit-identical to ensemble.predict_proba: inputs are cast to
+float32 like sklearn does, and all sums are accumulated in sklearn's order.
+"""
+
+import numpy as np
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+
+TREE_LEAF = -1
+
+# Rows evaluated per block; bounds the (n_trees, block) node index arrays
+DEFAULT_BLOCK_SIZE = 256
+
+
+def float32_floor(values):
+    """
+    Largest float32 <= each float64 value.
+
+    For a float32 input x, `x <= t` (compared in float64, as sklearn does)
+    is equivalent to `x <= float32_floor(t)` compared in float32, so the
+    traversal can stay in float32 without changing a single split decision.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    rounded = values.astype(np.float32)
+    too_high = rounded.astype(np.float64) > values
+    rounded[too_high] = np.nextafter(rounded[too_high], np.float32(-np.inf))
+    return rounded
+
+
+class FlatTrees:
+    """A list of fitted sklearn trees stored as concatenated node arrays."""
+
+    def __init__(self, feature, threshold, left, right, missing_left, roots, values, max_depth):
+        self.feature = feature.astype(np.intp)
+        self.threshold = threshold
+        self.threshold32 = float32_floor(threshold)
+        self.left = left
+        self.right = right
+        # Interleaved [left, right] children for a single gather per level
+        self.children = np.column_stack([left, right]).astype(np.intp).ravel()
+        self.missing_left = missing_left
+        self.roots = roots
+        self.values = values
+        self.max_depth = max_depth
+        self.has_missing_left = bool(missing_left.any())
+
+    @classmethod
+    def from_trees(cls, trees, value_fn):
+        """
+        Concatenate sklearn Tree objects (estimator.tree_).
+
+        value_fn(tree) returns the per-node payload stored for leaves.
+        """
+        features, thresholds, lefts, rights, missing, values, roots = [], [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for tree in trees:
+            n = tree.node_count
+            is_leaf = tree.children_left == TREE_LEAF
+            own = np.arange(offset, offset + n)
+
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(tree.threshold)
+            lefts.append(np.where(is_leaf, own, tree.children_left + offset))
+            rights.append(np.where(is_leaf, own, tree.children_right + offset))
+            if hasattr(tree, 'missing_go_to_left'):
+                missing.append(tree.missing_go_to_left.astype(bool) & ~is_leaf)
+            else:
+                missing.append(np.zeros(n, dtype=bool))
+            values.append(value_fn(tree))
+            roots.append(offset)
+
+            offset += n
+            max_depth = max(max_depth, tree.max_depth)
+
+        return cls(
+            feature=np.concatenate(features).astype(np.int32),
+            threshold=np.concatenate(thresholds).astype(np.float64),
+            left=np.concatenate(lefts).astype(np.int32),
+            right=np.concatenate(rights).astype(np.int32),
+            missing_left=np.concatenate(missing),
+            roots=np.asarray(roots, dtype=np.int32),
+            values=np.ascontiguousarray(np.concatenate(values)),
+            max_depth=max_depth,
+        )
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def apply(self, X, roots=None):
+        """
+        Leaf index of every tree for every row: shape (n_trees, n_rows).
+
+        X must be a float32 array. Thresholds are rounded down to float32
+        (float32_floor), which takes exactly the same branches as sklearn's
+        float64 comparison. roots restricts the traversal to a subset of the
+        trees (rows of the result in the order of roots).
+        """
+        n_rows, n_features = X.shape
+        X_flat = np.ascontiguousarray(X).ravel()
+        row_base = np.arange(n_rows, dtype=np.intp) * n_features
+        roots = self.roots if roots is None else roots
+
+        # Preallocated per-level buffers, reused for every level
+        nodes = np.repeat(np.asarray(roots, dtype=np.intp)[:, None], n_rows, axis=1)
+        next_nodes = np.empty_like(nodes)
+        index = np.empty_like(nodes)
+        x = np.empty(nodes.shape, dtype=np.float32)
+        threshold = np.empty(nodes.shape, dtype=np.float32)
+        go_left = np.empty(nodes.shape, dtype=bool)
+
+        for _ in range(self.max_depth):
+            np.take(self.feature, nodes, out=index)
+            index += row_base
+            np.take(X_flat, index, out=x)
+            np.take(self.threshold32, nodes, out=threshold)
+            np.less_equal(x, threshold, out=go_left)
+            if self.has_missing_left:
+                go_left |= np.isnan(x) & self.missing_left[nodes]
+            # children holds [left, right] per node: index 2 * node + (not go_left)
+            nodes *= 2
+            nodes += 1
+            nodes -= go_left
+            np.take(self.children, nodes, out=next_nodes)
+            nodes, next_nodes = next_nodes, nodes
+        return nodes
+
+    def split_features(self, n_features):
+        """Features every tree splits on at any node: bool (n_trees, n_features)."""
+        node = np.arange(len(self.feature))
+        tree = np.searchsorted(self.roots, node, side='right') - 1
+        inner = self.left != node
+        uses = np.zeros((self.n_trees, n_features), dtype=bool)
+        uses[tree[inner], self.feature[inner]] = True
+        return uses
+
+    def path_features(self, x):
+        """
+        Features split on along the decision path of one float32 row.
+
+        Returns (leaves, uses): the leaf of every tree and a bool array
+        (n_trees, n_features); a tree's leaf can only change if a feature it
+        uses for this row changes.
+        """
+        uses = np.zeros((self.n_trees, len(x)), dtype=bool)
+        trees = np.arange(self.n_trees)
+        nodes = self.roots.astype(np.intp)
+        for _ in range(self.max_depth):
+            inner = self.left[nodes] != nodes
+            feature = self.feature[nodes]
+            uses[trees[inner], feature[inner]] = True
+            value = x[feature]
+            go_left = value <= self.threshold32[nodes]
+            if self.has_missing_left:
+                go_left |= np.isnan(value) & self.missing_left[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return nodes, uses
+
+    def to_arrays(self, prefix):
+        """Arrays for np.savez, keys prefixed with `prefix`."""
+        return {
+            f'{prefix}_feature': self.feature.astype(np.int32),
+            f'{prefix}_threshold': self.threshold,
+            f'{prefix}_left': self.left,
+            f'{prefix}_right': self.right,
+            f'{prefix}_missing_left': self.missing_left,
+            f'{prefix}_roots': self.roots,
+            f'{prefix}_values': self.values,
+            f'{prefix}_max_depth': np.asarray(self.max_depth),
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays, prefix):
+        return cls(
+            feature=arrays[f'{prefix}_feature'],
+            threshold=arrays[f'{prefix}_threshold'],
+            left=arrays[f'{prefix}_left'],
+            right=arrays[f'{prefix}_right'],
+            missing_left=arrays[f'{prefix}_missing_left'],
+            roots=arrays[f'{prefix}_roots'],
+            values=arrays[f'{prefix}_values'],
+            max_depth=int(arrays[f'{prefix}_max_depth']),
+        )
+
+
+class CompiledForest:
+    """RandomForestClassifier.predict_proba on flat arrays."""
+
+    kind = 'rf'
+
+    def __init__(self, trees):
+        self.trees = trees
+
+    @classmethod
+    def from_estimator(cls, rf):
+        # sklearn stores per-leaf class fractions in tree_.value
+        trees = [e.tree_ for e in rf.estimators_]
+        return cls(FlatTrees.from_trees(trees, lambda t: t.value[:, 0, :]))
+
+    def predict_proba(self, X):
+        leaves = self.trees.apply(X)
+        proba = np.zeros((X.shape[0], self.trees.values.shape[1]), dtype=np.float64)
+        # Sequential accumulation in tree order, like sklearn's forest
+        for tree_leaves in leaves:
+            proba += self.trees.values[tree_leaves]
+        proba /= self.trees.n_trees
+        return proba
+
+    def to_arrays(self, prefix):
+        return self.trees.to_arrays(prefix)
+
+    @classmethod
+    def from_arrays(cls, arrays, prefix):
+        return cls(FlatTrees.from_arrays(arrays, prefix))
+
+
+class CompiledBoosting:
+    """Multiclass GradientBoostingClassifier.predict_proba on flat arrays."""
+
+    kind = 'gb'
+
+    def __init__(self, trees, init_raw, learning_rate, n_classes):
+        self.trees = trees
+        self.init_raw = init_raw
+        self.learning_rate = learning_rate
+        self.n_classes = n_classes
+
+    @classmethod
+    def from_estimator(cls, gb, n_features):
+        if gb.n_trees_per_iteration_ < 3:
+            raise TypeError("Only multiclass (>= 3 classes) boosting can be compiled")
+        # Stage-major order (stage 0: class 0..K-1, stage 1: ...), as in predict_stages
+        trees = [e.tree_ for e in gb.estimators_.ravel()]
+        flat = FlatTrees.from_trees(trees, lambda t: t.value[:, 0, 0])
+        # The init estimator predicts the class prior, the same raw row for every sample
+        init_raw = gb._raw_predict_init(np.zeros((1, n_features), dtype=np.float32))[0]
+        return cls(flat, init_raw, float(gb.learning_rate), gb.n_trees_per_iteration_)
+
+    def decision_function(self, X):
+        leaves = self.trees.apply(X)
+        raw = np.tile(self.init_raw, (X.shape[0], 1))
+        scale = self.learning_rate
+        for t, tree_leaves in enumerate(leaves):
+            raw[:, t % self.n_classes] += scale * self.trees.values[tree_leaves]
+        return raw
+
+    def predict_proba(self, X):
+        # Same operations as sklearn.utils.extmath.softmax
+        raw = self.decision_function(X)
+        raw -= raw.max(axis=1).reshape(-1, 1)
+        np.exp(raw, out=raw)
+        raw /= raw.sum(axis=1).reshape(-1, 1)
+        return raw
+
+    def to_arrays(self, prefix):
+        arrays = self.trees.to_arrays(prefix)
+        arrays[f'{prefix}_init_raw'] = self.init_raw
+        arrays[f'{prefix}_learning_rate'] = np.asarray(self.learning_rate)
+        arrays[f'{prefix}_n_classes'] = np.asarray(self.n_classes)
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays, prefix):
+        return cls(FlatTrees.from_arrays(arrays, prefix),
+                   arrays[f'{prefix}_init_raw'],
+                   float(arrays[f'{prefix}_learning_rate']),
+                   int(arrays[f'{prefix}_n_classes']))
+
+
+_COMPILED_KINDS = {cls.kind: cls for cls in (CompiledForest, CompiledBoosting)}
+
+
+class CompiledEnsemble:
+    """Soft-voting ensemble of compiled base estimators."""
+
+    def __init__(self, estimators, weights=None, block_size=DEFAULT_BLOCK_SIZE):
+        self.estimators = estimators
+        self.weights = weights
+        self.block_size = block_size
+
+    @classmethod
+    def from_voting(cls, ensemble):
+        """Compile a fitted soft VotingClassifier of RF/GB estimators."""
+        if ensemble.voting != 'soft':
+            raise ValueError("Only soft voting can be compiled")
+        n_features = ensemble.n_features_in_
+        estimators = []
+        for est in ensemble.estimators_:
+            if isinstance(est, RandomForestClassifier):
+                estimators.append(CompiledForest.from_estimator(est))
+            elif isinstance(est, GradientBoostingClassifier):
+                estimators.append(CompiledBoosting.from_estimator(est, n_features))
+            else:
+                raise TypeError(f"Cannot compile {type(est).__name__}")
+        return cls(estimators, ensemble.weights)
+
+    def _predict_block(self, X):
+        probas = np.asarray([est.predict_proba(X) for est in self.estimators])
+        # Same reduction as VotingClassifier.predict_proba
+        return np.average(probas, axis=0, weights=self.weights)
+
+    def predict_proba(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        if X.shape[0] <= self.block_size:
+            return self._predict_block(X)
+        return np.concatenate([self._predict_block(X[start:start + self.block_size])
+                               for start in range(0, X.shape[0], self.block_size)])
+
+    def save(self, path):
+        """Write all node arrays to one .npz file."""
+        arrays = {'kinds': np.asarray([est.kind for est in self.estimators])}
+        if self.weights is not None:
+            arrays['weights'] = np.asarray(self.weights, dtype=np.float64)
+        for i, est in enumerate(self.estimators):
+            arrays.update(est.to_arrays(f'est{i}'))
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load(cls, path, block_size=DEFAULT_BLOCK_SIZE):
+        with np.load(path) as arrays:
+            arrays = dict(arrays)
+        estimators = [_COMPILED_KINDS[str(kind)].from_arrays(arrays, f'est{i}')
+                      for i, kind in enumerate(arrays['kinds'])]
+        weights = arrays['weights'].tolist() if 'weights' in arrays else None
+        return cls(estimators, weights, block_size)
@@ -0,0 +1,196 @@
+"""
+Repeated Cross-Validation
+=========================
+
+Repeated stratified K-fold evaluation of the full model (scaler + ensemble),
+so the reported macro-F1 comes with its split-to-split variance instead of
+resting on a single 20% holdout.
+
+- Folds are fitted in a process pool. The feature matrix and labels are
+  written once to .npy files and memory-mapped by every worker, so they are
+  never pickled into tasks; a task is just a fold number.
+- Workers run single-threaded (n_jobs=1, BLAS/OpenMP limited to one thread)
+  so the pool does not oversubscribe the cores.
+- Workers return only the predictions for their test rows. Confusion
+  matrices of all folds come from one bincount, all metrics from one
+  vectorized pass (metrics.py).
+- Confidence intervals bootstrap the test rows of every fold (as multinomial
+  draws on the confusion matrices) and take percentiles of the across-fold
+  mean, again for all folds and resamples at once.
+
+out_of_fold_proba runs one K-fold pass through the same pool and returns
+the class probabilities of every row from the fold that held it out (input
+of the calibration stage, calibration.py).
+"""
+
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.model_selection import RepeatedStratifiedKFold
+from threadpoolctl import threadpool_limits
+
+from defaults import DEFAULT_N_SPLITS, DEFAULT_N_REPEATS
+from metrics import confusion_matrices, metrics_from_confusion, bootstrap_confusion
+
+DEFAULT_N_BOOTSTRAP = 2000
+CONFIDENCE_LEVEL = 0.95
+
+AVERAGED_METRICS = ("macro_f1_score", "weighted_f1_score", "balanced_accuracy", "accuracy")
+PER_CLASS_METRICS = (("precision", "precision"), ("recall", "recall"), ("f1", "f1_score"))
+
+# Per-process state of pool workers, set by _init_worker
+_worker = {}
+
+
+def _single_threaded(estimator):
+    """Set every n_jobs parameter (including nested ones) to 1."""
+    params = {name: 1 for name in estimator.get_params() if name.split('__')[-1] == 'n_jobs'}
+    return estimator.set_params(**params)
+
+
+def _init_worker(data_dir, estimator, n_splits, n_repeats, random_state):
+    data_dir = Path(data_dir)
+    _worker["X"] = np.load(data_dir / "X.npy", mmap_mode='r')
+    _worker["y"] = np.load(data_dir / "y.npy", mmap_mode='r')
+    _worker["estimator"] = _single_threaded(clone(estimator))
+    cv = RepeatedStratifiedKFold(n_splits=n_splits, n_repeats=n_repeats, random_state=random_state)
+    # Splits depend only on y and random_state, so every worker derives the same list
+    _worker["splits"] = list(cv.split(np.zeros(len(_worker["y"])), _worker["y"]))
+
+
+def _fit_fold(fold, proba=False):
+    """Fit one fold; returns (fold, test indices, predictions or probabilities, fit seconds)."""
+    X, y = _worker["X"], _worker["y"]
+    train, test = _worker["splits"][fold]
+    model = clone(_worker["estimator"])
+    start = time.perf_counter()
+    with threadpool_limits(1):
+        model.fit(X[train], y[train])
+        y_pred = model.predict_proba(X[test]) if proba else model.predict(X[test])
+    return fold, test, y_pred, time.perf_counter() - start
+
+
+def _fit_fold_proba(fold):
+    return _fit_fold(fold, proba=True)
+
+
+def _run_folds(fit_fold, estimator, X, y, n_splits, n_repeats, n_jobs, random_state):
+    """Yield the results of fit_fold for every fold, fitted in a process pool."""
+    n_folds = n_splits * n_repeats
+    with tempfile.TemporaryDirectory(prefix="dropout-cv-") as data_dir:
+        np.save(Path(data_dir) / "X.npy", X)
+        np.save(Path(data_dir) / "y.npy", np.asarray(y))
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker,
+                                 initargs=(data_dir, estimator, n_splits, n_repeats,
+                                           random_state)) as pool:
+            yield from pool.map(fit_fold, range(n_folds))
+
+
+def _summary(values, bootstrap_values, alpha):
+    """Mean/std over folds and percentile CI of the bootstrapped fold mean."""
+    low, high = np.percentile(bootstrap_values, [100 * alpha / 2, 100 * (1 - alpha / 2)])
+    return {
+        "mean": round(float(values.mean()), 4),
+        "std": round(float(values.std(ddof=1)) if len(values) > 1 else 0.0, 4),
+        "ci_low": round(float(low), 4),
+        "ci_high": round(float(high), 4),
+    }
+
+
+def repeated_cv(estimator, X, y, class_names, n_splits=DEFAULT_N_SPLITS,
+                n_repeats=DEFAULT_N_REPEATS, n_jobs=None, n_bootstrap=DEFAULT_N_BOOTSTRAP,
+                random_state=42):
+    """
+    Repeated stratified K-fold evaluation of an unfitted estimator.
+
+    Returns the JSON-serializable `cross_validation` block of result.json.
+    """
+    n_folds = n_splits * n_repeats
+    n_classes = len(class_names)
+    n_jobs = min(n_jobs or os.cpu_count() or 1, n_folds)
+
+    print("\n" + "=" * 60)
+    print("REPEATED CROSS-VALIDATION")
+    print("=" * 60)
+    print(f"{n_repeats} x {n_splits}-fold stratified, {n_folds} fits on {n_jobs} worker process(es)")
+
+    fold_ids, y_true, y_pred = [], [], []
+    fit_times = np.zeros(n_folds)
+    start = time.perf_counter()
+    for fold, test, pred, fit_time in _run_folds(_fit_fold, estimator, X, y, n_splits, n_repeats,
+                                                 n_jobs, random_state):
+        fold_ids.append(np.full(len(test), fold))
+        y_true.append(np.asarray(y)[test])
+        y_pred.append(pred)
+        fit_times[fold] = fit_time
+        print(f"  Fold {fold + 1}/{n_folds} done ({fit_time:.1f}s)")
+    wall_time = time.perf_counter() - start
+
+    # ═══════════════════════════════════════════════════════════════
+    # METRICS FOR ALL FOLDS AND BOOTSTRAP RESAMPLES AT ONCE
+    # ═══════════════════════════════════════════════════════════════
+    cms = confusion_matrices(np.concatenate(y_true), np.concatenate(y_pred),
+                             np.concatenate(fold_ids), n_folds, n_classes)
+    fold_metrics = metrics_from_confusion(cms)
+
+    rng = np.random.default_rng(random_state)
+    boot_metrics = metrics_from_confusion(bootstrap_confusion(cms, n_bootstrap, rng))
+    alpha = 1 - CONFIDENCE_LEVEL
+
+    # Bootstrap distribution of the across-fold mean: average over the fold axis
+    summary = {
+        key: _summary(fold_metrics[key], boot_metrics[key].mean(axis=1), alpha)
+        for key in AVERAGED_METRICS
+    }
+    per_class = {
+        name: {
+            label: _summary(fold_metrics[key][:, i], boot_metrics[key][:, :, i].mean(axis=1), alpha)
+            for key, label in PER_CLASS_METRICS
+        }
+        for i, name in enumerate(class_names)
+    }
+
+    print(f"\nMacro F1 over {n_folds} folds: {summary['macro_f1_score']['mean']:.4f} "
+          f"± {summary['macro_f1_score']['std']:.4f} "
+          f"(95% CI {summary['macro_f1_score']['ci_low']:.4f}-{summary['macro_f1_score']['ci_high']:.4f})")
+    print(f"Completed in {wall_time:.1f}s wall, {fit_times.sum():.1f}s summed fit time")
+
+    return {
+        "n_splits": n_splits,
+        "n_repeats": n_repeats,
+        "random_state": random_state,
+        "confidence_level": CONFIDENCE_LEVEL,
+        "n_bootstrap": n_bootstrap,
+        "metrics": summary,
+        "per_class_metrics": per_class,
+        "fold_macro_f1": [round(float(v), 4) for v in fold_metrics["macro_f1_score"]],
+        "confusion_matrix_total": cms.sum(axis=0).tolist(),
+        "wall_time_seconds": round(wall_time, 2),
+        "fit_time_seconds": round(float(fit_times.sum()), 2),
+    }
+
+
+def out_of_fold_proba(estimator, X, y, n_splits=DEFAULT_N_SPLITS, n_jobs=None, random_state=42):
+    """
+    Class probabilities of every row from a model that did not see it.
+
+    One stratified K-fold pass (same splitter as repeated_cv with one
+    repeat). Returns (probabilities of shape (n_samples, n_classes), summed
+    fit seconds).
+    """
+    n_jobs = min(n_jobs or os.cpu_count() or 1, n_splits)
+    print(f"Out-of-fold probabilities: {n_splits}-fold stratified on {n_jobs} worker process(es)")
+    proba, fit_time_total = None, 0.0
+    for fold, test, fold_proba, fit_time in _run_folds(_fit_fold_proba, estimator, X, y,
+                                                       n_splits, 1, n_jobs, random_state):
+        if proba is None:
+            proba = np.zeros((len(y), fold_proba.shape[1]))
+        proba[test] = fold_proba
+        fit_time_total += fit_time
+        print(f"  Fold {fold + 1}/{n_splits} done ({fit_time:.1f}s)")
+    return proba, fit_time_total
@@ -0,0 +1,84 @@
+"""
+Pipeline Defaults
+=================
+
+Paths and default parameters of the pipeline and its modes. Standard
+library only, so the command line (cli.py) registers every subcommand's
+arguments without importing pandas, scikit-learn or the pipeline modules.
+
+The modules that implement a mode import their defaults from here, so each
+value is defined once.
+"""
+
+from pathlib import Path
+
+# ═══════════════════════════════════════════════════════════════
+# PATHS
+# ═══════════════════════════════════════════════════════════════
+
+SCRIPT_DIR = Path(__file__).parent
+DATA_PATH = SCRIPT_DIR.parent / "shared-data" / "data.csv"
+OUTPUT_PATH = SCRIPT_DIR / "result.json"
+MODEL_PATH = SCRIPT_DIR / "model.joblib"
+STREAMING_MODEL_PATH = SCRIPT_DIR / "model_streaming.joblib"
+STREAMING_OUTPUT_PATH = SCRIPT_DIR / "result_streaming.json"
+COMPILED_MODEL_PATH = SCRIPT_DIR / "model_compiled.npz"
+COMPACT_MODEL_PATH = SCRIPT_DIR / "model_compact.bin"
+SIMILAR_INDEX_PATH = SCRIPT_DIR / "similar_students.joblib"
+# Slice metrics cube for the React dashboard (loaded per slice, not part of result.json)
+SLICES_DIR = SCRIPT_DIR / "web" / "public"
+DRIFT_REPORT_PATH = SCRIPT_DIR / "drift_report.json"
+
+# ═══════════════════════════════════════════════════════════════
+# TRAINING
+# ═══════════════════════════════════════════════════════════════
+
+# Random seed for reproducibility (as per requirements)
+SPLIT_RANDOM_STATE = 42
+
+# Boosting member of the ensemble (see build_boosting)
+BOOSTING_BACKENDS = ('exact', 'hist')
+DEFAULT_BOOSTING_BACKEND = 'exact'
+
+# Repeated cross-validation (cross_validation.py)
+DEFAULT_N_SPLITS = 5
+DEFAULT_N_REPEATS = 3
+
+# Calibration of the soft-vote probabilities (calibration.py); opt-in, since its
+# out-of-fold pass refits the ensemble once per split (~16 s -> ~108 s uncached)
+DEFAULT_CALIBRATE = False
+CALIBRATION_METHODS = ("temperature", "isotonic", "none")
+DEFAULT_CALIBRATION = "temperature"
+
+# Size limit of the stage cache (stage_cache.py)
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# Streaming training (streaming_training.py)
+DEFAULT_STREAMING_CHUNK_SIZE = 100_000
+DEFAULT_EPOCHS = 5
+CATEGORICAL_ENCODINGS = ('onehot', 'target', 'none')
+DEFAULT_CATEGORICAL_ENCODING = 'onehot'
+
+# Warm-start updates (incremental_training.py)
+DEFAULT_NEW_TREES = 50
+DEFAULT_NEW_STAGES = 30
+DEFAULT_RECENT_ROWS = 1000
+DEFAULT_MAX_TREES = 400
+
+# ═══════════════════════════════════════════════════════════════
+# SCORING
+# ═══════════════════════════════════════════════════════════════
+
+# Rows per chunk when streaming a CSV through the persisted model
+PREDICT_CHUNK_SIZE = 50_000
+# Scenarios listed by what_if (lowest dropout risk first)
+WHAT_IF_TOP = 10
+
+# Compact model format (compact_model.py)
+VALUE_BITS = (8, 16)
+DEFAULT_VALUE_BITS = 8
+
+# Similar-students index (similar_students.py)
+INDEX_METHODS = ("kdtree", "brute")
+DEFAULT_INDEX_METHOD = "kdtree"
+DEFAULT_CANDIDATES = 100
@@ -0,0 +1,196 @@
+"""
+Feature Drift Monitor
+=====================
+
+Compares new cohorts (semicolon CSVs) with the feature distributions the
+model was trained on, so a retrain is triggered by actual drift instead of
+a fixed schedule.
+
+At training time every raw input column is summarized in a compact sketch
+(FeatureSketches, stored inside model.joblib):
+
+    numeric columns      100 quantile bins of the training data
+                         (edges + counts, tied quantiles merged)
+    categorical columns  counts per category code (Course, Application
+                         mode, ...) plus an "unseen" bucket
+
+A new CSV is streamed through the same bins in fixed-size chunks
+(DriftMonitor.update); per chunk this is one searchsorted + bincount per
+column, and the only state kept is the bin counts, so memory is constant in
+the size of the file.
+
+Per column the report contains:
+    PSI  population stability index over ~10 reference-decile groups
+         (categories for categorical columns), with the usual reading
+         < 0.1 stable, 0.1-0.25 moderate, >= 0.25 major shift
+    KS   two-sample Kolmogorov-Smirnov statistic over the 100 bins and its
+         asymptotic p-value (numeric columns)
+A column is flagged as drifted at PSI >= 0.25, or at PSI >= 0.1 with a
+significant KS test; any drifted column recommends a retrain.
+"""
+
+import numpy as np
+from scipy.special import kolmogorov
+
+DEFAULT_N_BINS = 100
+PSI_GROUPS = 10
+PSI_MODERATE = 0.1
+PSI_MAJOR = 0.25
+KS_ALPHA = 0.01
+# Floor for bin proportions in the PSI (empty bins would make it infinite)
+PSI_EPSILON = 1e-4
+
+# Code columns: compared per category, not by value order
+CATEGORICAL_COLUMNS = [
+    'Marital status', 'Application mode', 'Course', 'Daytime/evening attendance',
+    'Previous qualification', 'Nacionality', "Mother's qualification",
+    "Father's qualification", "Mother's occupation", "Father's occupation",
+    'Displaced', 'Educational special needs', 'Debtor', 'Tuition fees up to date',
+    'Gender', 'Scholarship holder', 'International',
+]
+
+
+def psi(reference, current):
+    """Population stability index of two count (or proportion) vectors."""
+    p = np.maximum(reference / max(reference.sum(), 1), PSI_EPSILON)
+    q = np.maximum(current / max(current.sum(), 1), PSI_EPSILON)
+    return float(np.sum((q - p) * np.log(q / p)))
+
+
+class FeatureSketches:
+    """Per-column reference histograms of the training data."""
+
+    def __init__(self, numeric, categorical, n_rows):
+        # numeric: column -> {"edges": array, "counts": array (len(edges) + 1)}
+        # categorical: column -> {"categories": array, "counts": array (+1 unseen bucket)}
+        self.numeric = numeric
+        self.categorical = categorical
+        self.n_rows = n_rows
+
+    @classmethod
+    def from_frame(cls, df, n_bins=DEFAULT_N_BINS, categorical_columns=CATEGORICAL_COLUMNS):
+        """Sketch every column of a feature DataFrame (the Target column must be dropped)."""
+        numeric, categorical = {}, {}
+        for column in df.columns:
+            values = df[column].to_numpy()
+            if column in categorical_columns:
+                categories, counts = np.unique(values, return_counts=True)
+                categorical[column] = {"categories": categories,
+                                       "counts": np.append(counts, 0)}
+            else:
+                values = values[~np.isnan(values)].astype(np.float64)
+                # Interior quantiles as bin edges; discrete columns collapse to their values
+                edges = np.unique(np.quantile(values, np.linspace(0, 1, n_bins + 1)[1:-1]))
+                numeric[column] = {"edges": edges,
+                                   "counts": np.bincount(np.searchsorted(edges, values),
+                                                         minlength=len(edges) + 1)}
+        return cls(numeric, categorical, len(df))
+
+    def merged(self, monitor):
+        """
+        Sketches that also cover the rows streamed through `monitor`.
+
+        Used after retraining on a new cohort, so the reference follows the
+        data the model was updated with. Bins stay fixed; categories unseen
+        in training are only counted in the unseen bucket.
+        """
+        numeric = {column: {"edges": s["edges"], "counts": s["counts"] + monitor.counts[column]}
+                   for column, s in self.numeric.items()}
+        categorical = {column: {"categories": s["categories"],
+                                "counts": s["counts"] + monitor.counts[column]}
+                       for column, s in self.categorical.items()}
+        return FeatureSketches(numeric, categorical, self.n_rows + monitor.n_rows)
+
+    @property
+    def columns(self):
+        return list(self.numeric) + list(self.categorical)
+
+    @staticmethod
+    def _psi_groups(counts):
+        """Merge fine bins into ~PSI_GROUPS groups of equal reference mass."""
+        start = np.concatenate([[0], np.cumsum(counts)[:-1]]) / counts.sum()
+        return np.minimum((start * PSI_GROUPS).astype(np.int64), PSI_GROUPS - 1)
+
+
+class DriftMonitor:
+    """Streams new data through FeatureSketches and reports drift per column."""
+
+    def __init__(self, sketches):
+        self.sketches = sketches
+        self.counts = {column: np.zeros_like(s["counts"])
+                       for column, s in {**sketches.numeric, **sketches.categorical}.items()}
+        self.missing = dict.fromkeys(self.counts, 0)
+        self.n_rows = 0
+
+    def update(self, chunk):
+        """Add one DataFrame chunk; unknown extra columns (e.g. Target) are ignored."""
+        for column, sketch in self.sketches.numeric.items():
+            if column not in chunk:
+                continue
+            values = chunk[column].to_numpy(dtype=np.float64)
+            missing = np.isnan(values)
+            self.missing[column] += int(missing.sum())
+            self.counts[column] += np.bincount(np.searchsorted(sketch["edges"], values[~missing]),
+                                               minlength=len(sketch["counts"]))
+        for column, sketch in self.sketches.categorical.items():
+            if column not in chunk:
+                continue
+            values = chunk[column].to_numpy()
+            categories = sketch["categories"]
+            index = np.searchsorted(categories, values)
+            clipped = np.minimum(index, len(categories) - 1)
+            # Codes never seen in training go to the last (unseen) bucket
+            index = np.where(categories[clipped] == values, clipped, len(categories))
+            self.counts[column] += np.bincount(index, minlength=len(categories) + 1)
+        self.n_rows += len(chunk)
+        return self
+
+    def _numeric_report(self, column):
+        sketch = self.sketches.numeric[column]
+        reference, current = sketch["counts"], self.counts[column]
+        n, m = reference.sum(), current.sum()
+        groups = FeatureSketches._psi_groups(reference)
+        psi_value = psi(np.bincount(groups, reference, PSI_GROUPS),
+                        np.bincount(groups, current, PSI_GROUPS))
+        ks = float(np.abs(np.cumsum(reference) / n - np.cumsum(current) / max(m, 1)).max())
+        p_value = float(kolmogorov(ks * np.sqrt(n * m / (n + m)))) if m else 1.0
+        return psi_value, ks, p_value
+
+    def report(self):
+        """Per-column drift statistics and an overall retrain recommendation."""
+        features = []
+        for column in self.sketches.columns:
+            if column in self.sketches.numeric:
+                psi_value, ks, p_value = self._numeric_report(column)
+                unseen = None
+            else:
+                counts = self.counts[column]
+                psi_value = psi(self.sketches.categorical[column]["counts"], counts)
+                ks, p_value = None, None
+                unseen = float(counts[-1] / max(counts.sum(), 1))
+
+            ks_significant = p_value is not None and p_value < KS_ALPHA
+            drifted = psi_value >= PSI_MAJOR or (psi_value >= PSI_MODERATE and ks_significant)
+            features.append({
+                "feature": column,
+                "type": "numeric" if column in self.sketches.numeric else "categorical",
+                "psi": round(psi_value, 4),
+                "ks_statistic": None if ks is None else round(ks, 4),
+                "ks_p_value": None if p_value is None else round(p_value, 6),
+                "unseen_fraction": None if unseen is None else round(unseen, 4),
+                "missing": self.missing[column],
+                "status": ("major" if psi_value >= PSI_MAJOR
+                           else "moderate" if psi_value >= PSI_MODERATE else "stable"),
+                "drifted": bool(drifted),
+            })
+        features.sort(key=lambda f: f["psi"], reverse=True)
+        drifted = [f["feature"] for f in features if f["drifted"]]
+        return {
+            "reference_rows": int(self.sketches.n_rows),
+            "rows": int(self.n_rows),
+            "drifted_features": drifted,
+            "retrain_recommended": bool(drifted),
+            "thresholds": {"psi_moderate": PSI_MODERATE, "psi_major": PSI_MAJOR,
+                           "ks_alpha": KS_ALPHA},
+            "features": features,
+        }
@@ -6,24 +6,41 @@ Date: 2026-01-11
 
 This script implements a comprehensive ML pipeline for predicting student dropout.
 Dataset: Predict Students' Dropout and Academic Success (UCI ML Repository)
+
+Command line: see cli.py (python dropout_prediction.py <command> runs the same CLI).
 """
 
-import pandas as pd
-import numpy as np
+if __name__ == "__main__":
+    # Dispatched before the imports below: the CLI parses its arguments with the
+    # standard library only and imports this module when the subcommand needs it
+    import sys
+    from cli import main as cli_main
+    sys.exit(cli_main())
+
+import sys
 import json
 import time
+import shutil
+import tempfile
 from pathlib import Path
 
-# Scikit-learn imports
-from sklearn.model_selection import train_test_split, cross_val_score, GridSearchCV
-from sklearn.preprocessing import StandardScaler, LabelEncoder
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier, VotingClassifier
-from sklearn.linear_model import LogisticRegression
-from sklearn.metrics import (
-    f1_score, balanced_accuracy_score, accuracy_score,
-    confusion_matrix, classification_report, precision_recall_fscore_support
+import numpy as np
+import pandas as pd
+import joblib
+from joblib import Parallel, delayed
+
+# scikit-learn and the pipeline modules are imported inside the functions
+# that use them, so each CLI mode (cli.py) loads only what it needs
+from defaults import (
+    SCRIPT_DIR, DATA_PATH, OUTPUT_PATH, MODEL_PATH, STREAMING_MODEL_PATH, STREAMING_OUTPUT_PATH,
+    COMPILED_MODEL_PATH, COMPACT_MODEL_PATH, SIMILAR_INDEX_PATH, SLICES_DIR, DRIFT_REPORT_PATH,
+    SPLIT_RANDOM_STATE, BOOSTING_BACKENDS, DEFAULT_BOOSTING_BACKEND, DEFAULT_N_SPLITS,
+    DEFAULT_N_REPEATS, DEFAULT_CALIBRATE, DEFAULT_CALIBRATION, DEFAULT_MAX_BYTES,
+    DEFAULT_STREAMING_CHUNK_SIZE, DEFAULT_EPOCHS,
+    DEFAULT_CATEGORICAL_ENCODING, DEFAULT_NEW_TREES, DEFAULT_NEW_STAGES, DEFAULT_RECENT_ROWS,
+    DEFAULT_MAX_TREES, PREDICT_CHUNK_SIZE, WHAT_IF_TOP, DEFAULT_VALUE_BITS,
+    DEFAULT_INDEX_METHOD, DEFAULT_CANDIDATES
 )
-from sklearn.pipeline import Pipeline
 
 # Note: Using class_weight='balanced' instead of SMOTE for simplicity
 # This avoids external dependency on imbalanced-learn
@@ -32,26 +49,26 @@ import warnings
 warnings.filterwarnings('ignore')
 
 # ═══════════════════════════════════════════════════════════════
-# CONFIGURATION
+# CONFIGURATION (paths and defaults: defaults.py)
 # ═══════════════════════════════════════════════════════════════
 
-# Get the script directory and set paths relative to it
-SCRIPT_DIR = Path(__file__).parent
-DATA_PATH = SCRIPT_DIR.parent / "shared-data" / "data.csv"
-OUTPUT_PATH = SCRIPT_DIR / "result.json"
+# Shared typed CSV loader with binary column cache (shared-data/data_loader.py)
+sys.path.insert(0, str(DATA_PATH.parent))
+from data_loader import load_data, read_csv, iter_csv_chunks, file_hash, content_hash  # noqa: E402
+from result_publisher import ResultPublisher, write_atomic  # noqa: E402
+from run_store import RunStore  # noqa: E402
 
-# Random seed for reproducibility (as per requirements)
-SPLIT_RANDOM_STATE = 42
 
-
-def load_and_explore_data():
-    """Load dataset and perform initial exploration."""
+def load_and_explore_data(explore=True):
+    """Load dataset and perform initial exploration (explore=False: load only)."""
     print("=" * 60)
     print("LOADING AND EXPLORING DATA")
     print("=" * 60)
     
-    # Load data - CSV uses semicolon separator
-    df = pd.read_csv(DATA_PATH, sep=';')
+    # Load data - typed schema, served from the binary column cache after the first run
+    df = load_data(DATA_PATH)
+    if not explore:
+        return df
     
     print(f"\nDataset Shape: {df.shape}")
     print(f"Total samples: {df.shape[0]}")
@@ -82,6 +99,8 @@ def preprocess_data(df):
     3. Apply StandardScaler for numerical stability
     4. Create derived features based on domain knowledge
     """
+    from sklearn.preprocessing import LabelEncoder
+    from features import FeatureEngineer
     print("\n" + "=" * 60)
     print("PREPROCESSING DATA")
     print("=" * 60)
@@ -102,73 +121,170 @@ def preprocess_data(df):
     # ═══════════════════════════════════════════════════════════════
     print("\n--- Feature Engineering ---")
     
-    # Create derived features based on domain knowledge
-    X_engineered = X.copy()
+    # Column positions are resolved once; the same fitted transformer is
+    # persisted with the model so inference builds identical features
+    feature_engineer = FeatureEngineer().fit(X)
+    X_engineered = feature_engineer.transform(X)
     
-    # 1. Academic performance features (1st semester)
-    # Ratio of approved to enrolled units in 1st semester
-    X_engineered['sem1_approval_rate'] = np.where(
-        X['Curricular units 1st sem (enrolled)'] > 0,
-        X['Curricular units 1st sem (approved)'] / X['Curricular units 1st sem (enrolled)'],
-        0
-    )
-    
-    # 2. Academic performance features (2nd semester)
-    X_engineered['sem2_approval_rate'] = np.where(
-        X['Curricular units 2nd sem (enrolled)'] > 0,
-        X['Curricular units 2nd sem (approved)'] / X['Curricular units 2nd sem (enrolled)'],
-        0
-    )
+    print(f"Original features: {X.shape[1]}")
+    print(f"Engineered features added: {X_engineered.shape[1] - X.shape[1]}")
+    print(f"Total features: {X_engineered.shape[1]}")
     
-    # 3. Combined academic performance
-    total_enrolled = (X['Curricular units 1st sem (enrolled)'] + 
-                      X['Curricular units 2nd sem (enrolled)'])
-    total_approved = (X['Curricular units 1st sem (approved)'] + 
-                      X['Curricular units 2nd sem (approved)'])
-    X_engineered['total_approval_rate'] = np.where(
-        total_enrolled > 0,
-        total_approved / total_enrolled,
-        0
-    )
+    return X_engineered, y_encoded, class_names, label_encoder, feature_engineer
+
+
+def build_boosting(backend=DEFAULT_BOOSTING_BACKEND):
+    """
+    Unfitted boosting member of the ensemble.
     
-    # 4. Average grade across both semesters
-    X_engineered['avg_grade'] = (
-        X['Curricular units 1st sem (grade)'] + X['Curricular units 2nd sem (grade)']
-    ) / 2
+    Backends:
+    - 'exact': GradientBoostingClassifier, exact splits on sorted feature
+      values, single-threaded (the original model)
+    - 'hist':  HistGradientBoostingClassifier, features are binned once into
+      uint8 (max_bins=255) and split finding runs multi-threaded (OpenMP);
+      stops early when the loss on a 10% validation slice of the training
+      data stops improving
+    """
+    from profiling import TimedGradientBoostingClassifier, TimedHistGradientBoostingClassifier
+    if backend == 'exact':
+        return TimedGradientBoostingClassifier(
+            n_estimators=150,
+            max_depth=6,
+            learning_rate=0.1,
+            min_samples_split=5,
+            min_samples_leaf=2,
+            random_state=SPLIT_RANDOM_STATE
+        )
+    if backend == 'hist':
+        return TimedHistGradientBoostingClassifier(
+            max_iter=150,
+            max_depth=6,
+            learning_rate=0.1,
+            max_bins=255,
+            early_stopping=True,
+            validation_fraction=0.1,
+            n_iter_no_change=10,
+            random_state=SPLIT_RANDOM_STATE
+        )
+    raise ValueError(f"Unknown boosting backend {backend!r}, expected one of {BOOSTING_BACKENDS}")
+
+
+def boosting_hyperparameters(gb):
+    """Hyperparameters of a fitted boosting member for result.json."""
+    from sklearn.ensemble import HistGradientBoostingClassifier
+    if isinstance(gb, HistGradientBoostingClassifier):
+        return {
+            "backend": "hist",
+            "max_iter": gb.max_iter,
+            "n_iter_early_stopped": int(gb.n_iter_),
+            "max_depth": gb.max_depth,
+            "learning_rate": gb.learning_rate,
+            "max_bins": gb.max_bins,
+            "validation_fraction": gb.validation_fraction
+        }
+    return {
+        "n_estimators": gb.n_estimators,
+        "max_depth": gb.max_depth,
+        "learning_rate": gb.learning_rate,
+        "min_samples_split": gb.min_samples_split,
+        "min_samples_leaf": gb.min_samples_leaf
+    }
+
+
+def build_ensemble(boosting_backend=DEFAULT_BOOSTING_BACKEND):
+    """
+    Unfitted soft-voting ensemble (RandomForest + GradientBoosting).
     
-    # 5. Grade improvement (2nd sem vs 1st sem)
-    X_engineered['grade_improvement'] = (
-        X['Curricular units 2nd sem (grade)'] - X['Curricular units 1st sem (grade)']
+    Kept separate from train_model so benchmarks and other tools train
+    exactly the same model.
+    """
+    from sklearn.ensemble import VotingClassifier
+    from profiling import TimedRandomForestClassifier
+    # Base classifiers with tuned hyperparameters
+    # Timed* subclasses record their own fit time (see profiling.py)
+    rf_clf = TimedRandomForestClassifier(
+        n_estimators=200,
+        max_depth=15,
+        min_samples_split=5,
+        min_samples_leaf=2,
+        class_weight='balanced',
+        random_state=SPLIT_RANDOM_STATE,
+        n_jobs=-1
     )
     
-    # 6. Total credited units
-    X_engineered['total_credited'] = (
-        X['Curricular units 1st sem (credited)'] + X['Curricular units 2nd sem (credited)']
-    )
+    gb_clf = build_boosting(boosting_backend)
     
-    # 7. Evaluation efficiency (approved vs evaluations)
-    total_evaluations = (X['Curricular units 1st sem (evaluations)'] + 
-                         X['Curricular units 2nd sem (evaluations)'])
-    X_engineered['evaluation_efficiency'] = np.where(
-        total_evaluations > 0,
-        total_approved / total_evaluations,
-        0
+    # Voting Ensemble
+    return VotingClassifier(
+        estimators=[
+            ('rf', rf_clf),
+            ('gb', gb_clf)
+        ],
+        voting='soft',  # Use probability averaging
+        n_jobs=-1
     )
+
+
+def _fit_estimator(estimator, X, y):
+    start = time.perf_counter()
+    estimator.fit(X, y)
+    return estimator, time.perf_counter() - start
+
+
+def fit_ensemble(ensemble, X, y, cache, input_key):
+    """
+    Fit the VotingClassifier's base estimators through the stage cache.
     
-    # 8. Financial stress indicator (debtor and tuition status combined)
-    X_engineered['financial_stress'] = X['Debtor'] + (1 - X['Tuition fees up to date'])
+    Every base estimator is cached separately (key: training data key,
+    estimator parameters, estimator code), so changing one member only
+    refits that member. Missing members are fitted in parallel like
+    VotingClassifier.fit does, then the fitted ensemble is assembled with
+    the same attributes VotingClassifier.fit sets. Returns the model key
+    and the fit time (recorded fit times for cached members).
+    """
+    import profiling
+    from sklearn.base import clone
+    from sklearn.preprocessing import LabelEncoder
+    from sklearn.utils import Bunch
+    from stage_cache import code_digest, digest
+    names = [name for name, _ in ensemble.estimators]
+    keys = {
+        name: cache.key(f"fit_{name}", inputs=[input_key, digest(est)],
+                        code=[code_digest(profiling)])
+        for name, est in ensemble.estimators
+    }
+    fitted = {name: cache.get(f"fit_{name}", keys[name]) for name in names}
+    missing = [(name, est) for name, est in ensemble.estimators if fitted[name] is None]
     
-    # 9. Age when enrolled relative to typical (18-20)
-    X_engineered['age_deviation'] = X['Age at enrollment'] - 19
+    fit_times = {name: cache.stats[f"fit_{name}"]["seconds"]
+                 for name in names if fitted[name] is not None}
+    if missing:
+        start_time = time.time()
+        outputs = Parallel(n_jobs=ensemble.n_jobs)(
+            delayed(_fit_estimator)(clone(est), X, y) for _, est in missing
+        )
+        for (name, _), (estimator, seconds) in zip(missing, outputs):
+            cache.put(f"fit_{name}", keys[name], {"estimator": estimator}, seconds)
+            fitted[name] = {"estimator": estimator}
+        fit_times["_wall"] = time.time() - start_time
+    for name in names:
+        state = "hit" if cache.stats[f"fit_{name}"]["hit"] else "fitted"
+        print(f"  {name}: {state}")
     
-    print(f"Original features: {X.shape[1]}")
-    print(f"Engineered features added: {X_engineered.shape[1] - X.shape[1]}")
-    print(f"Total features: {X_engineered.shape[1]}")
+    # y is already label-encoded (0..K-1), so le_ is the identity mapping
+    ensemble.le_ = LabelEncoder().fit(y)
+    ensemble.classes_ = ensemble.le_.classes_
+    ensemble.estimators_ = [fitted[name]["estimator"] for name in names]
+    ensemble.named_estimators_ = Bunch(**dict(zip(names, ensemble.estimators_)))
     
-    return X_engineered, y_encoded, class_names, label_encoder
+    model_key = cache.key("ensemble", inputs=[keys[name] for name in names],
+                          params={"voting": ensemble.voting, "weights": ensemble.weights})
+    training_time = fit_times.pop("_wall", 0.0) + sum(fit_times.values())
+    return model_key, training_time
 
 
-def train_model(X, y, class_names):
+def train_model(X, y, class_names, boosting_backend=DEFAULT_BOOSTING_BACKEND, cache=None,
+                input_key=None):
     """
     Train and optimize the ML model.
     
@@ -181,13 +297,22 @@ def train_model(X, y, class_names):
     Imbalance Handling: class_weight='balanced'
     Rationale: Dataset has imbalanced classes, class_weight adjusts weights
     inversely proportional to class frequencies.
+    
+    The fitted scaler and each base estimator go through the stage cache
+    (stage_cache.py); input_key identifies the engineered features.
     """
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import StandardScaler
+    from stage_cache import code_digest, digest, StageCache
+    if cache is None:
+        cache = StageCache(enabled=False, verbose=False)
+    if input_key is None:
+        input_key = digest(X) + digest(y)
+    
     print("\n" + "=" * 60)
     print("TRAINING MODEL")
     print("=" * 60)
     
-    start_time = time.time()
-    
     # ═══════════════════════════════════════════════════════════════
     # TRAIN/TEST SPLIT (AS PER REQUIREMENTS)
     # ═══════════════════════════════════════════════════════════════
@@ -213,8 +338,11 @@ def train_model(X, y, class_names):
     # ═══════════════════════════════════════════════════════════════
     # SCALE FEATURES
     # ═══════════════════════════════════════════════════════════════
-    scaler = StandardScaler()
-    X_train_scaled = scaler.fit_transform(X_train)
+    split_key = cache.key("scaler", inputs=[input_key], code=[code_digest(train_model)],
+                          params={"test_size": 0.2, "random_state": SPLIT_RANDOM_STATE})
+    scaler = cache.cached("scaler", split_key,
+                          lambda: {"scaler": StandardScaler().fit(X_train)})["scaler"]
+    X_train_scaled = scaler.transform(X_train)
     X_test_scaled = scaler.transform(X_test)
     
     # ═══════════════════════════════════════════════════════════════
@@ -222,47 +350,19 @@ def train_model(X, y, class_names):
     # ═══════════════════════════════════════════════════════════════
     print("\n--- Model Selection ---")
     print("Using Voting Ensemble (RandomForest + GradientBoosting)")
+    print(f"Boosting backend: {boosting_backend}")
     
-    # Base classifiers with tuned hyperparameters
-    rf_clf = RandomForestClassifier(
-        n_estimators=200,
-        max_depth=15,
-        min_samples_split=5,
-        min_samples_leaf=2,
-        class_weight='balanced',
-        random_state=SPLIT_RANDOM_STATE,
-        n_jobs=-1
-    )
-    
-    gb_clf = GradientBoostingClassifier(
-        n_estimators=150,
-        max_depth=6,
-        learning_rate=0.1,
-        min_samples_split=5,
-        min_samples_leaf=2,
-        random_state=SPLIT_RANDOM_STATE
-    )
-    
-    # Voting Ensemble
-    ensemble = VotingClassifier(
-        estimators=[
-            ('rf', rf_clf),
-            ('gb', gb_clf)
-        ],
-        voting='soft',  # Use probability averaging
-        n_jobs=-1
-    )
+    ensemble = build_ensemble(boosting_backend)
     
     print("\nTraining ensemble model...")
-    ensemble.fit(X_train_scaled, y_train)
-    
-    training_time = time.time() - start_time
+    # Fit time of the ensemble only (split and scaling are profiled as part of the stage)
+    model_key, training_time = fit_ensemble(ensemble, X_train_scaled, y_train, cache, split_key)
     print(f"Training completed in {training_time:.2f} seconds")
     
-    return ensemble, scaler, X_test_scaled, y_test, training_time
+    return ensemble, scaler, X_test_scaled, y_test, training_time, model_key
 
 
-def evaluate_model(model, X_test, y_test, class_names, training_time):
+def evaluate_model(model, X_test, y_test, class_names, training_time, y_pred=None):
     """
     Evaluate the model and generate required outputs.
     
@@ -270,12 +370,17 @@ def evaluate_model(model, X_test, y_test, class_names, training_time):
     - Primary: Macro F1-Score
     - Secondary: Weighted F1, Balanced Accuracy, Accuracy
     """
+    from sklearn.metrics import (
+        accuracy_score, balanced_accuracy_score, confusion_matrix, f1_score,
+        precision_recall_fscore_support
+    )
     print("\n" + "=" * 60)
     print("EVALUATION RESULTS")
     print("=" * 60)
     
-    # Get predictions
-    y_pred = model.predict(X_test)
+    # Get predictions (unless they come from the stage cache)
+    if y_pred is None:
+        y_pred = model.predict(X_test)
     
     # ═══════════════════════════════════════════════════════════════
     # COMPUTE REQUIRED METRICS
@@ -390,13 +495,9 @@ def evaluate_model(model, X_test, y_test, class_names, training_time):
                     "min_samples_leaf": 2,
                     "class_weight": "balanced"
                 },
-                "GradientBoosting": {
-                    "n_estimators": 150,
-                    "max_depth": 6,
-                    "learning_rate": 0.1,
-                    "min_samples_split": 5,
-                    "min_samples_leaf": 2
-                },
+                # None for models that are not the voting ensemble (streaming SGD)
+                "GradientBoosting": (boosting_hyperparameters(model.named_estimators_['gb'])
+                                     if hasattr(model, "named_estimators_") else None),
                 "Voting": "soft (probability averaging)"
             },
             "imbalance_handling": {
@@ -415,36 +516,886 @@ def evaluate_model(model, X_test, y_test, class_names, training_time):
     return results
 
 
-def save_results(results):
-    """Save results to JSON file and sync with web dashboards."""
-    # List of save locations
-    save_paths = [
+def headline_metrics(y_true, y_pred):
+    """The four evaluation_metrics of result.json for one set of predictions."""
+    from sklearn.metrics import accuracy_score, balanced_accuracy_score, f1_score
+    return {
+        "macro_f1_score": round(f1_score(y_true, y_pred, average='macro'), 4),
+        "weighted_f1_score": round(f1_score(y_true, y_pred, average='weighted'), 4),
+        "balanced_accuracy": round(balanced_accuracy_score(y_true, y_pred), 4),
+        "accuracy": round(accuracy_score(y_true, y_pred), 4),
+    }
+
+
+def decision_documentation(decision):
+    """pipeline_documentation entry stating which predictions the headline metrics use."""
+    if decision is None:
+        return {
+            "method": "argmax of the soft-vote probabilities",
+            "headline_metrics": "evaluation_metrics use the argmax predictions",
+        }
+    return {
+        "method": "probability calibration and per-class weights fitted on out-of-fold "
+                  "probabilities of the training split (train --calibrate)",
+        "headline_metrics": "evaluation_metrics use the decision rule; "
+                            "evaluation_metrics_argmax holds the plain argmax metrics",
+    }
+
+
+def run_summary(results):
+    """Compact per-run record for run_history.jsonl."""
+    summary = dict(results["evaluation_metrics"])
+    summary["training_time_seconds"] = results["training_time_seconds"]
+    if "cross_validation" in results:
+        cv = results["cross_validation"]["metrics"]["macro_f1_score"]
+        summary["cv_macro_f1"] = [cv["mean"], cv["ci_low"], cv["ci_high"]]
+    return summary
+
+
+# Dashboards read these copies; the publisher writes them atomically and concurrently
+RESULT_PUBLISHER = ResultPublisher(
+    sinks=[
         OUTPUT_PATH,                                      # Base: claude/result.json
         SCRIPT_DIR / "web" / "public" / "result.json",    # React: claude/web/public/result.json
         SCRIPT_DIR / "first_version" / "result.json"      # Backup: claude/first_version/result.json
-    ]
-    
-    print("\n--- Saving Results ---")
-    
-    saved_count = 0
-    for path in save_paths:
-        try:
-            # Ensure parent directory exists before saving
-            if path.parent.exists():
-                with open(path, 'w', encoding='utf-8') as f:
-                    json.dump(results, f, indent=2, ensure_ascii=False)
-                print(f"  ✓ Saved to: {path.relative_to(SCRIPT_DIR.parent)}")
-                saved_count += 1
-            else:
-                print(f"  - Skipped (Path not found): {path.relative_to(SCRIPT_DIR.parent)}")
-        except Exception as e:
-            print(f"  ! Error saving to {path}: {str(e)}")
-            
-    print(f"\nSuccessfully updated {saved_count} result file(s).")
-
-
-def main():
-    """Main pipeline execution."""
+    ],
+    summary=run_summary,
+)
+
+
+def report_published(outcomes, verbose=True):
+    """Print the per-sink outcome of a publish (errors are always printed)."""
+    log = print if verbose else (lambda *args, **kwargs: None)
+    for path, status, error in outcomes:
+        if status == 'saved':
+            log(f"  ✓ Saved to: {path.relative_to(SCRIPT_DIR.parent)}")
+        elif status == 'skipped':
+            log(f"  - Skipped (Path not found): {path.relative_to(SCRIPT_DIR.parent)}")
+        else:
+            print(f"  ! Error saving to {path}: {str(error)}")
+    
+    saved_count = sum(status == 'saved' for _, status, _ in outcomes)
+    log(f"\nSuccessfully updated {saved_count} result file(s).")
+
+
+def save_results(results, verbose=True, record_history=False, wait=True):
+    """
+    Save results to JSON file and sync with web dashboards.
+    
+    The result is serialized once and published atomically to all copies
+    (shared-data/result_publisher.py). With record_history=True one summary
+    line is appended to run_history.jsonl next to every copy. With wait=False
+    the Future of the publish is returned instead of waiting for it.
+    """
+    if verbose:
+        print("\n--- Saving Results ---")
+    future = RESULT_PUBLISHER.publish_async(results, record_history=record_history)
+    if not wait:
+        return future
+    report_published(future.result(), verbose)
+
+
+def test_split_rows(y):
+    """Positions of the test split rows (same rows and order as train_model's X_test)."""
+    from sklearn.model_selection import train_test_split
+    return train_test_split(np.arange(len(y)), test_size=0.2, random_state=SPLIT_RANDOM_STATE,
+                            stratify=y)[1]
+
+
+def save_slices(frame, y_true, y_pred, class_names, directory=SLICES_DIR, verbose=True):
+    """
+    Write the slice metrics cube of predictions on the rows of frame.
+    
+    Confusion matrices per Course, Gender, Scholarship holder, attendance,
+    age band and every combination of them (slice_metrics.py), as
+    slices.json plus one binary block file the dashboard loads per slice.
+    Returns the index without its combination entries.
+    """
+    from slice_metrics import build_slices, weakest_slices, write_slices
+    index, data = build_slices(frame, y_true, y_pred, class_names)
+    if directory.exists():
+        write_slices(index, data, directory, write=write_atomic)
+    if verbose:
+        print("\n--- Slice Metrics ---")
+        print(f"{len(index['combinations'])} dimension combinations, "
+              f"{len(data) / 1024:.1f} KB of counts")
+        print(f"Weakest slices (at least {index['min_support']} rows):")
+        for row in weakest_slices(index, data):
+            print(f"  {row['dimension']} = {row['value']}: macro F1 {row['macro_f1']:.4f} "
+                  f"({row['rows']} rows)")
+    return {key: value for key, value in index.items() if key != "combinations"}
+
+
+def record_run(results, boosting_backend, data_key, store=None):
+    """
+    Record the run in the shared SQLite run store (shared-data/run_store.py).
+    
+    The dashboards poll it through shared-data/run_api.py for the metric
+    history and model comparisons. Returns the new run_id.
+    """
+    metrics = results["evaluation_metrics"]
+    store = store or RunStore()
+    return store.add_run(
+        pipeline="claude",
+        model=f"voting_rf_{boosting_backend}",
+        metrics={
+            "macro_f1": metrics["macro_f1_score"],
+            "weighted_f1": metrics["weighted_f1_score"],
+            "balanced_accuracy": metrics["balanced_accuracy"],
+            "accuracy": metrics["accuracy"],
+        },
+        training_time=results["training_time_seconds"],
+        data_hash=data_key[:16],
+        result=results,
+        summary=run_summary(results),
+    )
+
+
+def save_model(model, scaler, label_encoder, feature_engineer, path=MODEL_PATH,
+               drift_reference=None, metadata=None, decision=None):
+    """
+    Persist everything needed for inference in a single artifact.
+    
+    The fitted ensemble, the scaler and the label encoder are stored together
+    with the fitted feature transformer, so scoring never has to retrain.
+    drift_reference holds the training feature sketches for the drift check,
+    metadata e.g. the full training time (reference for incremental retrains).
+    decision is the calibration and class-weight rule (calibration.py) applied
+    to the ensemble's probabilities; None means plain argmax.
+    """
+    from compiled_trees import CompiledEnsemble
+    artifact = {
+        "model": model,
+        "scaler": scaler,
+        "label_encoder": label_encoder,
+        "feature_engineer": feature_engineer,
+        "drift_reference": drift_reference,
+        "metadata": metadata or {},
+        "decision": decision,
+    }
+    joblib.dump(artifact, path)
+    root, shown = SCRIPT_DIR.parent.resolve(), Path(path).resolve()
+    print(f"\n  ✓ Model saved to: {shown.relative_to(root) if shown.is_relative_to(root) else shown}")
+    
+    # Flat node arrays of all trees for low-latency scoring (compiled_trees.py)
+    try:
+        compiled = CompiledEnsemble.from_voting(model)
+    except TypeError as e:
+        # e.g. the 'hist' boosting backend; a stale file would not match the new model
+        COMPILED_MODEL_PATH.unlink(missing_ok=True)
+        print(f"  - Compiled trees skipped ({e})")
+        return
+    compiled.save(COMPILED_MODEL_PATH)
+    print(f"  ✓ Compiled trees saved to: {COMPILED_MODEL_PATH.relative_to(SCRIPT_DIR.parent)}")
+
+
+def load_model(path=MODEL_PATH):
+    """
+    Load a model artifact written by save_model, or a compact export
+    (export_compact), which is memory-mapped instead of unpickled.
+    """
+    import compact_model
+    if not Path(path).exists():
+        raise FileNotFoundError(
+            f"No trained model at {path}. Run 'python dropout_prediction.py train' first."
+        )
+    if compact_model.is_compact(path):
+        return compact_model.load_artifact(path)
+    return joblib.load(path)
+
+
+def predict(input_path, output_path, model_path=MODEL_PATH, chunk_size=PREDICT_CHUNK_SIZE,
+            explain=0, similar=0, index_path=SIMILAR_INDEX_PATH):
+    """
+    Score a (potentially very large) semicolon CSV with the persisted ensemble.
+    
+    The input is streamed in fixed-size chunks: each chunk goes through
+    the fitted FeatureEngineer and scaler, is scored, and its class
+    probabilities are appended to the output CSV. Memory use is therefore
+    bounded by chunk_size, not by the size of the input file.
+    
+    With explain=k, the k features contributing most to each student's
+    predicted class are added (tree-path contributions, attribution.py).
+    With similar=k, the k most similar historical students (row in the
+    indexed CSV, outcome, distance) are added (similar_students.py).
+    
+    If the artifact holds a decision rule, the written probabilities are the
+    calibrated ones and the prediction is its weighted argmax.
+    """
+    from compact_model import CompactEnsemble
+    print("\n" + "=" * 60)
+    print("PREDICTING")
+    print("=" * 60)
+    
+    artifact = load_model(model_path)
+    model = artifact["model"]
+    scaler = artifact["scaler"]
+    class_names = artifact["label_encoder"].classes_
+    feature_engineer = artifact["feature_engineer"]
+    decision = artifact.get("decision")
+    probability_columns = [f"proba_{name}" for name in class_names]
+    if explain:
+        if isinstance(model, CompactEnsemble):
+            raise ValueError("--explain needs the full model artifact, not a compact export")
+        from attribution import TreeAttributor
+        attributor = TreeAttributor.from_voting(model)
+        feature_names = feature_engineer.get_feature_names_out()
+    if similar:
+        index, outcome_names = load_similarity_index(index_path, scaler)
+    
+    start_time = time.time()
+    n_rows = 0
+    
+    for i, chunk in enumerate(iter_csv_chunks(input_path, chunk_size)):
+        # Columns are selected by name, so an optional Target column is ignored
+        X_scaled = scaler.transform(feature_engineer.transform(chunk))
+        
+        proba = model.predict_proba(X_scaled)
+        if decision is not None:
+            proba = decision.predict_proba(proba)
+            predicted = decision.decide(proba)
+        else:
+            predicted = proba.argmax(axis=1)
+        out = pd.DataFrame(proba, columns=probability_columns, index=chunk.index)
+        out.insert(0, "prediction", class_names[predicted])
+        if explain:
+            top, contribution, _ = attributor.top_contributions(X_scaled, explain,
+                                                                target=predicted)
+            for k in range(top.shape[1]):
+                out[f"top{k + 1}_feature"] = feature_names[top[:, k]]
+                out[f"top{k + 1}_contribution"] = contribution[:, k]
+        if similar:
+            rows, outcomes, distances = index.query(X_scaled, similar)
+            for k in range(rows.shape[1]):
+                out[f"similar{k + 1}_row"] = rows[:, k]
+                out[f"similar{k + 1}_target"] = outcome_names[outcomes[:, k]]
+                out[f"similar{k + 1}_distance"] = distances[:, k]
+        out.to_csv(output_path, mode='w' if i == 0 else 'a', header=(i == 0),
+                   index_label="row", float_format="%.6f")
+        
+        n_rows += len(chunk)
+        print(f"  Chunk {i + 1}: {n_rows} rows scored")
+    
+    elapsed = time.time() - start_time
+    print(f"\nScored {n_rows} rows in {elapsed:.2f} seconds")
+    print(f"  ✓ Predictions written to: {output_path}")
+    
+    return n_rows
+
+
+def held_out_rows(artifact, input_path=None, split="test"):
+    """
+    Scaled features and encoded labels to evaluate a saved model on.
+    
+    Without input_path the given split of data.csv ("test": the rows train
+    held out, "train": the rows it fitted on; stratified, random_state=42),
+    otherwise all rows of a labeled semicolon CSV.
+    """
+    from sklearn.model_selection import train_test_split
+    df = load_data(DATA_PATH) if input_path is None else read_csv(input_path)
+    X = artifact["feature_engineer"].transform(df.drop(columns='Target'))
+    y = artifact["label_encoder"].transform(df['Target'])
+    if input_path is None:
+        X_train, X_test, y_train, y_test = train_test_split(
+            X, y, test_size=0.2, random_state=SPLIT_RANDOM_STATE, stratify=y
+        )
+        X, y = (X_test, y_test) if split == "test" else (X_train, y_train)
+    return artifact["scaler"].transform(X), y
+
+
+def prune_on_validation(artifact, compact, tolerance, value_bits=DEFAULT_VALUE_BITS):
+    """
+    Prune a compact export with sizes chosen away from the test split.
+    
+    The saved model has seen every training row, so a copy of the ensemble
+    is fitted on 80% of the training split and compact_model.prune picks the
+    sizes (trees, depth, stages) on the remaining 20%. The same sizes then
+    cut the saved model's export. Returns the pruned CompactEnsemble and the
+    pruning report (scores on the validation slice).
+    """
+    import compact_model
+    from sklearn.base import clone
+    from sklearn.model_selection import train_test_split
+    from compact_model import CompactEnsemble
+    model, decision = artifact["model"], artifact.get("decision")
+    X, y = held_out_rows(artifact, split="train")
+    X_fit, X_val, y_fit, y_val = train_test_split(
+        X, y, test_size=0.2, random_state=SPLIT_RANDOM_STATE, stratify=y
+    )
+    print(f"\nChoosing the pruning on {len(y_val)} validation rows "
+          f"(ensemble refitted on {len(y_fit)} training rows)...")
+    probe = CompactEnsemble.from_voting(clone(model).fit(X_fit, y_fit), value_bits)
+    _, pruning = compact_model.prune(probe, X_val.astype(np.float32), y_val, tolerance, decision)
+    
+    rf_max_depth = pruning["rf_max_depth"][1]
+    if rf_max_depth == pruning["rf_max_depth"][0]:
+        # Uncut in the probe: the saved model's trees may grow deeper and stay uncut too
+        rf_max_depth = None
+    pruned = compact_model.truncate(compact, pruning["rf_trees"][1], rf_max_depth,
+                                    pruning["gb_stages"][1])
+    forest = next(est for est in compact.estimators if est.kind == 'rf')
+    pruned_forest = next(est for est in pruned.estimators if est.kind == 'rf')
+    return pruned, {
+        "tolerance": tolerance,
+        "validation_rows": int(len(y_val)),
+        "validation_macro_f1_before": pruning["macro_f1_before"],
+        "validation_macro_f1_after": pruning["macro_f1_after"],
+        "rf_trees": pruning["rf_trees"],
+        "rf_max_depth": [forest.trees.max_depth, pruned_forest.trees.max_depth],
+        "gb_stages": pruning["gb_stages"],
+        "nodes": [compact.n_nodes, pruned.n_nodes],
+    }
+
+
+def evaluate_saved(input_path=None, model_path=MODEL_PATH):
+    """
+    Evaluate the persisted ensemble without retraining.
+    
+    Rows as in held_out_rows; the model's decision rule is applied like in
+    predict. The streaming model (model_streaming.joblib) was split with
+    StratifiedStreamSplit, so the test split of train includes its training
+    rows: it is evaluated on an explicit input CSV only.
+    """
+    from compact_model import CompactEnsemble
+    artifact = load_model(model_path)
+    model = artifact["model"]
+    if isinstance(model, CompactEnsemble):
+        raise ValueError("evaluate needs the full model artifact, not a compact export")
+    if not hasattr(model, "named_estimators_") and input_path is None:
+        raise ValueError(f"{model_path} is not the voting ensemble (e.g. the streaming model); "
+                         "its test rows differ from train's split, so pass a labeled CSV to "
+                         "evaluate it on, or see result_streaming.json")
+    label_encoder, decision = artifact["label_encoder"], artifact.get("decision")
+    X_scaled, y = held_out_rows(artifact, input_path)
+    
+    proba = model.predict_proba(X_scaled)
+    y_pred = proba.argmax(axis=1) if decision is None else decision.predict(proba)
+    return evaluate_model(model, X_scaled, y, label_encoder.classes_,
+                          artifact.get("metadata", {}).get("training_time", 0.0), y_pred)
+
+
+def _load_and_score(load, X_row, repeats=3):
+    """Fastest seconds of load() plus the first one-row prediction."""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        load().predict_proba(X_row)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def export_compact(model_path=MODEL_PATH, output_path=COMPACT_MODEL_PATH, prune_tolerance=None,
+                   value_bits=DEFAULT_VALUE_BITS):
+    """
+    Export the persisted ensemble in the compact format (compact_model.py).
+    
+    Thresholds become float32, node indices int16/int32 and leaf values
+    8- or 16-bit integers; with prune_tolerance the forest (trees, depth)
+    and the boosting stages are cut as far as the macro-F1 (decision rule
+    applied) on a validation slice of the training split stays within the
+    tolerance (prune_on_validation).
+    
+    Returns a report of size, load time (load + first one-row prediction)
+    and accuracy on the test split of the joblib artifact, the compiled
+    trees and the compact export.
+    """
+    import compact_model
+    from sklearn.metrics import f1_score
+    from compact_model import CompactEnsemble
+    from compiled_trees import CompiledEnsemble
+    print("\n" + "=" * 60)
+    print("COMPACT MODEL EXPORT")
+    print("=" * 60)
+    
+    artifact = load_model(model_path)
+    model, decision = artifact["model"], artifact.get("decision")
+    # Raises TypeError for the 'hist' boosting backend (no tree arrays to export)
+    compiled = CompiledEnsemble.from_voting(model)
+    compact = CompactEnsemble.from_compiled(compiled, value_bits)
+    X, y = held_out_rows(artifact)
+    X = X.astype(np.float32)
+    reference = model.predict_proba(X)
+    
+    pruning = None
+    if prune_tolerance is not None:
+        compact, pruning = prune_on_validation(artifact, compact, prune_tolerance, value_bits)
+        print(f"Pruned (tolerance {prune_tolerance}, validation macro-F1 "
+              f"{pruning['validation_macro_f1_before']:.4f} -> "
+              f"{pruning['validation_macro_f1_after']:.4f}): "
+              f"trees {pruning['rf_trees'][0]} -> {pruning['rf_trees'][1]}, "
+              f"depth {pruning['rf_max_depth'][0]} -> {pruning['rf_max_depth'][1]}, "
+              f"stages {pruning['gb_stages'][0]} -> {pruning['gb_stages'][1]}, "
+              f"nodes {pruning['nodes'][0]} -> {pruning['nodes'][1]}")
+    
+    objects = {name: artifact.get(name) for name in
+               ("scaler", "label_encoder", "feature_engineer", "decision", "metadata")}
+    compact.save(output_path, objects)
+    # The compiled trees of this model (model_compiled.npz may belong to another one)
+    compiled_path = Path(tempfile.mkdtemp()) / COMPILED_MODEL_PATH.name
+    compiled.save(compiled_path)
+    
+    X_row = X[:1]
+    formats = {
+        "joblib": (model_path, lambda: joblib.load(model_path)["model"], model),
+        "compiled": (compiled_path, lambda: CompiledEnsemble.load(compiled_path), compiled),
+        "compact": (output_path, lambda: compact_model.load(output_path)[0], compact),
+    }
+    report = {"value_bits": value_bits, "pruning": pruning, "formats": {}}
+    print(f"\n{'format':<10} {'size':>10} {'load+1 row':>11} {'macro F1':>9} "
+          f"{'max |dp|':>9} {'agreement':>10}")
+    for name, (path, load, scorer) in formats.items():
+        proba = scorer.predict_proba(X)
+        y_pred = proba.argmax(axis=1) if decision is None else decision.predict(proba)
+        y_ref = reference.argmax(axis=1) if decision is None else decision.predict(reference)
+        entry = {
+            "path": str(path),
+            "bytes": Path(path).stat().st_size,
+            "load_seconds": round(_load_and_score(load, X_row), 4),
+            "macro_f1": round(float(f1_score(y, y_pred, average='macro')), 4),
+            "max_proba_difference": round(float(np.abs(proba - reference).max()), 6),
+            "agreement": round(float((y_pred == y_ref).mean()), 4),
+        }
+        report["formats"][name] = entry
+        print(f"{name:<10} {entry['bytes'] / 1e6:>8.2f}MB {entry['load_seconds'] * 1000:>9.1f}ms "
+              f"{entry['macro_f1']:>9.4f} {entry['max_proba_difference']:>9.4f} "
+              f"{entry['agreement']:>10.2%}")
+    shutil.rmtree(compiled_path.parent)
+    report["formats"]["compiled"]["path"] = None
+    print(f"\n  ✓ Compact model saved to: {output_path}")
+    return report
+
+
+def check_drift(input_path, output_path=DRIFT_REPORT_PATH, model_path=MODEL_PATH,
+                chunk_size=PREDICT_CHUNK_SIZE):
+    """
+    Compare a new cohort CSV with the training distributions (drift_monitor.py).
+    
+    The CSV is streamed once in chunks through the feature sketches stored
+    with the model; the per-feature PSI/KS report is written as JSON.
+    """
+    from drift_monitor import DriftMonitor
+    print("\n" + "=" * 60)
+    print("DRIFT CHECK")
+    print("=" * 60)
+    
+    sketches = load_model(model_path).get("drift_reference")
+    if sketches is None:
+        raise ValueError(f"{model_path} has no drift reference. Retrain with 'train' first.")
+    
+    start_time = time.time()
+    monitor = DriftMonitor(sketches)
+    for chunk in iter_csv_chunks(input_path, chunk_size):
+        monitor.update(chunk)
+    report = monitor.report()
+    report["input"] = str(input_path)
+    elapsed = time.time() - start_time
+    
+    print(f"Scanned {report['rows']} rows against {report['reference_rows']} training rows "
+          f"in {elapsed:.2f} seconds\n")
+    print(f"{'Feature':<48} {'PSI':>7} {'KS':>7}  Status")
+    for f in report["features"][:15]:
+        ks = f"{f['ks_statistic']:.3f}" if f["ks_statistic"] is not None else "-"
+        flag = " (drift)" if f["drifted"] else ""
+        print(f"{f['feature'][:48]:<48} {f['psi']:>7.3f} {ks:>7}  {f['status']}{flag}")
+    
+    if report["retrain_recommended"]:
+        print(f"\n⚠ Drift in {len(report['drifted_features'])} feature(s) - retraining recommended")
+    else:
+        print("\n✓ No significant drift - the current model can be kept")
+    
+    write_atomic(output_path, json.dumps(report, indent=2, ensure_ascii=False).encode("utf-8"))
+    print(f"  ✓ Drift report written to: {output_path}")
+    return report
+
+
+def save_similarity_index(index, scaler, class_names, path=SIMILAR_INDEX_PATH):
+    """Persist a fitted SimilarityIndex with the outcome names and its scaler's digest."""
+    from stage_cache import digest
+    joblib.dump({"index": index, "class_names": np.asarray(class_names),
+                 "scaler_digest": digest(scaler)}, path)
+    print(f"  ✓ Similar-students index saved to: {path} "
+          f"({len(index.labels_)} students, {index.method})")
+
+
+def load_similarity_index(path=SIMILAR_INDEX_PATH, scaler=None):
+    """(SimilarityIndex, outcome names); with scaler, check that the index matches it."""
+    from stage_cache import digest
+    if not Path(path).exists():
+        raise FileNotFoundError(
+            f"No similar-students index at {path}. Run 'python cli.py index' first."
+        )
+    artifact = joblib.load(path)
+    if scaler is not None and artifact["scaler_digest"] != digest(scaler):
+        raise ValueError(f"{path} was built with another model's scaler. "
+                         "Rebuild it with 'python cli.py index'.")
+    return artifact["index"], artifact["class_names"]
+
+
+def build_similarity_index(input_path=None, model_path=MODEL_PATH, output_path=SIMILAR_INDEX_PATH,
+                           method=DEFAULT_INDEX_METHOD, n_components=None,
+                           candidates=DEFAULT_CANDIDATES, chunk_size=PREDICT_CHUNK_SIZE):
+    """
+    Index the students of a labeled semicolon CSV (default: all rows of data.csv).
+    
+    The CSV is streamed in chunks through the model's feature transformer
+    and scaler; the index stores the scaled float32 rows, their outcomes and
+    row numbers (similar_students.py).
+    """
+    from similar_students import SimilarityIndex
+    print("\n" + "=" * 60)
+    print("SIMILAR-STUDENTS INDEX")
+    print("=" * 60)
+    
+    artifact = load_model(model_path)
+    scaler, feature_engineer = artifact["scaler"], artifact["feature_engineer"]
+    label_encoder = artifact["label_encoder"]
+    input_path = DATA_PATH if input_path is None else input_path
+    
+    blocks, labels = [], []
+    for chunk in iter_csv_chunks(input_path, chunk_size):
+        blocks.append(scaler.transform(feature_engineer.transform(chunk)))
+        labels.append(label_encoder.transform(chunk['Target']))
+    X, y = np.concatenate(blocks), np.concatenate(labels)
+    print(f"Read {len(X)} labeled students from {input_path}")
+    
+    index = SimilarityIndex(method, n_components, candidates).fit(X, y)
+    report = index.describe()
+    print(f"Built in {report['build_seconds']:.2f} seconds")
+    if report["projection_recall"] is not None:
+        print(f"Recall of the exact neighbors with {n_components} components: "
+              f"{report['projection_recall']:.1%}")
+    save_similarity_index(index, scaler, label_encoder.classes_, output_path)
+    return {"input": str(input_path), "output": str(output_path), **report}
+
+
+def what_if(input_path, row=0, values=None, deltas=None, model_path=MODEL_PATH, top=WHAT_IF_TOP):
+    """
+    Dropout risk of one student under a grid of feature changes (what_if.py).
+    
+    The student is row `row` of a semicolon CSV; values maps columns to
+    absolute values, deltas to changes of the student's value. All
+    combinations are scored; the `top` scenarios with the lowest risk are
+    printed and the full report is returned.
+    """
+    from what_if import RISK_CLASS, WhatIfEngine
+    print("\n" + "=" * 60)
+    print("WHAT-IF SCENARIOS")
+    print("=" * 60)
+    
+    engine = WhatIfEngine.from_artifact(load_model(model_path))
+    student = read_csv(input_path).iloc[row]
+    report = engine.evaluate(student, values, deltas)
+    report["input"], report["row"] = str(input_path), row
+    
+    base = report["student"]
+    print(f"Student {row} of {input_path}: {base['prediction']} "
+          f"({RISK_CLASS} {base['probabilities'].get(RISK_CLASS, 0.0):.1%})")
+    print(f"{len(report['scenarios'])} scenarios in {report['seconds'] * 1000:.1f} ms; "
+          + ", ".join(f"{kind} trees re-evaluated {n}/{total}"
+                      for kind, (n, total) in report["trees_reevaluated"].items()))
+    
+    ranked = sorted(report["scenarios"], key=lambda s: s.get("risk_change", 0.0))
+    print(f"\n{'Change in risk':>14}  {'Prediction':<10}  Changes")
+    for scenario in ranked[:top]:
+        changes = ", ".join(f"{c} = {v:g}" for c, v in scenario["changes"].items())
+        print(f"{scenario.get('risk_change', 0.0):>+14.1%}  {scenario['prediction']:<10}  {changes}")
+    return report
+
+
+def main_streaming(data_path=DATA_PATH, chunk_size=DEFAULT_STREAMING_CHUNK_SIZE,
+                   epochs=DEFAULT_EPOCHS, model_path=STREAMING_MODEL_PATH,
+                   categorical_encoding=DEFAULT_CATEGORICAL_ENCODING):
+    """
+    Out-of-core training mode (see streaming_training.py).
+    
+    Results go to result_streaming.json and the model to model_streaming.joblib,
+    so the ensemble results shown in the dashboards are left untouched.
+    """
+    from streaming_training import save_streaming_model, train_streaming
+    model, scaler, label_encoder, feature_engineer, results = train_streaming(
+        data_path, chunk_size=chunk_size, epochs=epochs, random_state=SPLIT_RANDOM_STATE,
+        categorical_encoding=categorical_encoding
+    )
+    
+    write_atomic(STREAMING_OUTPUT_PATH,
+                 json.dumps(results, indent=2, ensure_ascii=False).encode('utf-8'))
+    print(f"\n  ✓ Results saved to: {STREAMING_OUTPUT_PATH.relative_to(SCRIPT_DIR.parent)}")
+    
+    save_streaming_model(model, scaler, label_encoder, feature_engineer, model_path)
+    print(f"  ✓ Model saved to: {model_path}")
+    
+    return results
+
+
+def _macro_f1(model, scaler, X, y, decision=None):
+    """Macro F1 of the predictions, with the decision rule applied like in evaluate_saved."""
+    from sklearn.metrics import f1_score
+    proba = model.predict_proba(scaler.transform(X))
+    y_pred = proba.argmax(axis=1) if decision is None else decision.predict(proba)
+    return f1_score(y, y_pred, average='macro')
+
+
+def refresh_derived_artifacts(model_path, old_scaler_digest, index_path=SIMILAR_INDEX_PATH,
+                              compact_path=COMPACT_MODEL_PATH):
+    """
+    Bring the files derived from a model in line after it was updated in place.
+    
+    Files built with the model's previous scaler (old_scaler_digest) would
+    otherwise be read with mismatched features: the similar-students index is
+    rebuilt with its method and settings (from data.csv), a compact export is
+    removed since its pruning settings are not recorded.
+    """
+    import compact_model
+    from stage_cache import digest
+    if Path(index_path).exists() and joblib.load(index_path)["scaler_digest"] == old_scaler_digest:
+        index, _ = load_similarity_index(index_path)
+        build_similarity_index(model_path=model_path, output_path=index_path, method=index.method,
+                               n_components=index.n_components, candidates=index.candidates)
+    if (Path(compact_path).exists() and compact_model.is_compact(compact_path)
+            and digest(compact_model.load_artifact(compact_path).get("scaler")) == old_scaler_digest):
+        Path(compact_path).unlink()
+        print(f"\n⚠ Removed the stale compact export {compact_path}; "
+              "re-create it with 'python cli.py export'")
+
+
+def main_retrain(delta_path, model_path=MODEL_PATH, n_new_trees=DEFAULT_NEW_TREES,
+                 n_new_stages=DEFAULT_NEW_STAGES, recent_rows=DEFAULT_RECENT_ROWS,
+                 max_trees=DEFAULT_MAX_TREES, compare_full=False, if_drifted=False):
+    """
+    Incremental retraining mode (see incremental_training.py).
+    
+    Updates the persisted ensemble with a CSV of new labeled records (delta)
+    and reports wall-clock time and macro-F1 on the fixed random_state=42
+    test split against the previous model and a full retrain. The full
+    retrain is measured with compare_full=True; otherwise the training time
+    recorded with the model is used.
+    
+    With if_drifted=True the delta is first checked against the training
+    distributions and the model is only updated if drift is detected, so a
+    scheduled job retrains only when it is actually needed.
+    
+    All macro-F1 values apply the model's decision rule (calibration and
+    class weights), as train and evaluate do. The rule was fitted on
+    out-of-fold probabilities of the previous model and is not refitted
+    here; the report flags it as stale until the next 'train'. Ensembles
+    with the 'hist' boosting backend cannot be updated (TypeError). A
+    similar-students index or compact export of the previous model is
+    refreshed (refresh_derived_artifacts).
+    """
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import StandardScaler
+    from drift_monitor import DriftMonitor
+    from incremental_training import check_updatable, incremental_update
+    from stage_cache import digest
+    print("\n" + "=" * 60)
+    print("INCREMENTAL RETRAINING")
+    print("=" * 60)
+    
+    artifact = load_model(model_path)
+    model, scaler = artifact["model"], artifact["scaler"]
+    label_encoder, feature_engineer = artifact["label_encoder"], artifact["feature_engineer"]
+    metadata = artifact.get("metadata", {})
+    decision = artifact.get("decision")
+    check_updatable(model)
+    
+    delta = read_csv(delta_path)
+    print(f"Delta: {len(delta)} new records from {delta_path}")
+    
+    # ═══════════════════════════════════════════════════════════════
+    # DRIFT GATE (scheduled runs)
+    # ═══════════════════════════════════════════════════════════════
+    monitor = None
+    if artifact.get("drift_reference") is not None:
+        monitor = DriftMonitor(artifact["drift_reference"]).update(delta)
+    if if_drifted:
+        if monitor is None:
+            raise ValueError(f"{model_path} has no drift reference. Retrain with 'train' first.")
+        drift = monitor.report()
+        if not drift["retrain_recommended"]:
+            print("✓ No significant drift in the delta - model left unchanged")
+            return None
+        print(f"⚠ Drift in: {', '.join(drift['drifted_features'])}")
+    
+    # ═══════════════════════════════════════════════════════════════
+    # FIXED TEST SPLIT AND RECENT TRAINING ROWS
+    # ═══════════════════════════════════════════════════════════════
+    df = load_data(DATA_PATH)
+    X_base = feature_engineer.transform(df)
+    y_base = label_encoder.transform(df['Target'])
+    # Same split as train_model (it depends only on the row count and y)
+    train_idx, test_idx = train_test_split(
+        np.arange(len(df)), test_size=0.2, random_state=SPLIT_RANDOM_STATE, stratify=y_base
+    )
+    recent_idx = np.sort(train_idx)[-recent_rows:]
+    X_test, y_test = X_base[test_idx], y_base[test_idx]
+    X_delta = feature_engineer.transform(delta)
+    y_delta = label_encoder.transform(delta['Target'])
+    
+    f1_before = _macro_f1(model, scaler, X_test, y_test, decision)
+    # The update moves the scaler; files built with the old one are refreshed below
+    old_scaler_digest = digest(scaler)
+    
+    # ═══════════════════════════════════════════════════════════════
+    # WARM-STARTED UPDATE
+    # ═══════════════════════════════════════════════════════════════
+    print(f"\nAdding {n_new_trees} forest trees and {n_new_stages} boosting rounds "
+          f"(delta + {len(recent_idx)} recent rows)...")
+    incremental_time = incremental_update(
+        model, scaler, X_delta, y_delta, X_base[recent_idx], y_base[recent_idx],
+        n_new_trees=n_new_trees, n_new_stages=n_new_stages, max_trees=max_trees
+    )
+    f1_after = _macro_f1(model, scaler, X_test, y_test, decision)
+    print(f"Incremental update completed in {incremental_time:.2f} seconds")
+    
+    # ═══════════════════════════════════════════════════════════════
+    # FULL RETRAIN REFERENCE
+    # ═══════════════════════════════════════════════════════════════
+    boosting_backend = metadata.get("boosting_backend", "exact")
+    full_time, f1_full = metadata.get("training_time"), None
+    if compare_full:
+        print("\nFull retrain on all training rows + delta for comparison...")
+        X_full = np.concatenate([X_base[train_idx], X_delta])
+        y_full = np.concatenate([y_base[train_idx], y_delta])
+        full_scaler = StandardScaler().fit(X_full)
+        full_model = build_ensemble(boosting_backend)
+        start = time.perf_counter()
+        full_model.fit(full_scaler.transform(X_full), y_full)
+        full_time = time.perf_counter() - start
+        f1_full = _macro_f1(full_model, full_scaler, X_test, y_test, decision)
+    
+    report = {
+        "delta_rows": len(delta),
+        "recent_rows": len(recent_idx),
+        "new_trees": n_new_trees,
+        "new_boosting_rounds": n_new_stages,
+        "forest_trees": len(model.named_estimators_['rf'].estimators_),
+        "incremental_time_seconds": round(incremental_time, 2),
+        "full_training_time_seconds": None if full_time is None else round(full_time, 2),
+        "macro_f1_before": round(f1_before, 4),
+        "macro_f1_after": round(f1_after, 4),
+        "macro_f1_full_retrain": None if f1_full is None else round(f1_full, 4),
+        # Macro-F1 after the update uses the rule fitted for the previous model
+        "decision_rule": "none" if decision is None else "stale (fitted before this update)",
+    }
+    
+    print("\n" + "=" * 30)
+    print("RETRAINING SUMMARY")
+    print("=" * 30)
+    if full_time:
+        source = "measured" if compare_full else "recorded at training"
+        print(f"Wall time:  {incremental_time:.2f}s incremental vs {full_time:.2f}s full ({source}) "
+              f"-> {full_time / incremental_time:.1f}x faster, {full_time - incremental_time:.1f}s saved")
+    print(f"Macro F1:   {f1_before:.4f} before -> {f1_after:.4f} after "
+          f"({f1_after - f1_before:+.4f}) on the random_state={SPLIT_RANDOM_STATE} test split")
+    if f1_full is not None:
+        print(f"            {f1_full:.4f} full retrain ({f1_after - f1_full:+.4f} incremental vs full)")
+    if decision is not None:
+        print("Decision rule: fitted before this update; run 'train' to refit it")
+    print("=" * 30)
+    
+    # The reference now also covers the delta, so the next check compares against it
+    drift_reference = monitor and artifact["drift_reference"].merged(monitor)
+    save_model(model, scaler, label_encoder, feature_engineer, path=model_path,
+               drift_reference=drift_reference,
+               metadata={**metadata, "last_incremental_update": report},
+               decision=artifact.get("decision"))
+    refresh_derived_artifacts(model_path, old_scaler_digest)
+    RunStore().add_run(
+        pipeline="claude",
+        model=f"voting_rf_{boosting_backend}_incremental",
+        metrics={"macro_f1": report["macro_f1_after"]},
+        training_time=report["incremental_time_seconds"],
+        data_hash=file_hash(delta_path)[:16],
+        summary=report,
+    )
+    return report
+
+
+def calibrate_decisions(model, X, y, X_test, y_test, class_names, boosting_backend, cache,
+                        features_key, method=DEFAULT_CALIBRATION, n_splits=DEFAULT_N_SPLITS,
+                        n_jobs=None):
+    """
+    Fit probability calibration and per-class decision weights (calibration.py).
+    
+    Rationale: soft voting averages uncalibrated RF and boosting
+    probabilities, and their argmax under-predicts the minority 'Enrolled'
+    class. Calibration and weights are fitted on out-of-fold probabilities
+    of the training rows only, so the test split stays untouched.
+    
+    The out-of-fold probabilities (one K-fold pass over the training split)
+    go through the stage cache; changing the method or the weight grid only
+    reruns the millisecond grid search. Returns (DecisionRule, report, test
+    predictions of the rule).
+    """
+    import cross_validation
+    import profiling
+    from sklearn.model_selection import train_test_split
+    from sklearn.pipeline import make_pipeline
+    from sklearn.preprocessing import StandardScaler
+    from calibration import compare_on_test, fit_decision_rule
+    from cross_validation import out_of_fold_proba
+    from stage_cache import code_digest, digest
+    print("\n" + "=" * 60)
+    print("CALIBRATION AND DECISION THRESHOLDS")
+    print("=" * 60)
+    
+    X_train, _, y_train, _ = train_test_split(
+        X, y, test_size=0.2, random_state=SPLIT_RANDOM_STATE, stratify=y
+    )
+    estimator = make_pipeline(StandardScaler(), build_ensemble(boosting_backend))
+    oof_key = cache.key("oof_probabilities", inputs=[features_key, digest(estimator)],
+                        code=[code_digest(cross_validation, profiling)],
+                        params={"n_splits": n_splits, "test_size": 0.2,
+                                "random_state": SPLIT_RANDOM_STATE})
+    oof = cache.cached("oof_probabilities", oof_key, lambda: dict(zip(
+        ("proba", "fit_time"), out_of_fold_proba(estimator, X_train, y_train, n_splits=n_splits,
+                                                 n_jobs=n_jobs, random_state=SPLIT_RANDOM_STATE)
+    )))
+    
+    decision, report = fit_decision_rule(oof["proba"], y_train, class_names, method)
+    y_pred, report["test"] = compare_on_test(decision, model.predict_proba(X_test), y_test,
+                                             class_names)
+    
+    print(f"\nCalibration: {report['calibration']}")
+    print("Class weights: " + ", ".join(f"{name} {w:.3f}"
+                                        for name, w in report["class_weights"].items()))
+    print(f"Grid search: {report['grid_points']} points in {report['fit_seconds'] * 1000:.1f} ms")
+    for split in ("out_of_fold", "test"):
+        part = report[split]
+        print(f"  {split:<12} macro F1 {part['macro_f1_argmax']:.4f} argmax -> "
+              f"{part['macro_f1_tuned']:.4f} tuned; recall " + ", ".join(
+                  f"{name} {part['recall_argmax'][name]:.3f}->{part['recall_tuned'][name]:.3f}"
+                  for name in class_names))
+    return decision, report, y_pred
+
+
+def main(boosting_backend=DEFAULT_BOOSTING_BACKEND, cv=False, cv_splits=DEFAULT_N_SPLITS,
+         cv_repeats=DEFAULT_N_REPEATS, cv_jobs=None, use_cache=True,
+         cache_max_bytes=DEFAULT_MAX_BYTES, explain=True, calibration_method=DEFAULT_CALIBRATION,
+         calibrate=DEFAULT_CALIBRATE, calibration_splits=DEFAULT_N_SPLITS, explore=True):
+    """
+    Main pipeline execution (with cv=True also repeated cross-validation,
+    with explain=True feature attribution on the test set, with calibrate=True
+    calibration and class weights fitted on out-of-fold probabilities, with
+    explore=False without the exploratory statistics of the dataset).
+    
+    Engineered features, scaler, base estimators, test predictions,
+    out-of-fold probabilities and CV results are cached by content (stage_cache.py); rerunning with unchanged
+    data, code and parameters only re-evaluates and rewrites the results.
+    """
+    import attribution
+    import compiled_trees
+    import cross_validation
+    import features
+    import profiling
+    from sklearn.pipeline import make_pipeline
+    from sklearn.preprocessing import StandardScaler
+    from attribution import explain_model
+    from cross_validation import repeated_cv
+    from drift_monitor import FeatureSketches
+    from profiling import PipelineProfiler
+    from similar_students import SimilarityIndex
+    from stage_cache import code_digest, digest, StageCache
     print("\n" + "=" * 60)
     print("STUDENT DROPOUT PREDICTION - ML PIPELINE")
     print("=" * 60)
@@ -452,27 +1403,116 @@ def main():
     print("Dataset: Predict Students' Dropout and Academic Success")
     print("=" * 60)
     
+    profiler = PipelineProfiler()
+    cache = StageCache(max_bytes=cache_max_bytes, enabled=use_cache)
+    
     # Step 1: Load and explore data
-    df = load_and_explore_data()
+    with profiler.stage("load_and_explore_data"):
+        df = load_and_explore_data(explore)
+        data_key = content_hash(DATA_PATH)
+        # Reference distributions for later drift checks of new cohorts
+        drift_reference = FeatureSketches.from_frame(df.drop(columns='Target'))
     
     # Step 2: Preprocess data
-    X, y, class_names, label_encoder = preprocess_data(df)
+    with profiler.stage("preprocess_data"):
+        features_key = cache.key("features", inputs=[data_key],
+                                 code=[code_digest(preprocess_data, features)])
+        preprocessed = cache.cached("features", features_key, lambda: dict(zip(
+            ("X", "y", "class_names", "label_encoder", "feature_engineer"), preprocess_data(df)
+        )))
+        X, y = preprocessed["X"], preprocessed["y"]
+        class_names = preprocessed["class_names"]
+        label_encoder = preprocessed["label_encoder"]
+        feature_engineer = preprocessed["feature_engineer"]
     
     # Step 3: Train model
-    model, scaler, X_test, y_test, training_time = train_model(X, y, class_names)
+    with profiler.stage("train_model"):
+        model, scaler, X_test, y_test, training_time, model_key = train_model(
+            X, y, class_names, boosting_backend, cache=cache, input_key=features_key
+        )
+        predictions_key = cache.key("predictions", inputs=[model_key, features_key])
+        y_pred = cache.cached("predictions", predictions_key,
+                              lambda: {"y_pred": model.predict(X_test)})["y_pred"]
+    profiler.record_estimators(model)
+    
+    # Step 3a: Calibration and decision thresholds from out-of-fold probabilities
+    decision, y_pred_argmax = None, y_pred
+    if calibrate:
+        with profiler.stage("calibration"):
+            decision, calibration_report, y_pred = calibrate_decisions(
+                model, X, y, X_test, y_test, class_names, boosting_backend, cache, features_key,
+                calibration_method, calibration_splits, n_jobs=cv_jobs
+            )
     
     # Step 4: Evaluate model
-    results = evaluate_model(model, X_test, y_test, class_names, training_time)
+    with profiler.stage("evaluate_model"):
+        results = evaluate_model(model, X_test, y_test, class_names, training_time, y_pred)
+        results["pipeline_documentation"]["decision_rule"] = decision_documentation(decision)
+        if decision is not None:
+            results["calibration"] = calibration_report
+            # Side by side with the headline (decision rule) metrics
+            results["evaluation_metrics_argmax"] = headline_metrics(y_test, y_pred_argmax)
+    
+    # Step 4a: Feature attribution (permutation importance + tree-path contributions)
+    if explain:
+        with profiler.stage("feature_attribution"):
+            attribution_key = cache.key("feature_attribution", inputs=[model_key, features_key],
+                                        code=[code_digest(attribution, compiled_trees)],
+                                        params={"n_repeats": attribution.DEFAULT_N_REPEATS,
+                                                "random_state": SPLIT_RANDOM_STATE,
+                                                "decision": None if decision is None
+                                                else digest(decision)})
+            # Columns in parallel threads; importance scored with the decision rule
+            results["feature_attribution"] = cache.cached("feature_attribution", attribution_key, lambda: {
+                "result": explain_model(model, X_test, y_test,
+                                        feature_engineer.get_feature_names_out(), class_names,
+                                        n_jobs=-1, random_state=SPLIT_RANDOM_STATE,
+                                        decision=decision)
+            })["result"]
+    
+    # Step 4b: Repeated cross-validation (optional, refits the whole model per fold)
+    if cv:
+        with profiler.stage("cross_validation"):
+            estimator = make_pipeline(StandardScaler(), build_ensemble(boosting_backend))
+            cv_key = cache.key("cross_validation", inputs=[features_key, digest(estimator)],
+                               code=[code_digest(cross_validation, profiling)],
+                               params={"n_splits": cv_splits, "n_repeats": cv_repeats,
+                                       "random_state": SPLIT_RANDOM_STATE})
+            results["cross_validation"] = cache.cached("cross_validation", cv_key, lambda: {
+                "result": repeated_cv(estimator, X, y, class_names, n_splits=cv_splits,
+                                      n_repeats=cv_repeats, n_jobs=cv_jobs,
+                                      random_state=SPLIT_RANDOM_STATE)
+            })["result"]
+    
+    # Step 4c: Metrics per Course / Gender / ... slice for the dashboard drill-down
+    with profiler.stage("slice_metrics"):
+        save_slices(df.iloc[test_split_rows(y)], y_test, y_pred, class_names)
     
     # Step 5: Save results
-    save_results(results)
+    results["performance"] = profiler.report()
+    results["performance"]["stage_cache"] = cache.stats
+    with profiler.stage("save_results"):
+        save_results(results)
+    
+    # Rewrite the (small) result files so the block includes save_results itself;
+    # this final version is recorded in the run history and written while the model is saved
+    results["performance"] = profiler.report()
+    results["performance"]["stage_cache"] = cache.stats
+    publishing = save_results(results, verbose=False, record_history=True, wait=False)
+    profiler.print_summary()
+    
+    # Step 6: Persist model for the predict mode
+    save_model(model, scaler, label_encoder, feature_engineer, drift_reference=drift_reference,
+               metadata={"training_time": training_time, "boosting_backend": boosting_backend},
+               decision=decision)
+    # Similar students for explanations by example (predict --similar)
+    save_similarity_index(SimilarityIndex().fit(scaler.transform(X), y), scaler, class_names)
+    report_published(publishing.result(), verbose=False)
+    run_id = record_run(results, boosting_backend, data_key)
+    print(f"Recorded as run {run_id} in the run store")
     
     print("\n" + "=" * 60)
     print("PIPELINE COMPLETED SUCCESSFULLY")
     print("=" * 60)
     
     return results
-
-
-if __name__ == "__main__":
-    main()
@@ -0,0 +1,183 @@
+"""
+Feature Engineering Transformer
+===============================
+
+Vectorized, sklearn-compatible implementation of the domain-knowledge features
+used by the dropout prediction pipeline.
+
+Column positions are resolved once in fit(); transform() then writes the raw
+features and all derived features into a single preallocated, column-major
+(Fortran-contiguous) float32 array, so every per-feature operation runs over
+contiguous memory. No intermediate DataFrames are created and every ratio is
+computed only where its denominator is non-zero.
+"""
+
+import numpy as np
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.utils.validation import check_is_fitted
+
+
+# Source columns required by the derived features
+SEM1_CREDITED = 'Curricular units 1st sem (credited)'
+SEM1_ENROLLED = 'Curricular units 1st sem (enrolled)'
+SEM1_EVALUATIONS = 'Curricular units 1st sem (evaluations)'
+SEM1_APPROVED = 'Curricular units 1st sem (approved)'
+SEM1_GRADE = 'Curricular units 1st sem (grade)'
+SEM2_CREDITED = 'Curricular units 2nd sem (credited)'
+SEM2_ENROLLED = 'Curricular units 2nd sem (enrolled)'
+SEM2_EVALUATIONS = 'Curricular units 2nd sem (evaluations)'
+SEM2_APPROVED = 'Curricular units 2nd sem (approved)'
+SEM2_GRADE = 'Curricular units 2nd sem (grade)'
+DEBTOR = 'Debtor'
+TUITION_UP_TO_DATE = 'Tuition fees up to date'
+AGE_AT_ENROLLMENT = 'Age at enrollment'
+
+SOURCE_COLUMNS = [
+    SEM1_CREDITED, SEM1_ENROLLED, SEM1_EVALUATIONS, SEM1_APPROVED, SEM1_GRADE,
+    SEM2_CREDITED, SEM2_ENROLLED, SEM2_EVALUATIONS, SEM2_APPROVED, SEM2_GRADE,
+    DEBTOR, TUITION_UP_TO_DATE, AGE_AT_ENROLLMENT,
+]
+
+# Derived features, in output order
+ENGINEERED_FEATURES = [
+    'sem1_approval_rate',
+    'sem2_approval_rate',
+    'total_approval_rate',
+    'avg_grade',
+    'grade_improvement',
+    'total_credited',
+    'evaluation_efficiency',
+    'financial_stress',
+    'age_deviation',
+]
+
+# Source columns of every derived feature (what-if scenarios recompute only
+# the features whose sources they change)
+ENGINEERED_SOURCES = {
+    'sem1_approval_rate': (SEM1_APPROVED, SEM1_ENROLLED),
+    'sem2_approval_rate': (SEM2_APPROVED, SEM2_ENROLLED),
+    'total_approval_rate': (SEM1_APPROVED, SEM2_APPROVED, SEM1_ENROLLED, SEM2_ENROLLED),
+    'avg_grade': (SEM1_GRADE, SEM2_GRADE),
+    'grade_improvement': (SEM1_GRADE, SEM2_GRADE),
+    'total_credited': (SEM1_CREDITED, SEM2_CREDITED),
+    'evaluation_efficiency': (SEM1_APPROVED, SEM2_APPROVED, SEM1_EVALUATIONS, SEM2_EVALUATIONS),
+    'financial_stress': (DEBTOR, TUITION_UP_TO_DATE),
+    'age_deviation': (AGE_AT_ENROLLMENT,),
+}
+
+# Typical age at enrollment (18-20), used for age_deviation
+TYPICAL_AGE = 19
+
+
+def affected_features(columns):
+    """Derived features (in output order) that depend on any of the raw columns."""
+    columns = set(columns)
+    return [name for name in ENGINEERED_FEATURES if columns.intersection(ENGINEERED_SOURCES[name])]
+
+
+class FeatureEngineer(BaseEstimator, TransformerMixin):
+    """
+    Append the 9 engineered features to the raw feature matrix.
+
+    Output: float32 array of shape (n_samples, n_features_in_ + 9), raw columns
+    first (in fit order) followed by ENGINEERED_FEATURES.
+
+    Works on DataFrames (columns are selected by name, so column order in
+    scoring files may differ from training) and on plain arrays laid out like
+    the training data.
+    """
+
+    def fit(self, X, y=None):
+        """Record the input columns and resolve source column positions."""
+        if hasattr(X, 'columns'):
+            self.feature_names_in_ = np.asarray(X.columns, dtype=object)
+        else:
+            raise TypeError("FeatureEngineer must be fitted on a DataFrame with named columns")
+
+        missing = [col for col in SOURCE_COLUMNS if col not in X.columns]
+        if missing:
+            raise ValueError(f"Missing required columns: {missing}")
+
+        names = list(self.feature_names_in_)
+        self.n_features_in_ = len(names)
+        self.column_index_ = {col: names.index(col) for col in SOURCE_COLUMNS}
+        return self
+
+    def transform(self, X):
+        """Compute raw + engineered features in one pass into a float32 array."""
+        check_is_fitted(self, 'column_index_')
+        n_in = self.n_features_in_
+        n_rows = X.shape[0]
+
+        out = np.empty((n_rows, n_in + len(ENGINEERED_FEATURES)), dtype=np.float32, order='F')
+
+        # Copy raw features column by column (no full-frame temporary)
+        if hasattr(X, 'columns'):
+            for j, name in enumerate(self.feature_names_in_):
+                out[:, j] = X[name].to_numpy()
+        else:
+            X = np.asarray(X)
+            if X.shape[1] != n_in:
+                raise ValueError(f"Expected {n_in} features, got {X.shape[1]}")
+            out[:, :n_in] = X
+
+        return self.derive(out)
+
+    def derive(self, out, features=ENGINEERED_FEATURES):
+        """
+        Write derived features into out (layout of transform's output) from its raw columns.
+
+        With a subset of ENGINEERED_FEATURES only those columns are
+        recomputed; all other columns of out are left as they are.
+        """
+        check_is_fitted(self, 'column_index_')
+        idx = self.column_index_
+        n_in = self.n_features_in_
+        raw = out[:, :n_in]
+        new = {name: out[:, n_in + i] for i, name in enumerate(ENGINEERED_FEATURES)}
+        features = set(features)
+
+        def col(name):
+            return raw[:, idx[name]]
+
+        def ratio(numerator, denominator, target):
+            # 0 where the denominator is 0, division only where it is > 0
+            target[:] = 0
+            np.divide(numerator, denominator, out=target, where=denominator > 0)
+
+        # Shared sums, computed once and only if needed
+        if features & {'total_approval_rate', 'evaluation_efficiency'}:
+            total_approved = col(SEM1_APPROVED) + col(SEM2_APPROVED)
+
+        if 'sem1_approval_rate' in features:
+            ratio(col(SEM1_APPROVED), col(SEM1_ENROLLED), new['sem1_approval_rate'])
+        if 'sem2_approval_rate' in features:
+            ratio(col(SEM2_APPROVED), col(SEM2_ENROLLED), new['sem2_approval_rate'])
+        if 'total_approval_rate' in features:
+            ratio(total_approved, col(SEM1_ENROLLED) + col(SEM2_ENROLLED),
+                  new['total_approval_rate'])
+        if 'evaluation_efficiency' in features:
+            ratio(total_approved, col(SEM1_EVALUATIONS) + col(SEM2_EVALUATIONS),
+                  new['evaluation_efficiency'])
+
+        # Grade features
+        if 'avg_grade' in features:
+            np.add(col(SEM1_GRADE), col(SEM2_GRADE), out=new['avg_grade'])
+            new['avg_grade'] *= 0.5
+        if 'grade_improvement' in features:
+            np.subtract(col(SEM2_GRADE), col(SEM1_GRADE), out=new['grade_improvement'])
+
+        # Credited units, financial stress, age deviation
+        if 'total_credited' in features:
+            np.add(col(SEM1_CREDITED), col(SEM2_CREDITED), out=new['total_credited'])
+        if 'financial_stress' in features:
+            np.subtract(col(DEBTOR) + 1, col(TUITION_UP_TO_DATE), out=new['financial_stress'])
+        if 'age_deviation' in features:
+            np.subtract(col(AGE_AT_ENROLLMENT), TYPICAL_AGE, out=new['age_deviation'])
+
+        return out
+
+    def get_feature_names_out(self, input_features=None):
+        """Raw input names followed by the engineered feature names."""
+        check_is_fitted(self, 'feature_names_in_')
+        return np.asarray(list(self.feature_names_in_) + ENGINEERED_FEATURES, dtype=object)
@@ -0,0 +1,161 @@
+"""
+Incremental Retraining
+======================
+
+Updates the persisted ensemble with a delta of new labeled student records
+instead of rebuilding all 200 forest trees and 150 boosting rounds:
+
+- Scaler: StandardScaler.partial_fit on the delta, i.e. running mean and
+  variance over all rows seen so far. The existing trees split on values
+  scaled with the old statistics, so their thresholds are mapped into the
+  new scale, through the scaler's float32 arithmetic (see _remap), so the
+  old trees keep their decisions on the rescaled inputs (up to raw values
+  within one float32 step of a threshold that the new scale cannot tell
+  apart).
+- RandomForest: warm_start adds n_new_trees trees, fitted on the delta plus
+  the most recent training rows. With max_trees the oldest trees are
+  dropped, so the forest is a sliding window over the data.
+- Boosting: warm_start continues from the previous stages. The new rounds
+  fit the residuals of the old model on the same rows; the prior (init
+  estimator) is kept.
+
+Only the 'exact' boosting backend can be updated. HistGradientBoosting
+scores its existing stages on binned training data during a warm start
+(bin edges and bin thresholds in the old scale), so remapped thresholds
+would give the new rounds wrong residuals; ensembles with it are rejected
+and need a full 'train'.
+
+The caller evaluates the result on the fixed random_state=42 test split and
+compares it with a full retrain (see main_retrain in dropout_prediction.py).
+"""
+
+import copy
+import time
+
+import numpy as np
+from sklearn.ensemble import (
+    GradientBoostingClassifier, HistGradientBoostingClassifier, RandomForestClassifier
+)
+
+from defaults import DEFAULT_NEW_TREES, DEFAULT_NEW_STAGES, DEFAULT_MAX_TREES
+
+
+def _scaled(x, mean, scale):
+    """StandardScaler.transform of float32 values, with its float32 rounding."""
+    return (x - mean.astype(np.float32)) / scale.astype(np.float32)
+
+
+def _float32_key(x):
+    """Integer keys with the same order as the float32 values (sign-magnitude -> two's complement)."""
+    bits = x.astype(np.float32).view(np.int32).astype(np.int64)
+    return np.where(bits < 0, -(bits & 0x7FFFFFFF), bits)
+
+
+def _float32_from_key(key):
+    bits = np.where(key < 0, -key | 0x80000000, key)
+    return bits.astype(np.uint32).view(np.float32)
+
+
+def _remap(thresholds, features, old_scaler, new_scaler):
+    """
+    Thresholds of split nodes in the old scale -> the new scale (in place).
+
+    Mapping t linearly is not enough: the features are float32, and inputs
+    a few ulp from a threshold can round to the other side in the new scale.
+    Instead the largest raw float32 value that went left is found by a
+    binary search over the float32 values, and the new threshold is put
+    between its image and that of the next float32 value, so each old tree
+    makes the same decisions on the raw inputs.
+    """
+    split = features >= 0
+    f, t = features[split], thresholds[split]
+    old_mean, old_scale = old_scaler.mean_[f], old_scaler.scale_[f]
+    new_mean, new_scale = new_scaler.mean_[f], new_scaler.scale_[f]
+
+    # Invariant: key lo goes left, key hi goes right
+    largest = np.finfo(np.float32).max
+    lo = np.full(len(t), _float32_key(np.array([-largest]))[0])
+    hi = np.full(len(t), _float32_key(np.array([largest]))[0])
+    while (hi - lo > 1).any():
+        mid = (lo + hi) // 2
+        left = _scaled(_float32_from_key(mid), old_mean, old_scale) <= t
+        lo, hi = np.where(left, mid, lo), np.where(left, hi, mid)
+    left = _scaled(_float32_from_key(lo), new_mean, new_scale).astype(np.float64)
+    right = _scaled(_float32_from_key(hi), new_mean, new_scale).astype(np.float64)
+    # Both images can coincide in the new scale; then the boundary value goes left
+    thresholds[split] = np.where(right > left, (left + right) / 2, left)
+
+
+def remap_thresholds(estimator, old_scaler, new_scaler):
+    """Move every split threshold of a fitted tree ensemble to the new scaler's space."""
+    if isinstance(estimator, RandomForestClassifier):
+        trees = [e.tree_ for e in estimator.estimators_]
+    elif isinstance(estimator, GradientBoostingClassifier):
+        trees = [e.tree_ for e in estimator.estimators_.ravel()]
+    else:
+        raise TypeError(f"Cannot rescale {type(estimator).__name__}")
+    for tree in trees:
+        # tree_.threshold is a writable view of the node array
+        _remap(tree.threshold, tree.feature, old_scaler, new_scaler)
+
+
+def update_scaler(scaler, X_new):
+    """Running-statistics update of a fitted StandardScaler; returns (old copy, updated scaler)."""
+    old_scaler = copy.deepcopy(scaler)
+    return old_scaler, scaler.partial_fit(X_new)
+
+
+def _grow_forest(rf, X, y, n_new_trees, max_trees):
+    rf.set_params(warm_start=True, n_estimators=len(rf.estimators_) + n_new_trees)
+    rf.fit(X, y)
+    if max_trees and len(rf.estimators_) > max_trees:
+        # Sliding window: keep the newest trees
+        rf.estimators_ = rf.estimators_[-max_trees:]
+        rf.n_estimators = max_trees
+    rf.set_params(warm_start=False)
+
+
+def check_updatable(model):
+    """Raise TypeError if the ensemble has a member that cannot be updated incrementally."""
+    for estimator in model.estimators_:
+        if isinstance(estimator, HistGradientBoostingClassifier):
+            raise TypeError("Incremental updates need the 'exact' boosting backend: "
+                            "HistGradientBoosting warm starts score the existing stages on "
+                            "bins in the old scale. Retrain with 'train --boosting hist'.")
+        if not isinstance(estimator, (RandomForestClassifier, GradientBoostingClassifier)):
+            raise TypeError(f"Cannot update {type(estimator).__name__} incrementally")
+
+
+def _continue_boosting(gb, X, y, n_new_stages):
+    gb.set_params(warm_start=True, n_estimators=gb.n_estimators_ + n_new_stages)
+    gb.fit(X, y)
+    gb.set_params(warm_start=False)
+
+
+def incremental_update(model, scaler, X_delta, y_delta, X_recent, y_recent,
+                       n_new_trees=DEFAULT_NEW_TREES, n_new_stages=DEFAULT_NEW_STAGES,
+                       max_trees=DEFAULT_MAX_TREES):
+    """
+    Update a fitted soft VotingClassifier (RF + boosting) and its scaler in place.
+
+    X_delta / X_recent are engineered, unscaled features. Returns the wall
+    time of the update in seconds. Raises TypeError (before changing
+    anything) for ensembles with the 'hist' boosting backend.
+    """
+    check_updatable(model)
+    start = time.perf_counter()
+    old_scaler, scaler = update_scaler(scaler, X_delta)
+    for estimator in model.estimators_:
+        remap_thresholds(estimator, old_scaler, scaler)
+
+    X_fit = scaler.transform(np.concatenate([X_recent, X_delta]))
+    y_fit = np.concatenate([y_recent, y_delta])
+    # The VotingClassifier fits its members on label-encoded targets
+    y_fit = model.le_.transform(y_fit)
+
+    for estimator in model.estimators_:
+        if isinstance(estimator, RandomForestClassifier):
+            _grow_forest(estimator, X_fit, y_fit, n_new_trees, max_trees)
+        else:
+            _continue_boosting(estimator, X_fit, y_fit, n_new_stages)
+    return time.perf_counter() - start
@@ -0,0 +1,92 @@
+"""
+Scoring Service Load Test
+=========================
+
+Sends student records from shared-data/data.csv to a running
+predict_service.py with several concurrent clients and reports throughput
+and latency percentiles.
+
+Usage:
+    python predict_service.py &
+    python load_test.py --clients 8 --requests 2000
+"""
+
+import argparse
+import http.client
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+SCRIPT_DIR = Path(__file__).parent
+DATA_PATH = SCRIPT_DIR.parent / "shared-data" / "data.csv"
+
+sys.path.insert(0, str(DATA_PATH.parent))
+from data_loader import load_data, FEATURE_COLUMNS  # noqa: E402
+
+
+def load_payloads(n):
+    """JSON request bodies for the first n students (cycled)."""
+    records = load_data(DATA_PATH)[FEATURE_COLUMNS].to_dict(orient="records")
+    return [json.dumps({k: float(v) for k, v in records[i % len(records)].items()}).encode()
+            for i in range(n)]
+
+
+def client(host, port, payloads, latencies):
+    """One keep-alive client sending its share of payloads sequentially."""
+    conn = http.client.HTTPConnection(host, port)
+    headers = {"Content-Type": "application/json"}
+    for body in payloads:
+        start = time.perf_counter()
+        conn.request("POST", "/predict", body=body, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        latencies.append(time.perf_counter() - start)
+        if response.status != 200:
+            raise RuntimeError(f"HTTP {response.status}")
+    conn.close()
+
+
+def run(host, port, n_clients, n_requests):
+    payloads = load_payloads(n_requests)
+    per_client = [payloads[i::n_clients] for i in range(n_clients)]
+    latencies = [[] for _ in range(n_clients)]
+
+    threads = [threading.Thread(target=client, args=(host, port, share, lat))
+               for share, lat in zip(per_client, latencies)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    all_latencies = np.concatenate([np.asarray(lat) for lat in latencies]) * 1000
+    p50, p90, p99 = np.percentile(all_latencies, [50, 90, 99])
+
+    print("=" * 40)
+    print("LOAD TEST RESULTS")
+    print("=" * 40)
+    print(f"Clients:         {n_clients}")
+    print(f"Requests:        {len(all_latencies)}")
+    print(f"Throughput:      {len(all_latencies) / elapsed:.1f} req/s")
+    print(f"Latency p50:     {p50:.2f} ms")
+    print(f"Latency p90:     {p90:.2f} ms")
+    print(f"Latency p99:     {p99:.2f} ms")
+    print(f"Latency max:     {all_latencies.max():.2f} ms")
+
+    return {"throughput_rps": len(all_latencies) / elapsed,
+            "p50_ms": p50, "p90_ms": p90, "p99_ms": p99}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test for predict_service.py")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+    run(args.host, args.port, args.clients, args.requests)
@@ -0,0 +1,72 @@
+"""
+Vectorized Classification Metrics
+=================================
+
+Metrics computed directly from (stacks of) confusion matrices, so many folds
+or bootstrap resamples are evaluated in a single NumPy pass instead of one
+sklearn metric call each.
+
+All functions accept a confusion matrix of shape (..., K, K) with true
+classes on axis -2 and predicted classes on axis -1 (sklearn's layout).
+Zero divisions yield 0, like sklearn's default `zero_division="warn"`.
+"""
+
+import numpy as np
+
+
+def confusion_matrices(y_true, y_pred, groups, n_groups, n_classes):
+    """
+    One confusion matrix per group in a single bincount.
+
+    Returns an int64 array of shape (n_groups, n_classes, n_classes).
+    """
+    cells = (np.asarray(groups, dtype=np.int64) * n_classes + y_true) * n_classes + y_pred
+    counts = np.bincount(cells, minlength=n_groups * n_classes * n_classes)
+    return counts.reshape(n_groups, n_classes, n_classes)
+
+
+def _safe_divide(numerator, denominator):
+    return np.divide(numerator, denominator, out=np.zeros(np.broadcast(numerator, denominator).shape),
+                     where=denominator > 0)
+
+
+def metrics_from_confusion(cm):
+    """
+    Per-class and averaged metrics of one or many confusion matrices.
+
+    Per-class entries have shape (..., K), averaged entries shape (...).
+    """
+    cm = np.asarray(cm, dtype=np.float64)
+    support = cm.sum(axis=-1)
+    predicted = cm.sum(axis=-2)
+    tp = np.diagonal(cm, axis1=-2, axis2=-1)
+
+    precision = _safe_divide(tp, predicted)
+    recall = _safe_divide(tp, support)
+    f1 = _safe_divide(2 * precision * recall, precision + recall)
+    return {
+        "macro_f1_score": f1.mean(axis=-1),
+        "weighted_f1_score": _safe_divide((f1 * support).sum(axis=-1), support.sum(axis=-1)),
+        "balanced_accuracy": recall.mean(axis=-1),
+        "accuracy": _safe_divide(tp.sum(axis=-1), cm.sum(axis=(-2, -1))),
+        "precision": precision,
+        "recall": recall,
+        "f1": f1,
+        "support": support.astype(np.int64),
+    }
+
+
+def bootstrap_confusion(cm, n_bootstrap, rng):
+    """
+    Bootstrap resamples of the test rows behind each confusion matrix.
+
+    Resampling n rows with replacement and re-counting them is the same as
+    drawing the n cells from Multinomial(n, cm / n), so no row-level data is
+    needed. Returns shape (n_bootstrap, *cm.shape).
+    """
+    cm = np.asarray(cm)
+    n_classes = cm.shape[-1]
+    flat = cm.reshape(-1, n_classes * n_classes)
+    n = flat.sum(axis=1)
+    samples = rng.multinomial(n, flat / n[:, None], size=(n_bootstrap, len(flat)))
+    return samples.reshape((n_bootstrap,) + cm.shape)
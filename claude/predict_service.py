@@ -0,0 +1,304 @@
+"""
+Student Dropout Prediction - Scoring Service
+============================================
+
+Local HTTP service that scores single students with the persisted ensemble
+(model.joblib written by `python dropout_prediction.py train`).
+
+- The model artifact is loaded once at startup.
+- Requests are micro-batched: concurrent requests that arrive within
+  --max-wait-ms are scored together in one predict_proba call.
+- Raw features are written straight into a preallocated float32 buffer in
+  training column order; no per-request DataFrame is built.
+- Trees are evaluated with the flat-array CompiledEnsemble (compiled_trees.py),
+  which returns the same probabilities as the sklearn ensemble at a fraction
+  of the small-batch latency.
+- --model also accepts a compact model file (compact_model.py): memory-mapped
+  instead of unpickled, for a faster start and smaller resident size.
+- If the artifact holds a decision rule (calibration.py), probabilities are
+  calibrated and the prediction is the class-weighted argmax.
+
+Endpoints:
+    GET  /health    -> {"status": "ok", "features": [...]}
+    POST /predict   -> body: one JSON record with the 36 raw features
+                       (or a list of records); response: prediction and
+                       class probabilities per record
+    POST /whatif    -> body: {"student": {...}, "values": {column: [v, ...]},
+                       "deltas": {column: [d, ...]}}; dropout risk of every
+                       combination of changes (what_if.py)
+
+Usage:
+    python predict_service.py --port 8001
+"""
+
+import json
+import queue
+import sys
+import threading
+import time
+import argparse
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import joblib
+import numpy as np
+
+from compiled_trees import CompiledEnsemble
+import compact_model
+from compact_model import CompactEnsemble
+from defaults import MODEL_PATH
+from what_if import WhatIfEngine
+
+DEFAULT_PORT = 8001
+DEFAULT_MAX_BATCH = 64
+DEFAULT_MAX_WAIT_MS = 1.0
+
+
+class Scorer:
+    """Raw feature rows (float32, training column order) -> class probabilities."""
+
+    def __init__(self, artifact):
+        if isinstance(artifact["model"], CompactEnsemble):
+            # Memory-mapped compact export, evaluated in place
+            self.model = artifact["model"]
+        else:
+            try:
+                self.model = CompiledEnsemble.from_voting(artifact["model"])
+            except TypeError:
+                # Not compilable (e.g. 'hist' boosting backend): score with sklearn
+                self.model = artifact["model"]
+        self.scaler = artifact["scaler"]
+        self.decision = artifact.get("decision")
+        self.feature_engineer = artifact["feature_engineer"]
+        self.class_names = [str(c) for c in artifact["label_encoder"].classes_]
+        self.feature_names = [str(c) for c in self.feature_engineer.feature_names_in_]
+        self._index = {name: i for i, name in enumerate(self.feature_names)}
+
+    def fill_row(self, record, out):
+        """Write one JSON record into a buffer row; raise ValueError on bad input."""
+        missing = [name for name in self.feature_names if name not in record]
+        if missing:
+            raise ValueError(f"Missing features: {missing}")
+        for name, i in self._index.items():
+            out[i] = float(record[name])
+
+    def predict_proba(self, X_raw):
+        X = self.scaler.transform(self.feature_engineer.transform(X_raw))
+        proba = self.model.predict_proba(X)
+        return proba if self.decision is None else self.decision.predict_proba(proba)
+
+    def decide(self, proba):
+        """Predicted class index of one row of (calibrated) probabilities."""
+        if self.decision is None:
+            return int(np.argmax(proba))
+        return int(self.decision.decide(proba[None])[0])
+
+
+class MicroBatcher:
+    """
+    Collect concurrent requests into small batches for one predict_proba call.
+
+    A single worker thread owns a preallocated (max_batch, n_features) buffer.
+    It waits for the first request, then keeps collecting for up to max_wait_ms
+    or until the buffer is full, and scores all collected rows at once.
+    """
+
+    def __init__(self, scorer, max_batch=DEFAULT_MAX_BATCH, max_wait_ms=DEFAULT_MAX_WAIT_MS):
+        self.scorer = scorer
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._buffer = np.empty((max_batch, len(scorer.feature_names)), dtype=np.float32)
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def submit(self, record):
+        """Queue one record; returns a Future resolving to its probability row."""
+        future = Future()
+        self._queue.put((record, future))
+        return future
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0
+                             else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+
+            # Fill the buffer; bad records fail individually, not the batch
+            valid = []
+            for record, future in batch:
+                try:
+                    self.scorer.fill_row(record, self._buffer[len(valid)])
+                    valid.append(future)
+                except (ValueError, TypeError) as e:
+                    future.set_exception(ValueError(str(e)))
+
+            if not valid:
+                continue
+            try:
+                proba = self.scorer.predict_proba(self._buffer[:len(valid)])
+            except Exception as e:
+                for future in valid:
+                    future.set_exception(e)
+                continue
+            for future, row in zip(valid, proba):
+                future.set_result(row)
+
+
+def make_handler(batcher, what_if=None):
+    """Request handler class bound to a MicroBatcher (and a WhatIfEngine, if available)."""
+    class_names = batcher.scorer.class_names
+
+    class PredictionHandler(BaseHTTPRequestHandler):
+        # Keep-alive connections: clients avoid a TCP handshake per request
+        protocol_version = "HTTP/1.1"
+        # Headers and body are separate writes; without TCP_NODELAY every
+        # response waits for the client's delayed ACK (~40 ms)
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Access-Control-Allow-Origin", "*")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_OPTIONS(self):
+            self.send_response(204)
+            self.send_header("Access-Control-Allow-Origin", "*")
+            self.send_header("Access-Control-Allow-Methods", "GET, POST, OPTIONS")
+            self.send_header("Access-Control-Allow-Headers", "Content-Type")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send_json(200, {"status": "ok", "features": batcher.scorer.feature_names})
+            else:
+                self._send_json(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path not in ("/predict", "/whatif"):
+                self._send_json(404, {"error": "not found"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length))
+            except (ValueError, json.JSONDecodeError):
+                self._send_json(400, {"error": "invalid JSON"})
+                return
+            if self.path == "/whatif":
+                self._what_if(payload)
+                return
+
+            records = payload if isinstance(payload, list) else [payload]
+            futures = [batcher.submit(record) for record in records]
+            try:
+                results = []
+                for future in futures:
+                    proba = future.result()
+                    results.append({
+                        "prediction": class_names[batcher.scorer.decide(proba)],
+                        "probabilities": {name: round(float(p), 6)
+                                          for name, p in zip(class_names, proba)},
+                    })
+            except ValueError as e:
+                self._send_json(400, {"error": str(e)})
+                return
+            except Exception as e:
+                # Any other scorer failure forwarded by the batcher: answer instead of
+                # dropping the keep-alive connection
+                print(f"Scoring failed: {e!r}", file=sys.stderr)
+                self._send_json(500, {"error": f"scoring failed: {e}"})
+                return
+
+            self._send_json(200, results if isinstance(payload, list) else results[0])
+
+        def _what_if(self, payload):
+            # Scored in the request thread: one student's grid is already a batch
+            if what_if is None:
+                self._send_json(501, {"error": "what-if scoring needs the full model artifact"})
+                return
+            try:
+                if not isinstance(payload, dict) or not isinstance(payload.get("student"), dict):
+                    raise ValueError("expected {\"student\": {...}, \"values\": {...}, "
+                                     "\"deltas\": {...}}")
+                report = what_if.evaluate(payload["student"], payload.get("values"),
+                                          payload.get("deltas"))
+            except (ValueError, TypeError) as e:
+                self._send_json(400, {"error": str(e)})
+                return
+            except Exception as e:
+                print(f"What-if scoring failed: {e!r}", file=sys.stderr)
+                self._send_json(500, {"error": f"scoring failed: {e}"})
+                return
+            self._send_json(200, report)
+
+    return PredictionHandler
+
+
+class PredictionServer(ThreadingHTTPServer):
+    """Threaded HTTP server with a listen backlog sized for bursts of clients."""
+    request_queue_size = 128
+    daemon_threads = True
+
+
+def serve(port=DEFAULT_PORT, model_path=MODEL_PATH, max_batch=DEFAULT_MAX_BATCH,
+          max_wait_ms=DEFAULT_MAX_WAIT_MS):
+    """Load the model once and serve until interrupted."""
+    if not Path(model_path).exists():
+        sys.exit(f"No trained model at {model_path}. Run 'python dropout_prediction.py train' first.")
+
+    if compact_model.is_compact(model_path):
+        artifact = compact_model.load_artifact(model_path)
+    else:
+        artifact = joblib.load(model_path)
+    scorer = Scorer(artifact)
+    batcher = MicroBatcher(scorer, max_batch=max_batch, max_wait_ms=max_wait_ms)
+    what_if = None
+    if isinstance(scorer.model, CompiledEnsemble):
+        what_if = WhatIfEngine(scorer.model, scorer.scaler, scorer.feature_engineer,
+                               artifact["label_encoder"], scorer.decision)
+
+    # Warm-up: first predict_proba call pays one-off allocation costs
+    warmup = np.zeros((1, len(scorer.feature_names)), dtype=np.float32)
+    scorer.predict_proba(warmup)
+
+    server = PredictionServer(("127.0.0.1", port), make_handler(batcher, what_if))
+    print(f"Serving predictions on http://127.0.0.1:{port}/predict "
+          f"(max batch {max_batch}, max wait {max_wait_ms} ms)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Student dropout scoring service")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--model", type=Path, default=MODEL_PATH,
+                        help="model.joblib or a compact export (model_compact.bin)")
+    parser.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH,
+                        help="Maximum requests scored together")
+    parser.add_argument("--max-wait-ms", type=float, default=DEFAULT_MAX_WAIT_MS,
+                        help="How long to wait for more requests before scoring a batch")
+    args = parser.parse_args()
+    serve(args.port, args.model, args.max_batch, args.max_wait_ms)
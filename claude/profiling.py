@@ -0,0 +1,245 @@
+"""
+Pipeline Profiling
+==================
+
+Stage-level instrumentation for the dropout prediction pipeline.
+
+Every stage records wall time, CPU time and peak resident set size. CPU time
+covers the main process with its threads and the worker processes of
+joblib/loky and ProcessPoolExecutor, which do most of the work when n_jobs
+fans out: workers are long-lived and never reaped during a stage, so
+RUSAGE_CHILDREN misses them. Live descendant processes are read from /proc
+(utime + stime, VmHWM) at the start and end of each stage; processes reaped
+in between are added through RUSAGE_CHILDREN. Without /proc (macOS, Windows)
+only reaped children are counted, and worker_peak_rss_mb is None.
+
+Base estimators of the ensemble record their own fit time, so RandomForest
+and GradientBoosting costs are reported separately even when the
+VotingClassifier fits them in parallel (measured inside the process that
+fits them).
+
+The collected numbers are emitted as the `performance` block of result.json.
+"""
+
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+from sklearn.ensemble import (
+    RandomForestClassifier, GradientBoostingClassifier, HistGradientBoostingClassifier
+)
+
+try:
+    import resource
+except ImportError:  # Windows: peak RSS is not available without extra dependencies
+    resource = None
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process and its (joined) children in MB."""
+    if resource is None:
+        return None
+    self_peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children_peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    peak = max(self_peak, children_peak)
+    # Linux reports kilobytes, macOS bytes
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(peak / divisor, 1)
+
+
+def _clock_ticks():
+    try:
+        return os.sysconf("SC_CLK_TCK")
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+CLOCK_TICKS = _clock_ticks()
+PROC = "/proc"
+
+
+def _read_stat(pid):
+    """(parent pid, utime + stime in seconds) from /proc/<pid>/stat."""
+    with open(f"{PROC}/{pid}/stat") as f:
+        # The command name may contain spaces; fields after it start with state
+        fields = f.read().rsplit(")", 1)[1].split()
+    return int(fields[1]), (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+
+
+def _read_hwm_mb(pid):
+    """Peak RSS (VmHWM) of a live process in MB."""
+    with open(f"{PROC}/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def worker_usage():
+    """
+    CPU seconds of the live descendant processes (workers) by pid.
+
+    Empty without /proc.
+    """
+    if CLOCK_TICKS is None or not os.path.isdir(PROC):
+        return {}
+    parents, cpu = {}, {}
+    for entry in os.listdir(PROC):
+        if not entry.isdigit():
+            continue
+        try:
+            parents[int(entry)], cpu[int(entry)] = _read_stat(entry)
+        except (OSError, ValueError, IndexError):
+            continue  # exited while scanning
+    children = {}
+    for pid, ppid in parents.items():
+        children.setdefault(ppid, []).append(pid)
+    usage, pending = {}, list(children.get(os.getpid(), []))
+    while pending:
+        pid = pending.pop()
+        usage[pid] = cpu[pid]
+        pending.extend(children.get(pid, []))
+    return usage
+
+
+def worker_peak_rss_mb(pids):
+    """
+    Largest peak RSS of a worker in MB: the given live processes (VmHWM) and
+    the children reaped so far. None without /proc.
+    """
+    if CLOCK_TICKS is None or not os.path.isdir(PROC):
+        return None
+    peaks = [resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024]
+    for pid in pids:
+        try:
+            peaks.append(_read_hwm_mb(pid))
+        except (OSError, ValueError):
+            continue
+    return round(max(peaks), 1)
+
+
+def _reaped_children_cpu():
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+class _CpuSnapshot:
+    """CPU counters of the main process, reaped children and live workers."""
+
+    def __init__(self):
+        self.main = time.process_time()
+        self.reaped = _reaped_children_cpu()
+        self.workers = worker_usage()
+
+    def since(self):
+        """(main CPU seconds, worker CPU seconds, live worker pids) since the snapshot."""
+        now = _CpuSnapshot()
+        # Workers alive at both ends contribute their delta, new ones everything
+        live = sum(cpu - self.workers.get(pid, 0.0) for pid, cpu in now.workers.items())
+        return now.main - self.main, live + now.reaped - self.reaped, list(now.workers)
+
+
+class FitTimerMixin:
+    """Record wall and CPU time of fit() as fit_wall_time_ / fit_cpu_time_."""
+
+    def fit(self, X, y, **fit_params):
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        result = super().fit(X, y, **fit_params)
+        self.fit_wall_time_ = time.perf_counter() - wall_start
+        self.fit_cpu_time_ = time.process_time() - cpu_start
+        return result
+
+
+class TimedRandomForestClassifier(FitTimerMixin, RandomForestClassifier):
+    """RandomForestClassifier that records its own fit time."""
+
+
+class TimedGradientBoostingClassifier(FitTimerMixin, GradientBoostingClassifier):
+    """GradientBoostingClassifier that records its own fit time."""
+
+
+class TimedHistGradientBoostingClassifier(FitTimerMixin, HistGradientBoostingClassifier):
+    """HistGradientBoostingClassifier that records its own fit time."""
+
+
+class PipelineProfiler:
+    """
+    Collect per-stage measurements.
+
+    Usage:
+        profiler = PipelineProfiler()
+        with profiler.stage("train_model"):
+            ...
+        results["performance"] = profiler.report()
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.estimators = {}
+        self._start_wall = time.perf_counter()
+        self._start_cpu = _CpuSnapshot()
+
+    @contextmanager
+    def stage(self, name):
+        wall_start, cpu_start = time.perf_counter(), _CpuSnapshot()
+        rss_before = peak_rss_mb()
+        try:
+            yield
+        finally:
+            main_cpu, worker_cpu, workers = cpu_start.since()
+            rss_after = peak_rss_mb()
+            self.stages[name] = {
+                "wall_time_seconds": round(time.perf_counter() - wall_start, 4),
+                # Main process and workers; worker share reported separately
+                "cpu_time_seconds": round(main_cpu + worker_cpu, 4),
+                "worker_cpu_time_seconds": round(worker_cpu, 4),
+                "peak_rss_mb": rss_after,
+                # Lifetime peak of the largest worker (loky reuses workers across stages)
+                "worker_peak_rss_mb": worker_peak_rss_mb(workers),
+                "peak_rss_increase_mb": (round(rss_after - rss_before, 1)
+                                         if rss_after is not None else None),
+            }
+
+    def record_estimators(self, ensemble):
+        """Per-estimator fit times of a fitted VotingClassifier."""
+        for name, estimator in ensemble.named_estimators_.items():
+            if hasattr(estimator, "fit_wall_time_"):
+                # Report the sklearn class, not the Timed* subclass
+                estimator_type = type(estimator).__bases__[-1]
+                self.estimators[name] = {
+                    "type": estimator_type.__name__,
+                    "fit_wall_time_seconds": round(estimator.fit_wall_time_, 4),
+                    "fit_cpu_time_seconds": round(estimator.fit_cpu_time_, 4),
+                }
+
+    def report(self):
+        """JSON-serializable performance block."""
+        main_cpu, worker_cpu, workers = self._start_cpu.since()
+        return {
+            "stages": self.stages,
+            "estimators": self.estimators,
+            "total": {
+                "wall_time_seconds": round(time.perf_counter() - self._start_wall, 4),
+                "cpu_time_seconds": round(main_cpu + worker_cpu, 4),
+                "worker_cpu_time_seconds": round(worker_cpu, 4),
+                "peak_rss_mb": peak_rss_mb(),
+                "worker_peak_rss_mb": worker_peak_rss_mb(workers),
+            },
+        }
+
+    def print_summary(self):
+        print("\n--- Performance ---")
+        print(f"{'Stage':<24} {'Wall (s)':>9} {'CPU (s)':>9} {'Workers (s)':>12} "
+              f"{'Peak RSS (MB)':>14} {'Worker RSS (MB)':>16}")
+        for name, s in self.stages.items():
+            rss = f"{s['peak_rss_mb']:>14.1f}" if s['peak_rss_mb'] is not None else f"{'n/a':>14}"
+            worker_rss = (f"{s['worker_peak_rss_mb']:>16.1f}" if s['worker_peak_rss_mb'] is not None
+                          else f"{'n/a':>16}")
+            print(f"{name:<24} {s['wall_time_seconds']:>9.3f} {s['cpu_time_seconds']:>9.3f} "
+                  f"{s['worker_cpu_time_seconds']:>12.3f} {rss} {worker_rss}")
+        for name, e in self.estimators.items():
+            print(f"  fit {name} ({e['type']}): {e['fit_wall_time_seconds']:.3f}s wall, "
+                  f"{e['fit_cpu_time_seconds']:.3f}s CPU")
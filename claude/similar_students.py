@@ -0,0 +1,188 @@
+"""
+Similar Students Index
+======================
+
+The k historical students (with known Target) closest to a scored student
+in the scaled engineered feature space, as an explanation by example:
+"of the 5 most similar students, 4 dropped out".
+
+Two search methods over float32 vectors (euclidean distance):
+
+    kdtree  sklearn KDTree; sub-linear per query when the stored vectors
+            have few dimensions (see n_components)
+    brute   exact blocked search: squared distances |x|^2 - 2 q.x from one
+            matrix product per block of stored rows, the k best of every
+            query kept with argpartition; batch queries share each block
+
+A KD-tree over all 45 features degrades towards a full scan at millions of
+stored records. With n_components the tree is built over a Gaussian random
+projection of the features (distances roughly preserved, Johnson-
+Lindenstrauss); it returns `candidates` rows per query, which are re-ranked
+by their exact distance on the stored float32 vectors. The build measures
+the recall against exact neighbors on sampled stored rows; on data.csv 24
+components and 100 candidates find 97% of the exact 5 neighbors (without
+re-ranking: 53%).
+
+Neighbors are returned as stored row ids (rows of the labeled CSV the index
+was built from), their outcomes and distances.
+"""
+
+import time
+
+import numpy as np
+from sklearn.neighbors import KDTree
+
+from defaults import INDEX_METHODS, DEFAULT_INDEX_METHOD, DEFAULT_CANDIDATES
+
+DEFAULT_K = 5
+LEAF_SIZE = 40
+# Stored rows per distance block of the brute-force search
+BRUTE_BLOCK_SIZE = 65_536
+# Queries re-ranked together (bounds the (queries, candidates, features) array)
+QUERY_BLOCK_SIZE = 1024
+# Stored rows used as queries to measure the recall of a projected index
+RECALL_QUERIES = 200
+
+
+def random_projection(n_features, n_components, random_state=None):
+    """Gaussian projection matrix (n_features, n_components), scaled to keep distances."""
+    rng = np.random.default_rng(random_state)
+    matrix = rng.standard_normal((n_features, n_components)) / np.sqrt(n_components)
+    return matrix.astype(np.float32)
+
+
+def brute_force_neighbors(vectors, queries, k, norms=None, block_size=BRUTE_BLOCK_SIZE):
+    """
+    Exact k nearest stored rows of every query.
+
+    Returns (positions (n_queries, k), distances), nearest first. norms are
+    the precomputed squared norms of vectors.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    queries = np.asarray(queries, dtype=np.float32)
+    if norms is None:
+        norms = np.einsum('ij,ij->i', vectors, vectors)
+    k = min(k, len(vectors))
+    n_queries = len(queries)
+    best_d = np.full((n_queries, k), np.inf, dtype=np.float32)
+    best_i = np.zeros((n_queries, k), dtype=np.intp)
+
+    for start in range(0, len(vectors), block_size):
+        block = vectors[start:start + block_size]
+        # |q|^2 is the same for all rows of a query: added once at the end
+        d = queries @ block.T
+        d *= -2
+        d += norms[start:start + len(block)]
+        # The current best k in front, then argpartition over [best, block]
+        merged = np.concatenate([best_d, d], axis=1)
+        part = np.argpartition(merged, k - 1, axis=1)[:, :k]
+        from_best = part < k
+        best_d = np.take_along_axis(merged, part, axis=1)
+        best_i = np.where(from_best, np.take_along_axis(best_i, np.minimum(part, k - 1), axis=1),
+                          part - k + start)
+
+    order = np.argsort(best_d, axis=1, kind='stable')
+    best_d = np.take_along_axis(best_d, order, axis=1)
+    best_d += np.einsum('ij,ij->i', queries, queries)[:, None]
+    return np.take_along_axis(best_i, order, axis=1), np.sqrt(np.maximum(best_d, 0))
+
+
+class SimilarityIndex:
+    """Nearest stored students of query rows (scaled engineered features)."""
+
+    def __init__(self, method=DEFAULT_INDEX_METHOD, n_components=None,
+                 candidates=DEFAULT_CANDIDATES, leaf_size=LEAF_SIZE, random_state=42):
+        if method not in INDEX_METHODS:
+            raise ValueError(f"Unknown index method {method!r}, expected one of {INDEX_METHODS}")
+        if method == 'brute' and n_components is not None:
+            raise ValueError("n_components applies to the 'kdtree' method only")
+        self.method = method
+        self.n_components = n_components
+        self.candidates = candidates
+        self.leaf_size = leaf_size
+        self.random_state = random_state
+
+    def fit(self, X, labels, row_ids=None):
+        """
+        Store the rows of X (scaled features) with their label codes.
+
+        row_ids identify the rows in the source data (default 0..n-1).
+        """
+        start = time.perf_counter()
+        self.vectors_ = np.ascontiguousarray(X, dtype=np.float32)
+        self.n_features_in_ = self.vectors_.shape[1]
+        self.labels_ = np.asarray(labels)
+        self.row_ids_ = np.arange(len(self.labels_)) if row_ids is None else np.asarray(row_ids)
+        self.projection_ = (None if self.n_components is None else
+                            random_projection(self.n_features_in_, self.n_components,
+                                              self.random_state))
+        if self.method == 'kdtree':
+            searched = self.vectors_ if self.projection_ is None else self.vectors_ @ self.projection_
+            self.tree_, self.norms_ = KDTree(searched, leaf_size=self.leaf_size), None
+        else:
+            self.tree_ = None
+            self.norms_ = np.einsum('ij,ij->i', self.vectors_, self.vectors_)
+        self.build_seconds_ = time.perf_counter() - start
+        self.recall_ = None if self.projection_ is None else self._projection_recall()
+        return self
+
+    def _rerank(self, X, candidates, k):
+        """The k candidates nearest in the full feature space, nearest first."""
+        positions, distances = [], []
+        for start in range(0, len(X), QUERY_BLOCK_SIZE):
+            block, cand = X[start:start + QUERY_BLOCK_SIZE], candidates[start:start + QUERY_BLOCK_SIZE]
+            d = self.vectors_[cand]
+            d -= block[:, None]
+            d = np.einsum('qcj,qcj->qc', d, d)
+            order = np.argsort(d, axis=1, kind='stable')[:, :k]
+            positions.append(np.take_along_axis(cand, order, axis=1))
+            distances.append(np.sqrt(np.take_along_axis(d, order, axis=1)))
+        return np.concatenate(positions), np.concatenate(distances)
+
+    def _positions(self, X, k):
+        X = np.asarray(X, dtype=np.float32)
+        k = min(k, len(self.labels_))
+        if self.tree_ is None:
+            return brute_force_neighbors(self.vectors_, X, k, self.norms_)
+        if self.projection_ is None:
+            distances, positions = self.tree_.query(X, k=k)
+            return positions, distances
+        # Candidates from the projected tree, exact distances decide
+        _, candidates = self.tree_.query(X @ self.projection_,
+                                         k=min(max(self.candidates, k), len(self.labels_)))
+        return self._rerank(X, candidates, k)
+
+    def _projection_recall(self, k=DEFAULT_K):
+        """Mean share of the exact k neighbors (full feature space) the index finds."""
+        rng = np.random.default_rng(self.random_state)
+        sample = rng.choice(len(self.vectors_), size=min(RECALL_QUERIES, len(self.vectors_)),
+                            replace=False)
+        # k + 1 neighbors, minus the query row itself
+        exact, _ = brute_force_neighbors(self.vectors_, self.vectors_[sample], k + 1, self.norms_)
+        found, _ = self._positions(self.vectors_[sample], k + 1)
+        shares = []
+        for position, exact_row, found_row in zip(sample, exact, found):
+            exact_set = set(exact_row[exact_row != position][:k])
+            found_set = set(found_row[found_row != position][:k])
+            shares.append(len(exact_set & found_set) / len(exact_set))
+        return float(np.mean(shares))
+
+    def query(self, X, k=DEFAULT_K):
+        """
+        k most similar stored students of every row of X (scaled features).
+
+        Returns (row_ids, label codes, distances), each (n_rows, k), nearest first.
+        """
+        positions, distances = self._positions(X, k)
+        return self.row_ids_[positions], self.labels_[positions], distances
+
+    def describe(self):
+        return {
+            "method": self.method,
+            "records": int(len(self.labels_)),
+            "features": int(self.n_features_in_),
+            "components": self.n_components,
+            "candidates": None if self.projection_ is None else self.candidates,
+            "build_seconds": round(self.build_seconds_, 3),
+            "projection_recall": None if self.recall_ is None else round(self.recall_, 4),
+        }
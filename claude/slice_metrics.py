@@ -0,0 +1,221 @@
+"""
+Slice Metrics Cube
+==================
+
+Confusion matrices of the test predictions broken down by Course, Gender,
+Scholarship holder, attendance and age band, and by every combination of
+these dimensions (Course x Gender, Course x Gender x age band, ...), for
+drill-down in the dashboard.
+
+All slices come from one group-by pass over the rows: every row gets one
+combined key over all dimensions (its cell in the full crossing) and a
+single bincount over (key, true class, predicted class) counts the finest
+cube (metrics.confusion_matrices). A coarser combination is the sum of that
+cube over the dimensions it leaves out, so no slice filters the rows again;
+the cost after the pass depends on the number of cells only.
+
+The cube is stored as two files the dashboard loads lazily:
+
+    slices.json          dimensions with their value labels, class names and
+                         per combination the byte offset and shape of its block
+    slices-<digest>.bin  the blocks: little-endian unsigned counts of shape
+                         (*values of the combination's dimensions, K, K)
+
+The dashboard reads slices.json and fetches only the block of the selected
+combination (HTTP Range request); metrics are computed from the counts.
+The binary file is named by its content, so a dashboard never combines an
+index with the blocks of another run.
+"""
+
+import hashlib
+import json
+import math
+from itertools import combinations
+from pathlib import Path
+
+import numpy as np
+
+from metrics import confusion_matrices, metrics_from_confusion
+
+# Course codes of the dataset (UCI documentation)
+COURSE_NAMES = {
+    33: "Biofuel Production Technologies",
+    171: "Animation and Multimedia Design",
+    8014: "Social Service (evening)",
+    9003: "Agronomy",
+    9070: "Communication Design",
+    9085: "Veterinary Nursing",
+    9119: "Informatics Engineering",
+    9130: "Equinculture",
+    9147: "Management",
+    9238: "Social Service",
+    9254: "Tourism",
+    9500: "Nursing",
+    9556: "Oral Hygiene",
+    9670: "Advertising and Marketing Management",
+    9773: "Journalism and Communication",
+    9853: "Basic Education",
+    9991: "Management (evening)",
+}
+
+# Categorical dimensions: column -> value labels (unlisted values keep their code)
+SLICE_DIMENSIONS = {
+    "Course": COURSE_NAMES,
+    "Gender": {0: "female", 1: "male"},
+    "Scholarship holder": {0: "no", 1: "yes"},
+    "Daytime/evening attendance": {0: "evening", 1: "daytime"},
+}
+AGE_COLUMN = "Age at enrollment"
+# Inclusive upper bounds of the age bands; older students form the last band
+AGE_BAND_EDGES = (20, 24, 34)
+# Slices with fewer rows are marked as too small to compare in the dashboard
+MIN_SUPPORT = 30
+
+INDEX_NAME = "slices.json"
+CUBE_PREFIX = "slices-"
+
+
+def age_band_labels(edges=AGE_BAND_EDGES):
+    lower = [None] + [edge + 1 for edge in edges]
+    upper = list(edges) + [None]
+    return [f"<= {hi}" if lo is None else f">= {lo}" if hi is None else f"{lo}-{hi}"
+            for lo, hi in zip(lower, upper)]
+
+
+def _value_label(value, names):
+    value = int(value) if float(value).is_integer() else float(value)
+    return names.get(value, str(value))
+
+
+def slice_codes(frame):
+    """
+    Dimension codes of the rows of a raw feature frame.
+
+    Returns (dimensions, codes): per dimension a dict with name, column and
+    value labels, and one int array of value indices per dimension.
+    """
+    dimensions, codes = [], []
+    for column, names in SLICE_DIMENSIONS.items():
+        values, inverse = np.unique(frame[column].to_numpy(), return_inverse=True)
+        dimensions.append({"name": column, "column": column,
+                           "labels": [_value_label(v, names) for v in values]})
+        codes.append(inverse.ravel())
+    # Band i holds ages up to AGE_BAND_EDGES[i]
+    ages = frame[AGE_COLUMN].to_numpy()
+    dimensions.append({"name": "Age band", "column": AGE_COLUMN, "labels": age_band_labels()})
+    codes.append(np.searchsorted(AGE_BAND_EDGES, ages, side='left'))
+    return dimensions, codes
+
+
+def slice_cube(codes, sizes, y_true, y_pred, n_classes):
+    """Confusion matrices of every cell of the full crossing: shape (*sizes, K, K)."""
+    keys = np.ravel_multi_index(codes, sizes)
+    cm = confusion_matrices(y_true, y_pred, keys, math.prod(sizes), n_classes)
+    return cm.reshape(tuple(sizes) + (n_classes, n_classes))
+
+
+def combination_blocks(cube, n_dims, max_dims=None):
+    """
+    (dimension indices, counts) of every combination of up to max_dims dimensions.
+
+    The empty combination is the whole evaluated set.
+    """
+    max_dims = n_dims if max_dims is None else min(max_dims, n_dims)
+    for size in range(max_dims + 1):
+        for combination in combinations(range(n_dims), size):
+            dropped = tuple(d for d in range(n_dims) if d not in combination)
+            yield combination, cube.sum(axis=dropped)
+
+
+def build_slices(frame, y_true, y_pred, class_names, max_dims=None):
+    """
+    Slice cube of predictions on the rows of frame (raw features).
+
+    Returns (index dict, binary blocks); the index lacks the "file" entry
+    written by write_slices.
+    """
+    dimensions, codes = slice_codes(frame)
+    sizes = [len(d["labels"]) for d in dimensions]
+    n_classes = len(class_names)
+    cube = slice_cube(codes, sizes, np.asarray(y_true), np.asarray(y_pred), n_classes)
+
+    # Counts are at most the number of rows
+    dtype = np.dtype('<u2') if len(frame) < 2 ** 16 else np.dtype('<u4')
+    blocks, entries, offset = [], [], 0
+    for combination, counts in combination_blocks(cube, len(dimensions), max_dims):
+        data = counts.astype(dtype).tobytes()
+        entries.append({
+            "dimensions": list(combination),
+            "shape": list(counts.shape),
+            "offset": offset,
+            "length": len(data),
+        })
+        blocks.append(data)
+        offset += len(data)
+
+    index = {
+        "rows": int(len(frame)),
+        "classes": [str(c) for c in class_names],
+        "dimensions": dimensions,
+        "dtype": dtype.name,
+        "min_support": MIN_SUPPORT,
+        "combinations": entries,
+    }
+    return index, b"".join(blocks)
+
+
+def write_slices(index, data, directory, write=None):
+    """
+    Write the blocks as slices-<digest>.bin, then slices.json pointing to it.
+
+    write(path, bytes) defaults to a plain write; blocks of earlier runs are
+    removed after the index is replaced. Returns the index path.
+    """
+    directory = Path(directory)
+    write = write or (lambda path, payload: Path(path).write_bytes(payload))
+    cube_name = f"{CUBE_PREFIX}{hashlib.sha256(data).hexdigest()[:16]}.bin"
+    write(directory / cube_name, data)
+    write(directory / INDEX_NAME, json.dumps({**index, "file": cube_name}).encode())
+    for old in directory.glob(f"{CUBE_PREFIX}*.bin"):
+        if old.name != cube_name:
+            old.unlink(missing_ok=True)
+    return directory / INDEX_NAME
+
+
+def read_block(index, data, dimensions):
+    """Counts of the combination of the named dimensions from the index and blocks."""
+    names = [d["name"] for d in index["dimensions"]]
+    wanted = sorted(names.index(name) for name in dimensions)
+    entry = next(e for e in index["combinations"] if e["dimensions"] == wanted)
+    block = np.frombuffer(data, dtype=index["dtype"], count=math.prod(entry["shape"]),
+                          offset=entry["offset"])
+    return block.reshape(entry["shape"])
+
+
+def slice_macro_f1(counts):
+    """
+    Macro-F1 per slice over the classes occurring in it (true or predicted),
+    like sklearn's f1_score without labels; (..., K, K) -> (...).
+    """
+    present = (counts.sum(axis=-1) + counts.sum(axis=-2)) > 0
+    f1 = metrics_from_confusion(counts)["f1"]
+    return np.divide((f1 * present).sum(axis=-1), present.sum(axis=-1),
+                     out=np.zeros(present.shape[:-1]), where=present.any(axis=-1))
+
+
+def weakest_slices(index, data, n=5):
+    """
+    The n single-dimension slices with the lowest macro-F1 (at least MIN_SUPPORT rows).
+
+    Returns a list of dicts with dimension, value, rows and macro_f1.
+    """
+    rows = []
+    for dimension in index["dimensions"]:
+        counts = read_block(index, data, [dimension["name"]])
+        macro_f1 = slice_macro_f1(counts)
+        for v, label in enumerate(dimension["labels"]):
+            support = int(counts[v].sum())
+            if support >= index["min_support"]:
+                rows.append({"dimension": dimension["name"], "value": label, "rows": support,
+                             "macro_f1": round(float(macro_f1[v]), 4)})
+    return sorted(rows, key=lambda row: row["macro_f1"])[:n]
@@ -0,0 +1,184 @@
+"""
+Content-Addressed Stage Cache
+=============================
+
+Caches the outputs of pipeline stages (engineered features, fitted scaler,
+each fitted base estimator, predictions) under a key derived from
+
+    - the keys/digests of the stage's inputs,
+    - the source code of the functions/classes that compute it,
+    - its parameters (and the scikit-learn version).
+
+A rerun with unchanged inputs, code and parameters loads the stage output
+instead of recomputing it; changing any of them changes the key. Keys of
+upstream stages are passed on as inputs, so e.g. the scaler key depends on
+the feature key without hashing the feature matrix again.
+
+Storage (one directory per entry under claude/.stage_cache/):
+
+    <stage>-<key>/meta.json       stage, key, compute time, stored files
+    <stage>-<key>/<name>.npy      NumPy arrays, loaded memory-mapped
+    <stage>-<key>/objects.joblib  everything else (uncompressed joblib, so
+                                  arrays inside fitted estimators are
+                                  memory-mapped as well)
+
+Entries are published atomically (temp dir + rename). The cache is kept
+below max_bytes by least-recently-used eviction; every hit refreshes the
+entry's modification time.
+"""
+
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+import sklearn
+
+from defaults import DEFAULT_MAX_BYTES
+
+SCRIPT_DIR = Path(__file__).parent
+DEFAULT_CACHE_DIR = SCRIPT_DIR / ".stage_cache"
+
+OBJECTS_FILE = "objects.joblib"
+
+
+def code_digest(*objects):
+    """SHA-256 over the source code of functions, classes or modules."""
+    digest = hashlib.sha256()
+    for obj in objects:
+        digest.update(inspect.getsource(obj).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def digest(value):
+    """
+    Digest of one stage input.
+
+    Strings are taken as already computed keys/digests; arrays, DataFrames
+    and (unfitted) estimators are hashed with joblib.hash, which hashes
+    array buffers directly and estimators by their parameters.
+    """
+    if isinstance(value, str):
+        return value
+    return joblib.hash(value)
+
+
+def _entry_size(path):
+    return sum(f.stat().st_size for f in path.iterdir() if f.is_file())
+
+
+class StageCache:
+    """Content-addressed, size-bounded LRU cache of stage outputs."""
+
+    def __init__(self, root=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, enabled=True,
+                 verbose=True):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.verbose = verbose
+        # stage -> {"hit": bool, "seconds": compute time of the stored output}
+        self.stats = {}
+
+    def key(self, stage, inputs=(), code=(), params=None):
+        """Key of a stage from its inputs, code digests and parameters."""
+        payload = {
+            "stage": stage,
+            "inputs": [digest(value) for value in inputs],
+            "code": list(code),
+            "params": repr(sorted((params or {}).items())),
+            "sklearn": sklearn.__version__,
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()[:24]
+
+    def _path(self, stage, key):
+        return self.root / f"{stage}-{key}"
+
+    def get(self, stage, key):
+        """Stored output dict of (stage, key), or None on a miss."""
+        if not self.enabled:
+            return None
+        path = self._path(stage, key)
+        try:
+            with open(path / "meta.json", encoding="utf-8") as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            return None
+
+        value = {name: np.load(path / f"{name}.npy", mmap_mode="r") for name in meta["arrays"]}
+        if meta["objects"]:
+            value.update(joblib.load(path / OBJECTS_FILE, mmap_mode="r"))
+        # LRU bookkeeping: a hit makes the entry the most recently used
+        os.utime(path)
+        self.stats[stage] = {"hit": True, "seconds": meta["seconds"]}
+        return value
+
+    def put(self, stage, key, value, seconds):
+        """Store an output dict; arrays as .npy, everything else in one joblib file."""
+        self.stats[stage] = {"hit": False, "seconds": round(seconds, 4)}
+        if not self.enabled:
+            return
+        self.root.mkdir(parents=True, exist_ok=True)
+        path = self._path(stage, key)
+        tmp_dir = Path(tempfile.mkdtemp(dir=self.root, prefix=".tmp-"))
+        try:
+            # Object arrays cannot be memory-mapped; they go to the joblib file
+            arrays = {k: v for k, v in value.items()
+                      if isinstance(v, np.ndarray) and v.dtype != object}
+            objects = {k: v for k, v in value.items() if k not in arrays}
+            for name, array in arrays.items():
+                np.save(tmp_dir / f"{name}.npy", array)
+            if objects:
+                joblib.dump(objects, tmp_dir / OBJECTS_FILE)
+            meta = {"stage": stage, "key": key, "seconds": round(seconds, 4),
+                    "arrays": sorted(arrays), "objects": bool(objects)}
+            with open(tmp_dir / "meta.json", "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            os.replace(tmp_dir, path)
+        except OSError:
+            # Another run may have published the same entry concurrently
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            if not (path / "meta.json").exists():
+                raise
+        self.evict(keep=path)
+
+    def cached(self, stage, key, compute):
+        """
+        Output dict of `compute()` for (stage, key), loaded from the cache if present.
+
+        compute must return a dict (arrays and/or arbitrary picklable objects).
+        """
+        value = self.get(stage, key)
+        if value is not None:
+            if self.verbose:
+                print(f"  [cache] {stage}: hit ({key[:8]})")
+            return value
+        start = time.perf_counter()
+        value = compute()
+        self.put(stage, key, value, time.perf_counter() - start)
+        if self.verbose and self.enabled:
+            print(f"  [cache] {stage}: stored ({key[:8]})")
+        return value
+
+    def evict(self, keep=None):
+        """Delete least recently used entries until the cache fits into max_bytes."""
+        if not self.root.exists():
+            return
+        entries = [p for p in self.root.iterdir() if p.is_dir() and not p.name.startswith(".tmp-")]
+        sizes = {p: _entry_size(p) for p in entries}
+        total = sum(sizes.values())
+        for path in sorted(entries, key=lambda p: p.stat().st_mtime):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            total -= sizes[path]
+
+    def clear(self):
+        shutil.rmtree(self.root, ignore_errors=True)
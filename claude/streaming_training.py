@@ -0,0 +1,296 @@
+"""
+Out-of-Core Training
+====================
+
+Streaming training mode for exports that do not fit in memory as one dense
+matrix (e.g. the merged records of several universities).
+
+The CSV is read in fixed-size chunks (shared-data/data_loader.iter_csv_chunks)
+and never materialized as a whole:
+
+    pass 1       StandardScaler.partial_fit on the training rows, category
+                 dictionaries of the code columns, class counts
+    pass 2..E+1  averaged SGDClassifier.partial_fit (log-loss, i.e. logistic regression),
+                 one pass per epoch, rows shuffled within each chunk
+    last pass    predictions on the test rows, accumulated in a confusion matrix
+
+Peak memory is bounded by the chunk size; only the scaler statistics, the
+category dictionaries, the linear model and a (n_classes x n_classes)
+confusion matrix persist between chunks.
+
+Categorical encoding
+--------------------
+The nominal code columns (Course, Application mode, occupations, ...; see
+shared-data/categorical_encoding.py) carry no order, so the linear model
+does not get them as scaled numbers:
+
+    onehot   sparse CSR one-hot of the codes next to the scaled numeric
+             columns (default); ~230 extra columns but only 9 stored values
+             per row
+    target   smoothed per-class frequencies of each category (27 dense
+             columns); counts come from pass 1, and the training rows are
+             encoded leave-one-out (their own label subtracted) so the model
+             never sees its target in the features
+    none     codes scaled like every other column (the original behaviour)
+
+Train/test split
+----------------
+train_test_split needs all labels up front, so the streaming mode uses
+StratifiedStreamSplit instead: per class, rows are grouped into consecutive
+blocks of 100 and a random 20 of every block (drawn from random_state=42)
+become test rows. The split is stratified, exactly 80/20 per class (up to the
+last incomplete block), independent of the chunk size and identical on every
+pass. It does not select the same rows as train_test_split, so metrics are
+comparable to, but not identical with, the in-memory ensemble.
+
+Usage:
+    python dropout_prediction.py train --streaming --chunk-size 100000
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+from sklearn.linear_model import SGDClassifier
+import scipy.sparse as sp
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+from features import FeatureEngineer
+from metrics import metrics_from_confusion
+from profiling import peak_rss_mb
+
+SCRIPT_DIR = Path(__file__).parent
+sys.path.insert(0, str(SCRIPT_DIR.parent / "shared-data"))
+from data_loader import iter_csv_chunks, TARGET_CLASSES, TARGET_COLUMN  # noqa: E402
+from categorical_encoding import CategoricalEncoder, NOMINAL_COLUMNS  # noqa: E402
+from defaults import (  # noqa: E402
+    DEFAULT_STREAMING_CHUNK_SIZE as DEFAULT_CHUNK_SIZE, DEFAULT_EPOCHS, CATEGORICAL_ENCODINGS,
+    DEFAULT_CATEGORICAL_ENCODING
+)
+
+
+class LinearDesign:
+    """
+    Design matrix of the linear model: scaled numeric columns plus encoded code columns.
+    
+    Takes the FeatureEngineer output. Stored as the artifact's "scaler", so
+    the predict path (scaler.transform -> model.predict_proba) is unchanged;
+    with 'onehot' transform returns a CSR matrix.
+    """
+
+    def __init__(self, feature_names, encoding=DEFAULT_CATEGORICAL_ENCODING):
+        if encoding not in CATEGORICAL_ENCODINGS:
+            raise ValueError(f"Unknown categorical encoding {encoding!r}, "
+                             f"expected one of {CATEGORICAL_ENCODINGS}")
+        names = list(feature_names)
+        self.encoding = encoding
+        self.categorical_index = ([] if encoding == 'none' else
+                                  [names.index(col) for col in NOMINAL_COLUMNS if col in names])
+        self.numeric_index = [j for j in range(len(names)) if j not in self.categorical_index]
+        self.scaler = StandardScaler()
+        self.encoder = CategoricalEncoder()
+
+    def partial_fit(self, X, y=None):
+        """Update the scaler statistics and category dictionaries (class counts for 'target')."""
+        self.scaler.partial_fit(X[:, self.numeric_index])
+        if self.categorical_index:
+            self.encoder.partial_fit(X[:, self.categorical_index],
+                                     y if self.encoding == 'target' else None)
+        return self
+
+    def transform(self, X, y=None):
+        """Design matrix; pass y for training rows (leave-one-out target encoding)."""
+        numeric = self.scaler.transform(X[:, self.numeric_index])
+        if self.encoding == 'onehot':
+            return sp.hstack([sp.csr_matrix(numeric), self.encoder.one_hot(X[:, self.categorical_index])],
+                             format='csr')
+        if self.encoding == 'target':
+            return np.hstack([numeric, self.encoder.target_encode(X[:, self.categorical_index], y)])
+        return numeric
+
+
+class StratifiedStreamSplit:
+    """
+    Chunk-size independent, stratified train/test assignment for streamed rows.
+
+    Rows of each class are numbered in order of appearance; every block of
+    `block_size` consecutive rows of a class gets round(test_size * block_size)
+    randomly chosen test rows. Blocks are drawn in order from one generator
+    per class, so the assignment depends only on the row order and
+    random_state, never on how the stream is chunked.
+    """
+
+    def __init__(self, n_classes, test_size=0.2, random_state=42, block_size=100):
+        self.n_classes = n_classes
+        self.block_size = block_size
+        self.n_test = int(round(test_size * block_size))
+        self._rngs = [np.random.default_rng([random_state, c]) for c in range(n_classes)]
+        self._seen = np.zeros(n_classes, dtype=np.int64)
+        # Test mask of the most recent (possibly incomplete) block of each class
+        self._block_index = np.full(n_classes, -1, dtype=np.int64)
+        self._block_mask = [None] * n_classes
+
+    def _mask(self, c, block):
+        if block != self._block_index[c]:
+            mask = np.zeros(self.block_size, dtype=bool)
+            mask[self._rngs[c].permutation(self.block_size)[:self.n_test]] = True
+            self._block_index[c], self._block_mask[c] = block, mask
+        return self._block_mask[c]
+
+    def assign(self, y):
+        """Boolean test mask for the next len(y) rows with encoded labels y."""
+        is_test = np.zeros(len(y), dtype=bool)
+        for c in range(self.n_classes):
+            rows = np.flatnonzero(y == c)
+            if len(rows) == 0:
+                continue
+            ordinals = self._seen[c] + np.arange(len(rows))
+            first, last = ordinals[0] // self.block_size, ordinals[-1] // self.block_size
+            masks = np.concatenate([self._mask(c, b) for b in range(first, last + 1)])
+            is_test[rows] = masks[ordinals - first * self.block_size]
+            self._seen[c] += len(rows)
+        return is_test
+
+
+def _iter_split_chunks(data_path, chunk_size, label_encoder, random_state, feature_engineer):
+    """Yield (X_engineered, y, is_test) per chunk; fits feature_engineer on the first chunk."""
+    splitter = StratifiedStreamSplit(len(label_encoder.classes_), random_state=random_state)
+    for chunk in iter_csv_chunks(data_path, chunk_size):
+        y = label_encoder.transform(chunk[TARGET_COLUMN].astype(str))
+        X = chunk.drop(columns=[TARGET_COLUMN])
+        if not hasattr(feature_engineer, 'feature_names_in_'):
+            feature_engineer.fit(X)
+        yield feature_engineer.transform(X), y, splitter.assign(y)
+
+
+def train_streaming(data_path, chunk_size=DEFAULT_CHUNK_SIZE, epochs=DEFAULT_EPOCHS,
+                    random_state=42, categorical_encoding=DEFAULT_CATEGORICAL_ENCODING):
+    """
+    Train scaler + SGD logistic regression in bounded memory.
+    
+    The returned "scaler" is a LinearDesign (scaling + categorical_encoding).
+
+    Returns (model, scaler, label_encoder, feature_engineer, results) where
+    results has the same evaluation keys as evaluate_model's result.json.
+    """
+    print("\n" + "=" * 60)
+    print("STREAMING TRAINING (OUT-OF-CORE)")
+    print("=" * 60)
+    print(f"Chunk size: {chunk_size} rows, epochs: {epochs}, "
+          f"categorical encoding: {categorical_encoding}")
+
+    label_encoder = LabelEncoder().fit(TARGET_CLASSES)
+    class_names = label_encoder.classes_
+    classes = np.arange(len(class_names))
+    feature_engineer = FeatureEngineer()
+    scaler = None
+    start_time = time.time()
+
+    # ═══════════════════════════════════════════════════════════════
+    # PASS 1: SCALER STATISTICS, CATEGORY DICTIONARIES AND CLASS COUNTS
+    # ═══════════════════════════════════════════════════════════════
+    train_counts = np.zeros(len(classes), dtype=np.int64)
+    test_counts = np.zeros(len(classes), dtype=np.int64)
+    for X, y, is_test in _iter_split_chunks(data_path, chunk_size, label_encoder,
+                                            random_state, feature_engineer):
+        if scaler is None:
+            # The first chunk has fitted the feature engineer
+            scaler = LinearDesign(feature_engineer.get_feature_names_out(), categorical_encoding)
+        if (~is_test).any():
+            scaler.partial_fit(X[~is_test], y[~is_test])
+        train_counts += np.bincount(y[~is_test], minlength=len(classes))
+        test_counts += np.bincount(y[is_test], minlength=len(classes))
+
+    print(f"\nTrain set size: {train_counts.sum()}")
+    print(f"Test set size: {test_counts.sum()}")
+    for i, name in enumerate(class_names):
+        print(f"  {name}: {train_counts[i]} train / {test_counts[i]} test")
+
+    # partial_fit does not accept class_weight='balanced'; same formula from the pass-1 counts
+    class_weight = {
+        int(c): float(train_counts.sum() / (len(classes) * train_counts[c]))
+        for c in classes if train_counts[c] > 0
+    }
+
+    # ═══════════════════════════════════════════════════════════════
+    # PASSES 2..E+1: INCREMENTAL MODEL FIT
+    # ═══════════════════════════════════════════════════════════════
+    # Averaged SGD: the noisy per-chunk updates alone reach ~0.61 macro F1, averaging ~0.71
+    model = SGDClassifier(loss='log_loss', alpha=1e-4, average=True, class_weight=class_weight,
+                          random_state=random_state)
+    rng = np.random.default_rng(random_state)
+    for epoch in range(epochs):
+        for X, y, is_test in _iter_split_chunks(data_path, chunk_size, label_encoder,
+                                                random_state, feature_engineer):
+            train_rows = np.flatnonzero(~is_test)
+            if len(train_rows) == 0:
+                continue
+            # SGD expects shuffled samples; rows of a chunk are shuffled in place
+            train_rows = rng.permutation(train_rows)
+            model.partial_fit(scaler.transform(X[train_rows], y[train_rows]), y[train_rows],
+                              classes=classes)
+        print(f"  Epoch {epoch + 1}/{epochs} done")
+
+    training_time = time.time() - start_time
+    print(f"Training completed in {training_time:.2f} seconds")
+
+    # ═══════════════════════════════════════════════════════════════
+    # LAST PASS: EVALUATION ON THE STREAMED TEST ROWS
+    # ═══════════════════════════════════════════════════════════════
+    cm = np.zeros((len(classes), len(classes)), dtype=np.int64)
+    for X, y, is_test in _iter_split_chunks(data_path, chunk_size, label_encoder,
+                                            random_state, feature_engineer):
+        if is_test.any():
+            y_pred = model.predict(scaler.transform(X[is_test]))
+            np.add.at(cm, (y[is_test], y_pred), 1)
+
+    metrics = metrics_from_confusion(cm)
+    print("\n===== EVALUATION RESULTS =====")
+    print(f"Macro F1-Score:      {metrics['macro_f1_score']:.4f}")
+    print(f"Weighted F1-Score:   {metrics['weighted_f1_score']:.4f}")
+    print(f"Balanced Accuracy:   {metrics['balanced_accuracy']:.4f}")
+    print(f"Accuracy:            {metrics['accuracy']:.4f}")
+    print(f"Peak RSS:            {peak_rss_mb()} MB")
+
+    results = {
+        "evaluation_metrics": {
+            key: round(float(metrics[key]), 4)
+            for key in ("macro_f1_score", "weighted_f1_score", "balanced_accuracy", "accuracy")
+        },
+        "confusion_matrix": {
+            "matrix": cm.tolist(),
+            "labels": list(class_names)
+        },
+        "per_class_metrics": {
+            name: {
+                "precision": round(float(metrics["precision"][i]), 4),
+                "recall": round(float(metrics["recall"][i]), 4),
+                "f1_score": round(float(metrics["f1"][i]), 4),
+                "support": int(metrics["support"][i])
+            }
+            for i, name in enumerate(class_names)
+        },
+        "training_time_seconds": round(training_time, 2),
+        "training_mode": {
+            "type": "streaming",
+            "model": "SGDClassifier (log_loss, averaged, partial_fit)",
+            "chunk_size": chunk_size,
+            "epochs": epochs,
+            "categorical_encoding": categorical_encoding,
+            "split": "StratifiedStreamSplit (80/20 per class, random_state=42)",
+            "peak_rss_mb": peak_rss_mb(),
+        },
+    }
+    return model, scaler, label_encoder, feature_engineer, results
+
+
+def save_streaming_model(model, scaler, label_encoder, feature_engineer, path):
+    """Same artifact layout as save_model, so `predict --model <path>` can use it."""
+    joblib.dump({
+        "model": model,
+        "scaler": scaler,
+        "label_encoder": label_encoder,
+        "feature_engineer": feature_engineer,
+    }, path)
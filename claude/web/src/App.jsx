@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react'
+import { useState, useEffect, useRef } from 'react'
 import {
   Chart as ChartJS,
   CategoryScale,
@@ -13,7 +13,7 @@ import {
   LineElement,
   Filler
 } from 'chart.js'
-import { Bar, Doughnut, Radar } from 'react-chartjs-2'
+import { Bar, Doughnut, Radar, Line } from 'react-chartjs-2'
 import './App.css'
 
 // Register Chart.js components
@@ -392,6 +392,460 @@ function RadarChart({ perClassMetrics }) {
   )
 }
 
+function FeatureAttributionChart({ attribution }) {
+  const top = attribution.features.slice(0, 15)
+
+  const data = {
+    labels: top.map(f => f.feature),
+    datasets: [
+      {
+        label: 'Permutation Importance (Macro-F1 Drop)',
+        data: top.map(f => f.importance_mean),
+        backgroundColor: 'rgba(99, 102, 241, 0.8)',
+        borderColor: 'rgba(99, 102, 241, 1)',
+        borderWidth: 2,
+        borderRadius: 6,
+      },
+      {
+        label: 'Mean |Contribution| (Probability)',
+        data: top.map(f => f.mean_abs_contribution),
+        backgroundColor: 'rgba(16, 185, 129, 0.8)',
+        borderColor: 'rgba(16, 185, 129, 1)',
+        borderWidth: 2,
+        borderRadius: 6,
+      }
+    ]
+  }
+
+  const options = {
+    responsive: true,
+    maintainAspectRatio: false,
+    indexAxis: 'y',
+    plugins: {
+      legend: {
+        position: 'top',
+        labels: { color: '#94a3b8', font: { family: 'Inter', weight: 500 } }
+      },
+      tooltip: {
+        callbacks: {
+          afterLabel: (ctx) => {
+            const feature = top[ctx.dataIndex]
+            return ctx.datasetIndex === 0 ? `± ${feature.importance_std}` : ''
+          }
+        }
+      }
+    },
+    scales: {
+      x: {
+        ticks: { color: '#94a3b8', font: { family: 'Inter' } },
+        grid: { color: 'rgba(148, 163, 184, 0.1)' }
+      },
+      y: {
+        ticks: { color: '#94a3b8', font: { family: 'Inter' } },
+        grid: { color: 'rgba(148, 163, 184, 0.1)' }
+      }
+    }
+  }
+
+  return (
+    <div className="card full-width animate-in delay-3">
+      <div className="card-header">
+        <div className="card-icon success">🔍</div>
+        <h2 className="card-title">Feature Attribution</h2>
+      </div>
+      <div className="chart-container">
+        <Bar data={data} options={options} />
+      </div>
+      <p className="metric-description">
+        Baseline Macro F1: {attribution.baseline_score} • {attribution.n_repeats} permutations per feature •
+        Contributions: tree-path attribution to the predicted class
+      </p>
+    </div>
+  )
+}
+
+function PerformanceChart({ performance }) {
+  const stages = Object.entries(performance.stages)
+  const estimators = Object.entries(performance.estimators || {})
+
+  const data = {
+    labels: [
+      ...stages.map(([name]) => name),
+      ...estimators.map(([name, e]) => `fit ${name} (${e.type})`)
+    ],
+    datasets: [
+      {
+        label: 'Wall Time (s)',
+        data: [
+          ...stages.map(([, s]) => s.wall_time_seconds),
+          ...estimators.map(([, e]) => e.fit_wall_time_seconds)
+        ],
+        backgroundColor: 'rgba(99, 102, 241, 0.8)',
+        borderColor: 'rgba(99, 102, 241, 1)',
+        borderWidth: 2,
+        borderRadius: 6,
+      },
+      {
+        label: 'CPU Time (s)',
+        data: [
+          ...stages.map(([, s]) => s.cpu_time_seconds),
+          ...estimators.map(([, e]) => e.fit_cpu_time_seconds)
+        ],
+        backgroundColor: 'rgba(245, 158, 11, 0.8)',
+        borderColor: 'rgba(245, 158, 11, 1)',
+        borderWidth: 2,
+        borderRadius: 6,
+      }
+    ]
+  }
+
+  const options = {
+    responsive: true,
+    maintainAspectRatio: false,
+    indexAxis: 'y',
+    plugins: {
+      legend: {
+        position: 'top',
+        labels: { color: '#94a3b8', font: { family: 'Inter', weight: 500 } }
+      },
+      tooltip: {
+        callbacks: {
+          afterLabel: (ctx) => {
+            const stage = stages[ctx.dataIndex]
+            return stage && stage[1].peak_rss_mb != null ? `Peak RSS: ${stage[1].peak_rss_mb} MB` : ''
+          }
+        }
+      }
+    },
+    scales: {
+      x: {
+        ticks: { color: '#94a3b8', font: { family: 'Inter' } },
+        grid: { color: 'rgba(148, 163, 184, 0.1)' }
+      },
+      y: {
+        ticks: { color: '#94a3b8', font: { family: 'Inter' } },
+        grid: { color: 'rgba(148, 163, 184, 0.1)' }
+      }
+    }
+  }
+
+  return (
+    <div className="card full-width animate-in delay-3">
+      <div className="card-header">
+        <div className="card-icon primary">⏱️</div>
+        <h2 className="card-title">Pipeline Performance</h2>
+      </div>
+      <div className="chart-container">
+        <Bar data={data} options={options} />
+      </div>
+      <p className="metric-description">
+        Total: {performance.total.wall_time_seconds.toFixed(2)}s wall
+        {performance.total.peak_rss_mb != null && ` • Peak RSS: ${performance.total.peak_rss_mb} MB`}
+      </p>
+    </div>
+  )
+}
+
+// Polls the run store API (shared-data/run_api.py) for new runs only:
+// `since` transfers just the runs after the newest one we have, and the
+// ETag turns an unchanged poll into an empty 304 response. Pages are
+// fetched back to back while the API reports `has_more`.
+const RUN_POLL_INTERVAL_MS = 15000
+
+function useRunHistory(pipeline) {
+  const [runs, setRuns] = useState([])
+  const [available, setAvailable] = useState(true)
+  const lastRunId = useRef(0)
+  const etag = useRef(null)
+
+  useEffect(() => {
+    let cancelled = false
+
+    async function poll() {
+      try {
+        const response = await fetch(
+          `/api/runs?pipeline=${pipeline}&since=${lastRunId.current}`,
+          { headers: etag.current ? { 'If-None-Match': etag.current } : {} }
+        )
+        if (response.status === 304) return
+        if (!response.ok) {
+          setAvailable(false)
+          return
+        }
+        const json = await response.json()
+        if (cancelled) return
+        etag.current = response.headers.get('ETag')
+        lastRunId.current = json.last_run_id
+        if (json.runs.length > 0) setRuns(previous => [...previous, ...json.runs])
+        setAvailable(true)
+        if (json.has_more) await poll()
+      } catch {
+        if (!cancelled) setAvailable(false)
+      }
+    }
+
+    poll()
+    const timer = setInterval(poll, RUN_POLL_INTERVAL_MS)
+    return () => {
+      cancelled = true
+      clearInterval(timer)
+    }
+  }, [pipeline])
+
+  return { runs, available }
+}
+
+function RunHistoryChart() {
+  const { runs, available } = useRunHistory('claude')
+
+  // Hidden when the run API is not running (e.g. static build without backend)
+  if (!available || runs.length === 0) return null
+
+  const data = {
+    labels: runs.map(run => `#${run.run_id}`),
+    datasets: [
+      {
+        label: 'Macro F1',
+        data: runs.map(run => run.macro_f1),
+        borderColor: 'rgba(99, 102, 241, 1)',
+        backgroundColor: 'rgba(99, 102, 241, 0.2)',
+        fill: true,
+        tension: 0.3,
+      },
+      {
+        label: 'Balanced Accuracy',
+        data: runs.map(run => run.balanced_accuracy),
+        borderColor: 'rgba(16, 185, 129, 1)',
+        backgroundColor: 'rgba(16, 185, 129, 0.2)',
+        tension: 0.3,
+      }
+    ]
+  }
+
+  const options = {
+    responsive: true,
+    maintainAspectRatio: false,
+    plugins: {
+      legend: {
+        position: 'top',
+        labels: { color: '#94a3b8', font: { family: 'Inter', weight: 500 } }
+      },
+      tooltip: {
+        callbacks: {
+          afterLabel: (ctx) => {
+            const run = runs[ctx.dataIndex]
+            return `${run.model} • ${run.timestamp}`
+          }
+        }
+      }
+    },
+    scales: {
+      x: {
+        ticks: { color: '#94a3b8', font: { family: 'Inter' } },
+        grid: { color: 'rgba(148, 163, 184, 0.1)' }
+      },
+      y: {
+        ticks: { color: '#94a3b8', font: { family: 'Inter' } },
+        grid: { color: 'rgba(148, 163, 184, 0.1)' }
+      }
+    }
+  }
+
+  return (
+    <div className="card full-width animate-in delay-3">
+      <div className="card-header">
+        <div className="card-icon primary">📈</div>
+        <h2 className="card-title">Run History</h2>
+      </div>
+      <div className="chart-container">
+        <Line data={data} options={options} />
+      </div>
+      <p className="metric-description">
+        {runs.length} run(s) • latest: {runs[runs.length - 1].model} ({runs[runs.length - 1].timestamp})
+      </p>
+    </div>
+  )
+}
+
+// Slice metrics cube written by the training pipeline (claude/slice_metrics.py):
+// slices.json lists the dimensions and where the confusion matrices of each
+// dimension combination lie in the binary file; only the block of the
+// selected combination is fetched (HTTP Range request).
+const SLICE_ARRAYS = { uint16: Uint16Array, uint32: Uint32Array }
+const SLICE_TABLE_ROWS = 50
+
+async function fetchSliceBlock(index, entry) {
+  const response = await fetch(`/${index.file}`, {
+    headers: { Range: `bytes=${entry.offset}-${entry.offset + entry.length - 1}` }
+  })
+  if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`)
+  let buffer = await response.arrayBuffer()
+  // A server without range support sends the whole file
+  if (response.status !== 206) buffer = buffer.slice(entry.offset, entry.offset + entry.length)
+  // The counts are little-endian, like the typed arrays of all current browsers
+  return new SLICE_ARRAYS[index.dtype](buffer)
+}
+
+// Metrics of one K x K confusion matrix stored at `start` in a block;
+// macro F1 averages the classes occurring in the slice (true or predicted)
+function sliceMetrics(counts, start, k) {
+  const matrix = Array.from({ length: k }, (_, i) =>
+    Array.from(counts.subarray(start + i * k, start + (i + 1) * k)))
+  const support = matrix.map(row => row.reduce((a, b) => a + b, 0))
+  const predicted = matrix[0].map((_, j) => matrix.reduce((a, row) => a + row[j], 0))
+  const recall = matrix.map((row, i) => (support[i] > 0 ? row[i] / support[i] : 0))
+  const f1 = matrix.map((row, i) => {
+    const precision = predicted[i] > 0 ? row[i] / predicted[i] : 0
+    return precision + recall[i] > 0 ? (2 * precision * recall[i]) / (precision + recall[i]) : 0
+  })
+  const present = support.map((n, i) => n + predicted[i] > 0)
+  const nPresent = present.filter(Boolean).length
+  const rows = support.reduce((a, b) => a + b, 0)
+  return {
+    matrix,
+    rows,
+    recall,
+    macroF1: nPresent > 0 ? f1.reduce((a, v, i) => a + (present[i] ? v : 0), 0) / nPresent : 0,
+    accuracy: rows > 0 ? matrix.reduce((a, row, i) => a + row[i], 0) / rows : 0,
+  }
+}
+
+// Rows of a combination block: value labels of every slice and its metrics
+function blockSlices(index, entry, counts) {
+  const k = index.classes.length
+  const dims = entry.dimensions.map(d => index.dimensions[d])
+  const cells = entry.shape.slice(0, -2).reduce((a, b) => a * b, 1)
+  const slices = []
+  for (let cell = 0; cell < cells; cell++) {
+    const labels = []
+    let rest = cell
+    for (let d = dims.length - 1; d >= 0; d--) {
+      labels.unshift(dims[d].labels[rest % entry.shape[d]])
+      rest = Math.floor(rest / entry.shape[d])
+    }
+    const metrics = sliceMetrics(counts, cell * k * k, k)
+    if (metrics.rows > 0) slices.push({ key: cell, labels, ...metrics })
+  }
+  return slices.sort((a, b) => b.rows - a.rows)
+}
+
+function SliceExplorer() {
+  const [index, setIndex] = useState(null)
+  const [selected, setSelected] = useState([])
+  const [slices, setSlices] = useState(null)
+  const [active, setActive] = useState(null)
+  const blocks = useRef(new Map())
+
+  useEffect(() => {
+    fetch('/slices.json')
+      .then(response => (response.ok ? response.json() : null))
+      .then(setIndex)
+      .catch(() => setIndex(null))
+  }, [])
+
+  useEffect(() => {
+    if (!index) return
+    let cancelled = false
+    const wanted = [...selected].sort((a, b) => a - b).join(',')
+    const entry = index.combinations.find(e => e.dimensions.join(',') === wanted)
+    if (!entry) return
+
+    async function load() {
+      if (!blocks.current.has(wanted)) {
+        blocks.current.set(wanted, blockSlices(index, entry, await fetchSliceBlock(index, entry)))
+      }
+      if (!cancelled) {
+        setSlices(blocks.current.get(wanted))
+        setActive(null)
+      }
+    }
+    load().catch(() => !cancelled && setSlices(null))
+    return () => {
+      cancelled = true
+    }
+  }, [index, selected])
+
+  // Hidden until the pipeline has written the cube
+  if (!index) return null
+
+  const toggle = (d) => setSelected(previous =>
+    previous.includes(d) ? previous.filter(x => x !== d) : [...previous, d])
+  const activeSlice = slices && slices.find(s => s.key === active)
+
+  return (
+    <div className="card full-width animate-in delay-3">
+      <div className="card-header">
+        <div className="card-icon success">🔍</div>
+        <h2 className="card-title">Metrics by Slice</h2>
+      </div>
+      <div className="slice-dimensions">
+        {index.dimensions.map((dimension, d) => (
+          <button
+            key={dimension.name}
+            className={`slice-dimension ${selected.includes(d) ? 'selected' : ''}`}
+            onClick={() => toggle(d)}
+          >
+            {dimension.name}
+          </button>
+        ))}
+      </div>
+      {slices && (
+        <table className="metrics-table">
+          <thead>
+            <tr>
+              <th>Slice</th>
+              <th>Students</th>
+              <th>Macro F1</th>
+              {index.classes.map(name => <th key={name}>Recall {name}</th>)}
+            </tr>
+          </thead>
+          <tbody>
+            {slices.slice(0, SLICE_TABLE_ROWS).map(slice => (
+              <tr
+                key={slice.key}
+                className={`slice-row ${slice.rows < index.min_support ? 'slice-small' : ''}`}
+                onClick={() => setActive(slice.key === active ? null : slice.key)}
+              >
+                <td>{slice.labels.length > 0 ? slice.labels.join(' • ') : 'All students'}</td>
+                <td style={{ fontWeight: 600 }}>{slice.rows}</td>
+                <td>{(slice.macroF1 * 100).toFixed(1)}%</td>
+                {slice.recall.map((value, i) => <td key={i}>{(value * 100).toFixed(1)}%</td>)}
+              </tr>
+            ))}
+          </tbody>
+        </table>
+      )}
+      {activeSlice && (
+        <table className="matrix-table">
+          <thead>
+            <tr>
+              <th></th>
+              {index.classes.map(label => <th key={label}>{label}</th>)}
+            </tr>
+          </thead>
+          <tbody>
+            {activeSlice.matrix.map((row, i) => (
+              <tr key={index.classes[i]}>
+                <td className="matrix-label">{index.classes[i]}</td>
+                {row.map((val, j) => (
+                  <td key={j} className={i === j ? 'matrix-diagonal' : 'matrix-off-diagonal'}>
+                    {val}
+                  </td>
+                ))}
+              </tr>
+            ))}
+          </tbody>
+        </table>
+      )}
+      <p className="metric-description">
+        Test split ({index.rows} students){slices && slices.length > SLICE_TABLE_ROWS &&
+          ` • largest ${SLICE_TABLE_ROWS} of ${slices.length} slices`} • slices under{' '}
+        {index.min_support} students are greyed out • click a slice for its confusion matrix
+      </p>
+    </div>
+  )
+}
+
 function InterpretationCard() {
   const insights = [
     { icon: '🎯', text: <><strong>Macro F1-Score (70.6%):</strong> Durchschnittliche Performance über alle drei Klassen. Ein Wert über 70% zeigt eine gute Balance zwischen Precision und Recall.</> },
@@ -494,6 +948,14 @@ function App() {
         <RadarChart perClassMetrics={data.per_class_metrics} />
       </div>
       
+      {data.feature_attribution && <FeatureAttributionChart attribution={data.feature_attribution} />}
+      
+      {data.performance && <PerformanceChart performance={data.performance} />}
+      
+      <RunHistoryChart />
+      
+      <SliceExplorer />
+      
       <InterpretationCard />
       
       <Footer />
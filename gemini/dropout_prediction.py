@@ -1,8 +1,10 @@
 import pandas as pd
 import numpy as np
-import json
+import sys
 import time
-from sklearn.model_selection import train_test_split, GridSearchCV
+from pathlib import Path
+from sklearn.model_selection import train_test_split
+from sklearn.base import BaseEstimator, TransformerMixin
 from sklearn.preprocessing import StandardScaler, LabelEncoder
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import (
@@ -13,13 +15,63 @@ from sklearn.metrics import (
     classification_report
 )
 
+DATA_PATH = Path(__file__).resolve().parent.parent / 'shared-data' / 'data.csv'
+sys.path.insert(0, str(DATA_PATH.parent))
+from data_loader import load_data, content_hash  # noqa: E402
+from categorical_encoding import CategoricalEncoder, NOMINAL_COLUMNS  # noqa: E402
+from result_publisher import ResultPublisher  # noqa: E402
+from run_store import RunStore  # noqa: E402
+from rf_search import ForestSearch, DEFAULT_CACHE_DIR  # noqa: E402
+
+GEMINI_DIR = Path(__file__).resolve().parent
+
+# Dashboard copies of result.json: public/ (React app) and first_version/ (static page).
+# Written atomically and concurrently; run_history.jsonl gets one summary line per run.
+publisher = ResultPublisher(
+    sinks=[GEMINI_DIR / 'public' / 'result.json', GEMINI_DIR / 'first_version' / 'result.json'],
+    summary=lambda r: {**r['metrics'], 'training_time': r['training_time']},
+    indent=4,
+    ensure_ascii=True,
+)
+
+class Preprocessor(BaseEstimator, TransformerMixin):
+    # Scales numerical features; nominal code columns (Course, occupations, ...) become
+    # compact contiguous integer codes instead, which the forest splits on directly.
+    # The column order is kept.
+    def fit(self, X, y=None):
+        self.categorical_ = [col for col in X.columns if col in NOMINAL_COLUMNS]
+        self.numeric_ = [col for col in X.columns if col not in self.categorical_]
+        self.is_categorical_ = X.columns.isin(self.categorical_)
+        self.scaler_ = StandardScaler().fit(X[self.numeric_])
+        self.encoder_ = CategoricalEncoder().fit(X[self.categorical_])
+        return self
+
+    def transform(self, X):
+        out = np.empty(X.shape)
+        out[:, ~self.is_categorical_] = self.scaler_.transform(X[self.numeric_])
+        out[:, self.is_categorical_] = self.encoder_.transform(X[self.categorical_])
+        return out
+
+def make_search(cache_dir=DEFAULT_CACHE_DIR):
+    # Using Random Forest as it handles mixed feature types well and provides feature importance.
+    rf = RandomForestClassifier(random_state=42)
+    
+    param_grid = {
+        'n_estimators': [100, 200],
+        'max_depth': [10, 20, None],
+        'min_samples_split': [2, 5]
+    }
+    
+    # Same grid/folds/scoring as GridSearchCV(cv=3, scoring='f1_macro'), but tree counts
+    # are grown with warm_start and fold scores are cached on disk (see rf_search.py)
+    return ForestSearch(rf, param_grid, cv=3, n_jobs=-1, cache_dir=cache_dir)
+
 def run_pipeline():
     start_time = time.time()
     
     # 1. Load Dataset
-    data_path = '../shared-data/data.csv'
-    # The file uses semicolons as separators based on the preview
-    df = pd.read_csv(data_path, sep=';')
+    # Shared typed loader (semicolon CSV, compact dtypes, cached after first run)
+    df = load_data(DATA_PATH)
     
     # 2. Preprocessing
     # Target Encoding
@@ -37,22 +89,13 @@ def run_pipeline():
         X, y, test_size=0.2, random_state=42, stratify=y
     )
     
-    # Scaling numerical features
-    scaler = StandardScaler()
-    X_train_scaled = scaler.fit_transform(X_train)
-    X_test_scaled = scaler.transform(X_test)
+    # Scaling numerical features, integer codes for the nominal columns
+    preprocessor = Preprocessor()
+    X_train_scaled = preprocessor.fit_transform(X_train)
+    X_test_scaled = preprocessor.transform(X_test)
     
     # 4. Model Training & Tuning
-    # Using Random Forest as it handles mixed feature types well and provides feature importance.
-    rf = RandomForestClassifier(random_state=42)
-    
-    param_grid = {
-        'n_estimators': [100, 200],
-        'max_depth': [10, 20, None],
-        'min_samples_split': [2, 5]
-    }
-    
-    grid_search = GridSearchCV(rf, param_grid, cv=3, scoring='f1_macro', n_jobs=-1)
+    grid_search = make_search()
     grid_search.fit(X_train_scaled, y_train)
     
     best_model = grid_search.best_estimator_
@@ -93,7 +136,7 @@ Graduate        {report['Graduate']['precision']:.3f}   {report['Graduate']['rec
 
 PIPELINE DOCUMENTATION:
 - Initial Assumptions: The dataset is relatively clean but contains class imbalance (likely Graduate > Dropout > Enrolled). Feature scaling is necessary for some models, though RF is robust.
-- Preprocessing: Standard numerical scaling, LabelEncoding for the target. Semicolon separator used for CSV reading.
+- Preprocessing: Standard numerical scaling, dictionary encoding of the nominal code columns (contiguous integer codes), LabelEncoding for the target. Semicolon separator used for CSV reading.
 - Feature Engineering: None in this initial version; relying on raw features and RF's inherent selection.
 - Model: RandomForestClassifier. Chosen for its robustness to non-linear relationships and feature scaling, and ease of interpretability (importance).
 - Hyperparameters: {grid_search.best_params_}
@@ -113,18 +156,22 @@ PIPELINE DOCUMENTATION:
         "confusion_matrix": cm.tolist(),
         "classification_report": report,
         "training_time": training_time,
-        "best_params": grid_search.best_params_
+        "best_params": grid_search.best_params_,
+        # 6. Interpretability: impurity-based importance of the tuned forest (top 15)
+        "feature_importance": [
+            {"feature": X.columns[i], "importance": float(best_model.feature_importances_[i])}
+            for i in np.argsort(best_model.feature_importances_)[::-1][:15]
+        ]
     }
     
-    with open('public/result.json', 'w') as f:
-        json.dump(results_json, f, indent=4)
-        
-    # Also copy to first_version for convenience
-    try:
-        with open('first_version/result.json', 'w') as f:
-            json.dump(results_json, f, indent=4)
-    except:
-        pass
+    for path, status, error in publisher.publish(results_json, record_history=True):
+        if status == 'error':
+            print(f"Could not write {path}: {error}")
+
+    # Run store for the dashboards' history chart (served by shared-data/run_api.py)
+    RunStore().add_run('gemini', 'random_forest_search', results_json['metrics'],
+                       training_time=training_time, data_hash=content_hash(DATA_PATH)[:16],
+                       result=results_json, summary=results_json['metrics'])
 
 if __name__ == "__main__":
     run_pipeline()
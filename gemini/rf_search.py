@@ -0,0 +1,195 @@
+import hashlib
+import json
+import math
+from pathlib import Path
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import f1_score
+from sklearn.model_selection import ParameterGrid, StratifiedKFold
+
+# Fold scores are cached here as small JSON files, one per (data, fold, params)
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent / '.search_cache'
+
+
+def array_hash(*arrays):
+    # Content hash of the training data (shape + dtype + bytes)
+    digest = hashlib.sha256()
+    for a in arrays:
+        a = np.ascontiguousarray(a)
+        digest.update(str((a.shape, a.dtype.str)).encode())
+        digest.update(a.tobytes())
+    return digest.hexdigest()
+
+
+class ForestSearch:
+    """Drop-in replacement for GridSearchCV(RandomForestClassifier, ...) scored with f1_macro.
+
+    - Configs that only differ in n_estimators share one forest per fold: it is
+      grown with warm_start, so n_estimators=200 reuses the 100-tree model.
+      sklearn advances the forest's RNG on warm start, so the grown forest is
+      identical to a freshly trained one and the scores match GridSearchCV.
+    - Every fold score is cached on disk, keyed by data hash + fold + params,
+      so rerunning with a widened grid only trains the new points.
+    - halving_factor > 1 enables successive halving over the tree counts: after
+      each n_estimators rung only the best 1/factor configs keep growing.
+      halving_factor=None evaluates the full grid (same best_params_ as
+      GridSearchCV).
+    """
+
+    def __init__(self, estimator, param_grid, cv=3, n_jobs=-1,
+                 halving_factor=None, cache_dir=DEFAULT_CACHE_DIR, verbose=0):
+        if not isinstance(estimator, RandomForestClassifier):
+            raise TypeError('ForestSearch only supports RandomForestClassifier')
+        self.estimator = estimator
+        self.param_grid = param_grid
+        self.cv = cv
+        self.n_jobs = n_jobs
+        self.halving_factor = halving_factor
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self.verbose = verbose
+
+    # --- cache -------------------------------------------------------------
+
+    def _cache_key(self, data_hash, fold, params):
+        payload = json.dumps({
+            'data': data_hash,
+            'cv': self.cv,
+            'fold': fold,
+            'base_params': {k: repr(v) for k, v in self.estimator.get_params().items()},
+            'params': {k: repr(v) for k, v in params.items()},
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _cache_get(self, key):
+        if self.cache_dir is None:
+            return None
+        path = self.cache_dir / f'{key}.json'
+        if path.exists():
+            with open(path) as f:
+                return json.load(f)['score']
+        return None
+
+    def _cache_put(self, key, score):
+        if self.cache_dir is None:
+            return
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.cache_dir / f'{key}.json.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'score': score}, f)
+        tmp.replace(self.cache_dir / f'{key}.json')
+
+    # --- search ------------------------------------------------------------
+
+    def _grow_and_score(self, X, y, train_idx, val_idx, base_params, forest, tree_counts):
+        # One forest per (config group, fold), grown through the requested tree counts
+        if forest is None:
+            forest = clone(self.estimator).set_params(**base_params, warm_start=True)
+        X_train, y_train = X[train_idx], y[train_idx]
+        X_val, y_val = X[val_idx], y[val_idx]
+        scores = {}
+        for n in tree_counts:
+            forest.set_params(n_estimators=n)
+            forest.fit(X_train, y_train)
+            scores[n] = f1_score(y_val, forest.predict(X_val), average='macro')
+        return scores, forest
+
+    def _evaluate(self, X, y, folds, data_hash, group_ids, tree_counts, keep_forests):
+        # Returns {(group_id, n_estimators): [fold scores]} for the given tree counts
+        scores = {}
+        tasks = []
+        for g in group_ids:
+            base_params = self._groups[g]
+            for fold, (train_idx, val_idx) in enumerate(folds):
+                missing = []
+                for n in tree_counts:
+                    key = self._cache_key(data_hash, fold, {**base_params, 'n_estimators': n})
+                    cached = self._cache_get(key)
+                    if cached is None:
+                        missing.append(n)
+                    else:
+                        scores.setdefault((g, n), {})[fold] = cached
+                if not missing:
+                    continue
+                # Resume from the forest of the previous rung if we still have it;
+                # otherwise grow through every smaller count, the trees are needed anyway
+                forest = self._forests.pop((g, fold), None)
+                start = forest.n_estimators if forest is not None else 0
+                grow = [n for n in self._all_tree_counts if start < n <= max(missing)]
+                tasks.append((g, fold, train_idx, val_idx, base_params, forest, grow))
+
+        if self.verbose:
+            n_total = len(group_ids) * len(folds)
+            print(f'ForestSearch: {len(tasks)} of {n_total} forest(s) to train, '
+                  f'{n_total - len(tasks)} fully served from cache')
+
+        results = Parallel(n_jobs=self.n_jobs)(
+            delayed(self._grow_and_score)(X, y, train_idx, val_idx, base_params, forest, grow)
+            for _, _, train_idx, val_idx, base_params, forest, grow in tasks
+        )
+        for (g, fold, _, _, base_params, _, _), (fold_scores, forest) in zip(tasks, results):
+            for n, score in fold_scores.items():
+                key = self._cache_key(data_hash, fold, {**base_params, 'n_estimators': n})
+                self._cache_put(key, score)
+                if n in tree_counts:
+                    scores.setdefault((g, n), {})[fold] = score
+            if keep_forests:
+                self._forests[(g, fold)] = forest
+
+        return {k: [v[f] for f in range(len(folds))] for k, v in scores.items()}
+
+    def fit(self, X, y):
+        X = np.asarray(X)
+        y = np.asarray(y)
+
+        candidates = list(ParameterGrid(self.param_grid))
+        self._all_tree_counts = sorted({c.get('n_estimators', self.estimator.n_estimators)
+                                        for c in candidates})
+
+        # Candidates that only differ in n_estimators form one group
+        self._groups, candidate_slot = [], []
+        for c in candidates:
+            base = {k: v for k, v in c.items() if k != 'n_estimators'}
+            if base not in self._groups:
+                self._groups.append(base)
+            candidate_slot.append((self._groups.index(base),
+                                   c.get('n_estimators', self.estimator.n_estimators)))
+
+        # Same folds as GridSearchCV(cv=int) for classifiers
+        folds = list(StratifiedKFold(n_splits=self.cv).split(X, y))
+        data_hash = array_hash(X, y)
+
+        # Successive halving over tree counts (or one pass over the full grid)
+        fold_scores = {}
+        self._forests = {}
+        alive = list(range(len(self._groups)))
+        rungs = [[n] for n in self._all_tree_counts] if self.halving_factor else [self._all_tree_counts]
+        for i, rung in enumerate(rungs):
+            keep_forests = i < len(rungs) - 1
+            fold_scores.update(self._evaluate(X, y, folds, data_hash, alive, rung, keep_forests))
+            if self.halving_factor:
+                keep = max(1, math.ceil(len(alive) / self.halving_factor))
+                ranked = sorted(alive, key=lambda g: -np.mean(fold_scores[(g, rung[0])]))
+                alive = sorted(ranked[:keep])
+                self._forests = {k: f for k, f in self._forests.items() if k[0] in alive}
+        self._forests = {}
+
+        # Summary in GridSearchCV's layout; pruned candidates get NaN scores
+        mean_scores = np.array([np.mean(fold_scores[slot]) if slot in fold_scores else np.nan
+                                for slot in candidate_slot])
+        self.cv_results_ = {
+            'params': candidates,
+            'mean_test_score': mean_scores,
+            'std_test_score': np.array([np.std(fold_scores[slot]) if slot in fold_scores else np.nan
+                                        for slot in candidate_slot]),
+        }
+        # Ties resolve to the first candidate in grid order, like GridSearchCV
+        self.best_index_ = int(np.nanargmax(mean_scores))
+        self.best_params_ = candidates[self.best_index_]
+        self.best_score_ = float(mean_scores[self.best_index_])
+
+        self.best_estimator_ = clone(self.estimator).set_params(**self.best_params_)
+        self.best_estimator_.fit(X, y)
+        return self
@@ -1,4 +1,4 @@
-import React, { useEffect, useState } from 'react'
+import React, { useEffect, useRef, useState } from 'react'
 import { 
   Chart as ChartJS, 
   CategoryScale, 
@@ -10,7 +10,7 @@ import {
   PointElement,
   LineElement
 } from 'chart.js'
-import { Bar } from 'react-chartjs-2'
+import { Bar, Line } from 'react-chartjs-2'
 import { motion } from 'framer-motion'
 import { 
   Target, 
@@ -20,7 +20,8 @@ import {
   CheckCircle2, 
   AlertCircle,
   Activity,
-  Award
+  Award,
+  TrendingUp
 } from 'lucide-react'
 
 ChartJS.register(
@@ -54,6 +55,15 @@ interface ResultData {
   };
   training_time: number;
   best_params: Record<string, any>;
+  feature_importance?: { feature: string; importance: number }[];
+}
+
+interface RunSummary {
+  run_id: number;
+  timestamp: string;
+  model: string;
+  macro_f1: number;
+  balanced_accuracy: number;
 }
 
 const App = () => {
@@ -212,6 +222,35 @@ const App = () => {
         </motion.div>
       </div>
 
+      {data.feature_importance && (
+        <motion.div
+          className="card chart-box"
+          initial={{ opacity: 0, y: 20 }}
+          animate={{ opacity: 1, y: 0 }}
+          transition={{ delay: 0.65 }}
+        >
+          <h3>Feature Importance (Random Forest)</h3>
+          <div style={{ flex: 1, position: 'relative' }}>
+            <Bar
+              data={{
+                labels: data.feature_importance.map(f => f.feature),
+                datasets: [{ label: 'Importance', data: data.feature_importance.map(f => f.importance), backgroundColor: '#6366f1' }]
+              }}
+              options={{
+                ...chartOptions,
+                indexAxis: 'y' as const,
+                scales: {
+                  x: { grid: { color: '#334155' }, ticks: { color: '#94a3b8' }, beginAtZero: true },
+                  y: { grid: { display: false as const }, ticks: { color: '#94a3b8' } }
+                }
+              }}
+            />
+          </div>
+        </motion.div>
+      )}
+
+      <RunHistory />
+
       <motion.footer 
         className="metadata-footer"
         initial={{ opacity: 0 }}
@@ -252,4 +291,70 @@ const MetricCard: React.FC<MetricCardProps> = ({ icon, label, value, delay }) =>
   </motion.div>
 )
 
+// Trend of past runs from shared-data/run_api.py. Polls with `since` + ETag,
+// so an unchanged store costs one empty 304 response per interval.
+const RunHistory = () => {
+  const [runs, setRuns] = useState<RunSummary[]>([])
+  const lastRunId = useRef(0)
+  const etag = useRef<string | null>(null)
+
+  useEffect(() => {
+    let cancelled = false
+    const poll = (): Promise<void> =>
+      fetch(`/api/runs?pipeline=gemini&since=${lastRunId.current}`, {
+        headers: etag.current ? { 'If-None-Match': etag.current } : {}
+      })
+        .then(res => (res.status === 200 ? res.json().then(json => ({ json, tag: res.headers.get('ETag') })) : null))
+        .then(update => {
+          if (!update || cancelled) return
+          etag.current = update.tag
+          lastRunId.current = update.json.last_run_id
+          if (update.json.runs.length > 0) setRuns(prev => [...prev, ...update.json.runs])
+          // Pages of at most `limit` runs: fetch the next one right away
+          if (update.json.has_more) return poll()
+        })
+        .catch(() => {})
+    poll()
+    const timer = setInterval(poll, 15000)
+    return () => {
+      cancelled = true
+      clearInterval(timer)
+    }
+  }, [])
+
+  // No API running (static build) or no runs yet: nothing to show
+  if (runs.length === 0) return null
+
+  const lineData = {
+    labels: runs.map(r => `#${r.run_id}`),
+    datasets: [
+      { label: 'Macro F1', data: runs.map(r => r.macro_f1), borderColor: '#6366f1', backgroundColor: '#6366f1' },
+      { label: 'Balanced Accuracy', data: runs.map(r => r.balanced_accuracy), borderColor: '#10b981', backgroundColor: '#10b981' }
+    ]
+  }
+  const lineOptions = {
+    responsive: true,
+    maintainAspectRatio: false,
+    plugins: { legend: { position: 'bottom' as const, labels: { color: '#94a3b8' } } },
+    scales: {
+      y: { grid: { color: '#334155' }, ticks: { color: '#94a3b8' } },
+      x: { grid: { display: false as const }, ticks: { color: '#94a3b8' } }
+    }
+  }
+
+  return (
+    <motion.div
+      className="card chart-box"
+      initial={{ opacity: 0, y: 20 }}
+      animate={{ opacity: 1, y: 0 }}
+      transition={{ delay: 0.7 }}
+    >
+      <h3><TrendingUp size={18} /> Run History ({runs.length} runs)</h3>
+      <div style={{ flex: 1, position: 'relative' }}>
+        <Line data={lineData} options={lineOptions} />
+      </div>
+    </motion.div>
+  )
+}
+
 export default App
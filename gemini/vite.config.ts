@@ -4,4 +4,8 @@ import react from '@vitejs/plugin-react'
 // https://vite.dev/config/
 export default defineConfig({
   plugins: [react()],
+  server: {
+    // Run history API (shared-data/run_api.py)
+    proxy: { '/api': 'http://127.0.0.1:8002' },
+  },
 })
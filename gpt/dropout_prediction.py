@@ -1,9 +1,11 @@
 import json
+import sys
+import time
 import pandas as pd
 from pathlib import Path
 from sklearn.model_selection import train_test_split
 from sklearn.compose import ColumnTransformer
-from sklearn.preprocessing import OneHotEncoder, StandardScaler
+from sklearn.preprocessing import StandardScaler
 from sklearn.pipeline import Pipeline
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import (
@@ -19,92 +21,125 @@ PROJECT_ROOT = Path(__file__).resolve().parents[1]
 DATA_PATH = PROJECT_ROOT / "shared-data" / "data.csv"
 RESULT_PATH = Path(__file__).resolve().parent / "result.json"
 
-# Load dataset
-df = pd.read_csv(DATA_PATH)
+# Shared typed loader (handles the ';' separator and compact dtypes)
+sys.path.insert(0, str(DATA_PATH.parent))
+from data_loader import load_data, content_hash  # noqa: E402
+from categorical_encoding import CategoricalEncoder, NOMINAL_COLUMNS  # noqa: E402
+from run_store import RunStore  # noqa: E402
 
-# Assume the target column is named 'target' or the last column if not specified
-if "target" in df.columns:
-    y = df["target"]
-    X = df.drop(columns=["target"])
-else:
-    y = df.iloc[:, -1]
-    X = df.iloc[:, :-1]
 
-# Train‑test split (80/20, stratified, seed 42)
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y, test_size=0.2, random_state=42, stratify=y
-)
-
-# Identify categorical and numeric columns
-categorical_cols = X.select_dtypes(include=["object", "category"]).columns.tolist()
-numeric_cols = X.select_dtypes(include=["int64", "float64"]).columns.tolist()
-
-# Pre‑processing pipelines
-preprocess = ColumnTransformer(
-    transformers=[
-        ("num", StandardScaler(), numeric_cols),
-        ("cat", OneHotEncoder(handle_unknown="ignore"), categorical_cols),
+def build_pipeline(X):
+    """Pre-processing + model pipeline for the feature frame X."""
+    # Identify categorical (nominal code) and numeric columns
+    categorical_cols = [col for col in NOMINAL_COLUMNS if col in X.columns]
+    numeric_cols = [
+        col for col in X.select_dtypes(include="number").columns if col not in categorical_cols
     ]
-)
 
-# Model – Random Forest (default hyper‑parameters, can be tuned later)
-model = RandomForestClassifier(random_state=42)
+    # Pre‑processing pipelines: the forest splits on compact integer codes of the
+    # categorical columns directly (no one‑hot expansion)
+    preprocess = ColumnTransformer(
+        transformers=[
+            ("num", StandardScaler(), numeric_cols),
+            ("cat", CategoricalEncoder(), categorical_cols),
+        ]
+    )
+
+    # Model – Random Forest (default hyper‑parameters, can be tuned later)
+    model = RandomForestClassifier(random_state=42)
+
+    # Full pipeline
+    pipeline = Pipeline(steps=[("preprocess", preprocess), ("model", model)])
+    return pipeline
+
+
+def main():
+    # Load dataset
+    df = load_data(DATA_PATH)
+
+    # Assume the target column is named 'target' or the last column if not specified
+    if "target" in df.columns:
+        y = df["target"]
+        X = df.drop(columns=["target"])
+    else:
+        y = df.iloc[:, -1]
+        X = df.iloc[:, :-1]
+
+    # Train‑test split (80/20, stratified, seed 42)
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.2, random_state=42, stratify=y
+    )
+
+    pipeline = build_pipeline(X_train)
+
+    # Train
+    start = time.perf_counter()
+    pipeline.fit(X_train, y_train)
+    training_time = time.perf_counter() - start
+
+    # Predict
+    y_pred = pipeline.predict(X_test)
+
+    # Evaluation metrics
+    macro_f1 = f1_score(y_test, y_pred, average="macro")
+    weighted_f1 = f1_score(y_test, y_pred, average="weighted")
+    bal_acc = balanced_accuracy_score(y_test, y_pred)
+    acc = accuracy_score(y_test, y_pred)
+
+    # Confusion matrix (as list of lists for JSON serialisation)
+    conf_mat = confusion_matrix(y_test, y_pred).tolist()
+
+    # Per‑class metrics (precision, recall, f1, support)
+    report = classification_report(y_test, y_pred, output_dict=True)
+    per_class_metrics = {
+        cls: {
+            "precision": vals["precision"],
+            "recall": vals["recall"],
+            "f1_score": vals["f1-score"],
+            "support": int(vals["support"]),
+        }
+        for cls, vals in report.items()
+        if cls not in ["accuracy", "macro avg", "weighted avg"]
+    }
 
-# Full pipeline
-pipeline = Pipeline(steps=[("preprocess", preprocess), ("model", model)])
+    # Pipeline documentation (place‑holders – can be filled manually later)
+    pipeline_documentation = {
+        "initial_assumptions": "[Welche Annahmen hattest du zu Beginn?]",
+        "preprocessing": "[Beschreibe deine Encoding‑Strategie]",
+        "feature_engineering": "[Welche Features hast du erstellt?]",
+        "model": "RandomForestClassifier (default parameters)",
+        "hyperparameters": "[Wichtigste Parameter]",
+        "rejected_alternatives": "[Welche Ansätze hast du bewusst nicht gewählt?]",
+        "training_time_seconds": "[XX.X]",
+    }
+
+    # Assemble final result
+    result = {
+        "macro_f1": macro_f1,
+        "weighted_f1": weighted_f1,
+        "balanced_accuracy": bal_acc,
+        "accuracy": acc,
+        "confusion_matrix": conf_mat,
+        "per_class_metrics": per_class_metrics,
+        "pipeline_documentation": pipeline_documentation,
+    }
 
-# Train
-pipeline.fit(X_train, y_train)
+    # Write JSON output
+    with open(RESULT_PATH, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=4)
 
-# Predict
-y_pred = pipeline.predict(X_test)
+    print(f"Result written to {RESULT_PATH}")
 
-# Evaluation metrics
-macro_f1 = f1_score(y_test, y_pred, average="macro")
-weighted_f1 = f1_score(y_test, y_pred, average="weighted")
-bal_acc = balanced_accuracy_score(y_test, y_pred)
-acc = accuracy_score(y_test, y_pred)
+    # Record the run in the shared run store (history + model comparison)
+    RunStore().add_run(
+        "gpt",
+        "random_forest",
+        {"macro_f1": macro_f1, "weighted_f1": weighted_f1, "balanced_accuracy": bal_acc, "accuracy": acc},
+        training_time=training_time,
+        data_hash=content_hash(DATA_PATH)[:16],
+        result=result,
+    )
 
-# Confusion matrix (as list of lists for JSON serialisation)
-conf_mat = confusion_matrix(y_test, y_pred).tolist()
 
-# Per‑class metrics (precision, recall, f1, support)
-report = classification_report(y_test, y_pred, output_dict=True)
-per_class_metrics = {
-    cls: {
-        "precision": vals["precision"],
-        "recall": vals["recall"],
-        "f1_score": vals["f1-score"],
-        "support": int(vals["support"]),
-    }
-    for cls, vals in report.items()
-    if cls not in ["accuracy", "macro avg", "weighted avg"]
-}
-
-# Pipeline documentation (place‑holders – can be filled manually later)
-pipeline_documentation = {
-    "initial_assumptions": "[Welche Annahmen hattest du zu Beginn?]",
-    "preprocessing": "[Beschreibe deine Encoding‑Strategie]",
-    "feature_engineering": "[Welche Features hast du erstellt?]",
-    "model": "RandomForestClassifier (default parameters)",
-    "hyperparameters": "[Wichtigste Parameter]",
-    "rejected_alternatives": "[Welche Ansätze hast du bewusst nicht gewählt?]",
-    "training_time_seconds": "[XX.X]",
-}
-
-# Assemble final result
-result = {
-    "macro_f1": macro_f1,
-    "weighted_f1": weighted_f1,
-    "balanced_accuracy": bal_acc,
-    "accuracy": acc,
-    "confusion_matrix": conf_mat,
-    "per_class_metrics": per_class_metrics,
-    "pipeline_documentation": pipeline_documentation,
-}
-
-# Write JSON output
-with open(RESULT_PATH, "w", encoding="utf-8") as f:
-    json.dump(result, f, indent=4)
-
-print(f"Result written to {RESULT_PATH}")
+if __name__ == "__main__":
+    main()
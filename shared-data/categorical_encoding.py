@@ -0,0 +1,223 @@
+"""
+Categorical Encoding
+====================
+
+Encoding stage for the nominal code columns of the dataset (Course,
+Application mode, occupations, ...). Their values are identifiers such as
+Course 9991, so treating them as continuous (StandardScaler) gives a linear
+model a meaningless order, and a dense one-hot matrix costs
+n_rows x n_categories floats.
+
+CategoricalEncoder maps every column to contiguous integer codes with a
+per-column dictionary (sorted known values -> 0..k-1, anything unseen -> k):
+
+    transform(X)       compact codes (uint8, or uint16 for > 255 categories);
+                       tree models consume these directly
+    one_hot(X)         scipy CSR one-hot for linear models, built straight from
+                       the codes (exactly one stored value per row and column,
+                       no dense intermediate)
+    target_encode(X)   smoothed per-class target frequencies per category
+                       (float32, n_classes columns per input column);
+                       target_encode(X, y) encodes the training rows
+                       leave-one-out (their own label left out of the counts)
+
+The encoder can be fitted in one call or chunk by chunk (partial_fit), so
+streamed exports never need all rows at once.
+
+Usage (from a pipeline directory):
+    sys.path.insert(0, str(DATA_PATH.parent))
+    from categorical_encoding import CategoricalEncoder, NOMINAL_COLUMNS
+"""
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.utils.validation import check_is_fitted
+
+# Nominal code columns (binary flags and counts are left as they are)
+NOMINAL_COLUMNS = [
+    'Marital status',
+    'Application mode',
+    'Course',
+    'Previous qualification',
+    'Nacionality',
+    "Mother's qualification",
+    "Father's qualification",
+    "Mother's occupation",
+    "Father's occupation",
+]
+
+# Pseudo-count pulling rare categories towards the overall class frequencies
+DEFAULT_SMOOTHING = 20.0
+
+
+def _columns(X):
+    """Columns of a DataFrame or 2-D array as NumPy arrays."""
+    if hasattr(X, 'columns'):
+        return [X[name].to_numpy() for name in X.columns]
+    X = np.asarray(X)
+    return [X[:, j] for j in range(X.shape[1])]
+
+
+class CategoricalEncoder(BaseEstimator, TransformerMixin):
+    """
+    Dictionary encoding of nominal columns to contiguous integer codes.
+
+    Fitted on a DataFrame or array holding only the categorical columns.
+    With y (class labels of any sortable type) per-category class counts are
+    collected as well, which target_encode needs.
+    """
+
+    def __init__(self, smoothing=DEFAULT_SMOOTHING):
+        self.smoothing = smoothing
+
+    def fit(self, X, y=None):
+        for attr in ('categories_', 'classes_', 'class_counts_', 'n_features_in_',
+                     'feature_names_in_'):
+            if hasattr(self, attr):
+                delattr(self, attr)
+        return self.partial_fit(X, y)
+
+    def partial_fit(self, X, y=None):
+        """Add the values (and class counts) of one chunk to the dictionaries."""
+        columns = _columns(X)
+        if not hasattr(self, 'categories_'):
+            self.n_features_in_ = len(columns)
+            if hasattr(X, 'columns'):
+                self.feature_names_in_ = np.asarray(X.columns, dtype=object)
+            self.categories_ = [np.unique(values) for values in columns]
+            self.class_counts_ = None
+        elif len(columns) != self.n_features_in_:
+            raise ValueError(f"Expected {self.n_features_in_} columns, got {len(columns)}")
+        else:
+            grown = [np.union1d(old, values) for old, values in zip(self.categories_, columns)]
+            if self.class_counts_ is not None:
+                # Keep the counts of known categories at their new positions
+                self.class_counts_ = [
+                    self._reindex(counts, old, new)
+                    for counts, old, new in zip(self.class_counts_, self.categories_, grown)
+                ]
+            self.categories_ = grown
+
+        if y is not None:
+            self._count_classes(columns, np.asarray(y))
+        return self
+
+    @staticmethod
+    def _reindex(counts, old, new):
+        out = np.zeros((len(new) + 1, counts.shape[1]), dtype=counts.dtype)
+        out[np.searchsorted(new, old)] = counts[:-1]
+        return out
+
+    def _count_classes(self, columns, y):
+        if self.class_counts_ is None:
+            self.classes_ = np.unique(y)
+            self.class_counts_ = [np.zeros((len(c) + 1, len(self.classes_)), dtype=np.int64)
+                                  for c in self.categories_]
+        else:
+            classes = np.union1d(self.classes_, y)
+            if len(classes) > len(self.classes_):
+                position = np.searchsorted(classes, self.classes_)
+                for j, counts in enumerate(self.class_counts_):
+                    self.class_counts_[j] = np.zeros((len(counts), len(classes)), dtype=np.int64)
+                    self.class_counts_[j][:, position] = counts
+                self.classes_ = classes
+        n_classes = len(self.classes_)
+        y_index = np.searchsorted(self.classes_, y)
+        for j, values in enumerate(columns):
+            codes = self._codes(values, self.categories_[j])
+            counts = self.class_counts_[j]
+            counts += np.bincount(codes * n_classes + y_index,
+                                  minlength=counts.size).reshape(counts.shape)
+
+    @staticmethod
+    def _codes(values, categories):
+        """Position in `categories`; len(categories) for unseen values."""
+        index = np.searchsorted(categories, values)
+        clipped = np.minimum(index, len(categories) - 1)
+        return np.where(categories[clipped] == values, clipped, len(categories))
+
+    @property
+    def dtype_(self):
+        """Smallest unsigned dtype holding every code including the unseen code."""
+        check_is_fitted(self, 'categories_')
+        return np.min_scalar_type(max(len(c) for c in self.categories_))
+
+    @property
+    def n_codes_(self):
+        """Codes per column: the known categories plus the unseen code."""
+        check_is_fitted(self, 'categories_')
+        return np.asarray([len(c) + 1 for c in self.categories_])
+
+    def transform(self, X):
+        """Contiguous integer codes, shape (n_samples, n_columns)."""
+        check_is_fitted(self, 'categories_')
+        columns = _columns(X)
+        out = np.empty((len(columns[0]) if columns else 0, len(columns)),
+                       dtype=self.dtype_, order='F')
+        for j, values in enumerate(columns):
+            out[:, j] = self._codes(values, self.categories_[j])
+        return out
+
+    def one_hot(self, X, dtype=np.float32):
+        """
+        One-hot CSR matrix, n_codes_ columns per input column (last: unseen).
+
+        Every row has exactly one stored 1 per input column, so indptr is a
+        plain arange and indices are the codes shifted by the column offsets.
+        """
+        codes = self.transform(X)
+        n_rows, n_columns = codes.shape
+        offsets = np.concatenate([[0], np.cumsum(self.n_codes_)[:-1]])
+        indices = (codes.astype(np.int32) + offsets.astype(np.int32)).ravel()
+        indptr = np.arange(0, n_rows * n_columns + 1, n_columns, dtype=np.int64)
+        data = np.ones(n_rows * n_columns, dtype=dtype)
+        return sp.csr_matrix((data, indices, indptr), shape=(n_rows, int(self.n_codes_.sum())))
+
+    def target_encode(self, X, y=None):
+        """
+        Smoothed class frequencies per category, float32 (n_samples, n_columns * n_classes).
+
+        Columns per input column follow classes_.
+
+        (count(category, class) + smoothing * prior(class)) / (count(category) + smoothing);
+        unseen categories get the prior. Requires fitting with y.
+
+        Pass y for rows whose labels were counted during fitting (the training
+        rows): each row is then encoded leave-one-out, with its own label
+        removed from the counts, so the features do not leak the target.
+        Without y (new rows at predict time) the full counts are used.
+        """
+        check_is_fitted(self, 'categories_')
+        if self.class_counts_ is None:
+            raise ValueError("target_encode needs an encoder fitted with y")
+        codes = self.transform(X)
+        if y is not None:
+            y = np.asarray(y)
+            y_index = np.searchsorted(self.classes_, y)
+            clipped = np.minimum(y_index, len(self.classes_) - 1)
+            if len(y) != len(codes) or not np.array_equal(self.classes_[clipped], y):
+                raise ValueError("y must hold one fitted class label per row")
+            rows = np.arange(len(codes))
+        blocks = []
+        for j, counts in enumerate(self.class_counts_):
+            prior = counts.sum(axis=0) / max(counts.sum(), 1)
+            if y is None:
+                table = ((counts + self.smoothing * prior)
+                         / (counts.sum(axis=1, keepdims=True) + self.smoothing)).astype(np.float32)
+                blocks.append(table[codes[:, j]])
+                continue
+            # Leave-one-out: the row's own label is part of its category's counts
+            row_counts = counts[codes[:, j]].astype(np.float64)
+            row_counts[rows, y_index] -= 1
+            blocks.append(((row_counts + self.smoothing * prior)
+                           / (row_counts.sum(axis=1, keepdims=True) + self.smoothing))
+                          .astype(np.float32))
+        return np.hstack(blocks)
+
+    def get_feature_names_out(self, input_features=None):
+        check_is_fitted(self, 'categories_')
+        if input_features is None:
+            input_features = getattr(self, 'feature_names_in_',
+                                     [f"x{j}" for j in range(self.n_features_in_)])
+        return np.asarray(input_features, dtype=object)
@@ -0,0 +1,281 @@
+"""
+Shared Data Loader
+==================
+
+Typed loader for the "Predict Students' Dropout and Academic Success" CSV,
+shared by the claude, gemini and gpt pipelines.
+
+- Explicit schema for all 37 columns with compact dtypes (int8/int16/float32,
+  categorical Target) instead of per-run dtype inference.
+- Header normalization: UTF-8 BOM and stray whitespace such as the tab in
+  "Daytime/evening attendance\\t" are removed.
+- Validation: values are parsed into wide types and checked against the
+  range of their compact dtype before downcasting; out-of-range values and
+  unknown Target labels raise ValueError instead of wrapping around or
+  turning into NaN.
+- Binary columnar cache: the parsed table is stored as one .npy file per
+  column next to the CSV, keyed on the CSV's content hash. Repeated runs
+  memory-map the cache instead of re-parsing the CSV. The hash is recorded
+  with the file's size and mtime and only recomputed when those change.
+
+Usage (from a pipeline directory):
+    sys.path.insert(0, str(DATA_PATH.parent))
+    from data_loader import load_data
+    df = load_data(DATA_PATH)
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+DATA_DIR = Path(__file__).parent
+DEFAULT_DATA_PATH = DATA_DIR / "data.csv"
+CACHE_DIRNAME = ".cache"
+CSV_SEPARATOR = ';'
+
+# Bump when the schema or the cache layout changes (invalidates old caches)
+CACHE_VERSION = 1
+
+TARGET_COLUMN = 'Target'
+TARGET_CLASSES = ['Dropout', 'Enrolled', 'Graduate']
+
+# Column -> dtype, in file order (normalized header names)
+SCHEMA = {
+    'Marital status': 'int8',
+    'Application mode': 'int8',
+    'Application order': 'int8',
+    'Course': 'int16',
+    'Daytime/evening attendance': 'int8',
+    'Previous qualification': 'int8',
+    'Previous qualification (grade)': 'float32',
+    'Nacionality': 'int16',
+    "Mother's qualification": 'int8',
+    "Father's qualification": 'int8',
+    "Mother's occupation": 'int16',
+    "Father's occupation": 'int16',
+    'Admission grade': 'float32',
+    'Displaced': 'int8',
+    'Educational special needs': 'int8',
+    'Debtor': 'int8',
+    'Tuition fees up to date': 'int8',
+    'Gender': 'int8',
+    'Scholarship holder': 'int8',
+    'Age at enrollment': 'int8',
+    'International': 'int8',
+    'Curricular units 1st sem (credited)': 'int8',
+    'Curricular units 1st sem (enrolled)': 'int8',
+    'Curricular units 1st sem (evaluations)': 'int8',
+    'Curricular units 1st sem (approved)': 'int8',
+    'Curricular units 1st sem (grade)': 'float32',
+    'Curricular units 1st sem (without evaluations)': 'int8',
+    'Curricular units 2nd sem (credited)': 'int8',
+    'Curricular units 2nd sem (enrolled)': 'int8',
+    'Curricular units 2nd sem (evaluations)': 'int8',
+    'Curricular units 2nd sem (approved)': 'int8',
+    'Curricular units 2nd sem (grade)': 'float32',
+    'Curricular units 2nd sem (without evaluations)': 'int8',
+    'Unemployment rate': 'float32',
+    'Inflation rate': 'float32',
+    'GDP': 'float32',
+    TARGET_COLUMN: pd.CategoricalDtype(TARGET_CLASSES),
+}
+
+FEATURE_COLUMNS = [col for col in SCHEMA if col != TARGET_COLUMN]
+
+
+def normalize_column(name):
+    """Strip the UTF-8 BOM and surrounding whitespace (tabs) from a header."""
+    return name.replace('\ufeff', '').strip()
+
+
+def normalize_columns(df):
+    """Normalize all header names of a DataFrame in place and return it."""
+    df.columns = [normalize_column(col) for col in df.columns]
+    return df
+
+
+def _read_header(path):
+    """Raw and normalized header names of a CSV file."""
+    raw = pd.read_csv(path, sep=CSV_SEPARATOR, nrows=0, encoding='utf-8-sig').columns
+    return {col: normalize_column(col) for col in raw}
+
+
+def _parse_dtype(dtype):
+    """Wide dtype a schema column is parsed into before its range check."""
+    if isinstance(dtype, pd.CategoricalDtype):
+        return 'object'
+    return 'int64' if np.dtype(dtype).kind == 'i' else 'float64'
+
+
+def _csv_dtypes(path):
+    """Parse dtype mapping keyed on the raw header names of `path`."""
+    return {raw: _parse_dtype(SCHEMA[name])
+            for raw, name in _read_header(path).items() if name in SCHEMA}
+
+
+def apply_schema(df):
+    """
+    Downcast the schema columns of a wide-typed frame in place and return it.
+
+    Raises ValueError for integers outside the range of their column's dtype
+    and for Target labels outside TARGET_CLASSES (missing labels stay NaN).
+    """
+    for col in df.columns:
+        dtype = SCHEMA.get(col)
+        if dtype is None:
+            continue
+        if isinstance(dtype, pd.CategoricalDtype):
+            labels = df[col].dropna().astype(str)
+            unknown = sorted(set(labels.unique()) - set(dtype.categories))
+            if unknown:
+                raise ValueError(f"Unknown {col} labels {unknown}, expected {list(dtype.categories)}")
+            df[col] = df[col].astype(dtype)
+            continue
+        if np.dtype(dtype).kind == 'i':
+            info = np.iinfo(dtype)
+            values = df[col].to_numpy()
+            bad = (values < info.min) | (values > info.max)
+            if bad.any():
+                raise ValueError(f"Column {col!r}: value {values[bad][0]} in row "
+                                 f"{df.index[bad][0]} is outside the {dtype} range "
+                                 f"[{info.min}, {info.max}]")
+        df[col] = df[col].astype(dtype)
+    return df
+
+
+def read_csv(path=DEFAULT_DATA_PATH, **kwargs):
+    """Parse the CSV with the explicit schema (no cache)."""
+    df = pd.read_csv(path, sep=CSV_SEPARATOR, encoding='utf-8-sig',
+                     dtype=_csv_dtypes(path), **kwargs)
+    return apply_schema(normalize_columns(df))
+
+
+def iter_csv_chunks(path, chunksize):
+    """Stream the CSV in typed, header-normalized chunks of `chunksize` rows."""
+    reader = pd.read_csv(path, sep=CSV_SEPARATOR, encoding='utf-8-sig',
+                         dtype=_csv_dtypes(path), chunksize=chunksize)
+    for chunk in reader:
+        yield apply_schema(normalize_columns(chunk))
+
+
+def file_hash(path, block_size=1 << 20):
+    """SHA-256 of the file contents (streamed, constant memory)."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def content_hash(path):
+    """
+    file_hash of `path`, recorded next to the cache with the file's size and
+    mtime; the file is only hashed again when size or mtime change.
+    """
+    path = Path(path)
+    stat = path.stat()
+    record_path = path.parent / CACHE_DIRNAME / f"{path.name}.hash.json"
+    try:
+        record = json.loads(record_path.read_text(encoding='utf-8'))
+        if record["size"] == stat.st_size and record["mtime_ns"] == stat.st_mtime_ns:
+            return record["sha256"]
+    except (OSError, ValueError, KeyError):
+        pass
+
+    sha256 = file_hash(path)
+    record = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": sha256}
+    try:
+        record_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=record_path.parent, prefix=".tmp-")
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(record, f)
+        os.replace(tmp_path, record_path)
+    except OSError:
+        # Read-only data directory: hash on every call
+        pass
+    return sha256
+
+
+def cache_dir_for(path):
+    """Cache directory for `path`, keyed on content hash and cache version."""
+    path = Path(path)
+    key = f"{path.stem}-v{CACHE_VERSION}-{content_hash(path)[:16]}"
+    return path.parent / CACHE_DIRNAME / key
+
+
+def _write_cache(df, cache_dir):
+    """Write one .npy per column plus a meta.json, atomically via rename."""
+    cache_dir.parent.mkdir(parents=True, exist_ok=True)
+    tmp_dir = Path(tempfile.mkdtemp(dir=cache_dir.parent, prefix=".tmp-"))
+    try:
+        meta = {"n_rows": len(df), "columns": []}
+        for i, col in enumerate(df.columns):
+            series = df[col]
+            entry = {"name": col, "file": f"{i:03d}.npy"}
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                entry["categories"] = [str(c) for c in series.cat.categories]
+                values = series.cat.codes.to_numpy()
+            else:
+                values = series.to_numpy()
+            np.save(tmp_dir / entry["file"], values)
+            meta["columns"].append(entry)
+
+        with open(tmp_dir / "meta.json", 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+        os.replace(tmp_dir, cache_dir)
+    except OSError:
+        # Another process may have published the same cache concurrently
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        if not (cache_dir / "meta.json").exists():
+            raise
+
+
+def _read_cache(cache_dir, mmap=True):
+    """Rebuild the DataFrame from the .npy columns without copying them."""
+    with open(cache_dir / "meta.json", encoding='utf-8') as f:
+        meta = json.load(f)
+
+    mmap_mode = 'r' if mmap else None
+    columns = {}
+    for entry in meta["columns"]:
+        values = np.load(cache_dir / entry["file"], mmap_mode=mmap_mode)
+        if "categories" in entry:
+            values = pd.Categorical.from_codes(values, categories=entry["categories"])
+        columns[entry["name"]] = values
+
+    return pd.DataFrame(columns, copy=False)
+
+
+def load_data(path=DEFAULT_DATA_PATH, use_cache=True, mmap=True):
+    """
+    Load the dataset with the explicit schema.
+
+    With use_cache=True the first call parses the CSV and writes the columnar
+    cache; later calls (same file contents) memory-map the cached columns.
+    Memory-mapped columns are read-only; copy a column before modifying it.
+    """
+    path = Path(path)
+    if not use_cache:
+        return read_csv(path)
+
+    cache_dir = cache_dir_for(path)
+    if not (cache_dir / "meta.json").exists():
+        _write_cache(read_csv(path), cache_dir)
+
+    return _read_cache(cache_dir, mmap=mmap)
+
+
+def clear_cache(path=DEFAULT_DATA_PATH):
+    """Remove all cached versions of `path`."""
+    path = Path(path)
+    cache_root = path.parent / CACHE_DIRNAME
+    for entry in cache_root.glob(f"{path.stem}-v*"):
+        shutil.rmtree(entry, ignore_errors=True)
+    (cache_root / f"{path.name}.hash.json").unlink(missing_ok=True)
@@ -0,0 +1,145 @@
+"""
+Result publisher shared by the pipelines.
+
+A pipeline registers every file its dashboards read (result.json copies)
+as a sink. publish() serializes the result once and writes the same bytes
+to all sinks concurrently. Every write goes to a temp file in the sink's
+directory, which is then renamed over the target (os.replace). A dashboard
+fetching result.json therefore sees either the old or the new file, never
+a half-written one.
+
+Each publish can also append one compact JSON line to run_history.jsonl
+next to every sink:
+
+    {"version": 7, "timestamp": "...", "sha256": "...", <summary fields>}
+
+The history is append-only. A dashboard can fetch it incrementally with an
+HTTP Range request starting at the byte length it already has, and skip a
+trailing line without a newline, which is still being written.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+HISTORY_FILENAME = 'run_history.jsonl'
+
+
+def write_atomic(path, data):
+    """Write bytes to path via temp file + rename in the same directory."""
+    path = Path(path)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f'.{path.name}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp creates 0600 files; dashboards' static servers may run as another user
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+
+
+def _last_version(history_path):
+    """Version of the last complete record in a history file (0 if none)."""
+    try:
+        with open(history_path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            f.seek(max(0, size - 64 * 1024))
+            lines = f.read().splitlines()
+    except FileNotFoundError:
+        return 0
+    for line in reversed(lines):
+        try:
+            return int(json.loads(line)['version'])
+        except (ValueError, KeyError, TypeError):
+            continue
+    return 0
+
+
+def append_history(history_path, record):
+    """Append one JSON line with a single write on an O_APPEND descriptor."""
+    record = {'version': _last_version(history_path) + 1, **record}
+    line = (json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8')
+    fd = os.open(history_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+    try:
+        os.write(fd, line)
+    finally:
+        os.close(fd)
+    return record
+
+
+class ResultPublisher:
+    """
+    Serialize a result dict once and publish it atomically to all sinks.
+
+    sinks:   result.json paths; sinks whose directory does not exist are skipped
+    summary: callable(results) -> small dict stored per run in run_history.jsonl
+    """
+
+    def __init__(self, sinks, summary=None, indent=2, ensure_ascii=False, max_workers=4):
+        self.sinks = [Path(p) for p in sinks]
+        self.summary = summary
+        self.indent = indent
+        self.ensure_ascii = ensure_ascii
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix='result-publisher')
+        # Waits for the sink writes of publish_async; separate so it never blocks a writer slot
+        self._coordinator = ThreadPoolExecutor(max_workers=1,
+                                               thread_name_prefix='result-publisher-async')
+
+    def register(self, path):
+        self.sinks.append(Path(path))
+
+    def _publish_one(self, path, data, record):
+        if not path.parent.exists():
+            return path, 'skipped', None
+        try:
+            write_atomic(path, data)
+            if record is not None:
+                append_history(path.parent / HISTORY_FILENAME, record)
+            return path, 'saved', None
+        except OSError as e:
+            return path, 'error', e
+
+    def _prepare(self, results, record_history):
+        data = json.dumps(results, indent=self.indent, ensure_ascii=self.ensure_ascii).encode('utf-8')
+        record = None
+        if record_history:
+            record = {
+                'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                'sha256': hashlib.sha256(data).hexdigest()[:16],
+                **(self.summary(results) if self.summary else {}),
+            }
+        return data, record
+
+    def _write_all(self, data, record):
+        futures = [self._executor.submit(self._publish_one, path, data, record)
+                   for path in self.sinks]
+        return [future.result() for future in futures]
+
+    def publish(self, results, record_history=False):
+        """
+        Write results to all sinks concurrently and wait.
+
+        Returns a list of (path, status, error) with status 'saved',
+        'skipped' (directory missing) or 'error'.
+        """
+        return self._write_all(*self._prepare(results, record_history))
+
+    def publish_async(self, results, record_history=False):
+        """Like publish(), but returns a Future so the caller can continue meanwhile."""
+        # Serialized now, so later changes to results do not leak into this publish
+        data, record = self._prepare(results, record_history)
+        return self._coordinator.submit(self._write_all, data, record)
+
+    def close(self):
+        self._coordinator.shutdown(wait=True)
+        self._executor.shutdown(wait=True)
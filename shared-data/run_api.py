@@ -0,0 +1,154 @@
+"""
+Run history API
+===============
+
+Tiny local HTTP endpoint over the SQLite run store (run_store.py), polled
+by the dashboards.
+
+Endpoints:
+    GET /api/runs?since=<run_id>&pipeline=&model=&data_hash=&limit=
+        -> {"runs": [...summaries, oldest first...], "last_run_id": N, "has_more": bool}
+        At most `limit` runs per page; last_run_id is the run_id of the
+        page's last run (the next `since`) and has_more tells whether newer
+        matching runs follow.
+    GET /api/runs/<run_id>   -> full result.json of one run
+    GET /api/models?data_hash=
+        -> per pipeline/model: run count, best/mean/latest macro F1
+
+Cheap polling:
+- A client passes the last run_id it has as `since`, so only new runs are
+  transferred.
+- Run listings carry the ETag W/"<last matching run_id>-<since>-<limit>".
+  Runs are append-only, so an unchanged ETag means an unchanged answer
+  (the same page of the same runs). A request
+  with a matching If-None-Match gets 304 Not Modified without touching the
+  run rows; only an indexed MAX(run_id) lookup is done.
+- Single runs never change. They get a strong ETag and an immutable
+  Cache-Control header.
+
+Usage:
+    python shared-data/run_api.py --port 8002
+The Vite dev servers of both dashboards proxy /api to this port.
+"""
+
+import argparse
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from run_store import RunStore, DEFAULT_DB_PATH
+
+DEFAULT_PORT = 8002
+MAX_LIMIT = 5000
+
+
+def make_handler(store):
+    """Request handler class bound to a RunStore."""
+
+    class RunApiHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, payload=None, etag=None, cache_control='no-cache'):
+            body = json.dumps(payload, separators=(',', ':')).encode('utf-8') if payload is not None else b''
+            self.send_response(status)
+            if body:
+                self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.send_header('Access-Control-Expose-Headers', 'ETag')
+            self.send_header('Cache-Control', cache_control)
+            if etag:
+                self.send_header('ETag', etag)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _not_modified(self, etag):
+            return etag in [t.strip() for t in self.headers.get('If-None-Match', '').split(',')]
+
+        def do_OPTIONS(self):
+            self.send_response(204)
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.send_header('Access-Control-Allow-Methods', 'GET, OPTIONS')
+            self.send_header('Access-Control-Allow-Headers', 'If-None-Match')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            parts = url.path.rstrip('/').split('/')
+            try:
+                if parts[1:] == ['api', 'runs']:
+                    self._runs(query)
+                elif parts[1:3] == ['api', 'runs'] and len(parts) == 4:
+                    self._run(int(parts[3]))
+                elif parts[1:] == ['api', 'models']:
+                    self._models(query)
+                else:
+                    self._send(404, {'error': 'not found'})
+            except ValueError as e:
+                self._send(400, {'error': str(e)})
+
+        def _runs(self, query):
+            filters = {key: query.get(key) for key in ('pipeline', 'model', 'data_hash')}
+            since = int(query.get('since', 0))
+            limit = min(int(query.get('limit', 1000)), MAX_LIMIT)
+            newest = store.last_run_id(**filters)
+            # Append-only store: (filters, newest matching run, page) identify the answer
+            etag = f'W/"{newest}-{since}-{limit}"'
+            if self._not_modified(etag):
+                self._send(304, etag=etag)
+                return
+            runs = store.runs(since=since, limit=limit, **filters)
+            last_run_id = runs[-1]['run_id'] if runs else max(since, newest)
+            self._send(200, {'runs': runs, 'last_run_id': last_run_id,
+                             'has_more': last_run_id < newest}, etag=etag)
+
+        def _run(self, run_id):
+            etag = f'"run-{run_id}"'
+            if self._not_modified(etag):
+                self._send(304, etag=etag, cache_control='max-age=31536000, immutable')
+                return
+            result = store.get_result(run_id)
+            if result is None:
+                self._send(404, {'error': f'unknown run {run_id}'})
+                return
+            self._send(200, result, etag=etag, cache_control='max-age=31536000, immutable')
+
+        def _models(self, query):
+            data_hash = query.get('data_hash')
+            etag = f'W/"models-{store.last_run_id(data_hash=data_hash)}"'
+            if self._not_modified(etag):
+                self._send(304, etag=etag)
+                return
+            self._send(200, {'models': store.compare_models(data_hash=data_hash)}, etag=etag)
+
+    return RunApiHandler
+
+
+class RunApiServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+def serve(port=DEFAULT_PORT, db_path=DEFAULT_DB_PATH):
+    store = RunStore(db_path)
+    server = RunApiServer(('127.0.0.1', port), make_handler(store))
+    print(f"Serving run history from {db_path} on http://127.0.0.1:{port}/api/runs")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run history API for the dashboards')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--db', default=DEFAULT_DB_PATH)
+    args = parser.parse_args()
+    serve(args.port, args.db)
@@ -0,0 +1,168 @@
+"""
+SQLite run store shared by the pipelines.
+
+Every training run is stored as one row in shared-data/runs.sqlite. The
+headline metrics are real columns, so comparisons across many runs are
+plain indexed SQL; the full result.json is kept as a JSON text column and
+is only read for a single run.
+
+    runs(run_id, timestamp, pipeline, model, data_hash,
+         macro_f1, weighted_f1, balanced_accuracy, accuracy,
+         training_time, summary, result)
+
+Indexes: timestamp, (pipeline, model, run_id) and (data_hash, run_id).
+run_id is monotonically increasing, so "runs newer than X" is a range scan
+on the primary key. The database uses WAL mode, so the HTTP endpoint
+(run_api.py) can read while a pipeline writes.
+"""
+
+import json
+import sqlite3
+from datetime import datetime, timezone
+from pathlib import Path
+
+DEFAULT_DB_PATH = Path(__file__).resolve().parent / 'runs.sqlite'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id            INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp         TEXT NOT NULL,
+    pipeline          TEXT NOT NULL,
+    model             TEXT NOT NULL,
+    data_hash         TEXT,
+    macro_f1          REAL,
+    weighted_f1       REAL,
+    balanced_accuracy REAL,
+    accuracy          REAL,
+    training_time     REAL,
+    summary           TEXT NOT NULL DEFAULT '{}',
+    result            TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_runs_timestamp ON runs (timestamp);
+CREATE INDEX IF NOT EXISTS idx_runs_model ON runs (pipeline, model, run_id);
+CREATE INDEX IF NOT EXISTS idx_runs_data ON runs (data_hash, run_id);
+"""
+
+METRIC_COLUMNS = ('macro_f1', 'weighted_f1', 'balanced_accuracy', 'accuracy')
+SUMMARY_COLUMNS = ('run_id', 'timestamp', 'pipeline', 'model', 'data_hash') + METRIC_COLUMNS + (
+    'training_time', 'summary')
+
+
+def _filters(pipeline=None, model=None, data_hash=None):
+    clauses, params = [], []
+    for column, value in (('pipeline', pipeline), ('model', model), ('data_hash', data_hash)):
+        if value is not None:
+            clauses.append(f'{column} = ?')
+            params.append(value)
+    return clauses, params
+
+
+class RunStore:
+    """File-backed store of training runs (one connection per operation, thread-safe)."""
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = Path(path)
+        conn = self._connect()
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+        finally:
+            conn.close()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def add_run(self, pipeline, model, metrics, training_time=None, data_hash=None,
+                result=None, summary=None):
+        """
+        Insert one run and return its run_id.
+
+        metrics: dict with macro_f1, weighted_f1, balanced_accuracy, accuracy
+        summary: small dict of extra fields returned with every run listing
+        result:  the full result dict (returned only by get_result)
+        """
+        row = {
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'pipeline': pipeline,
+            'model': model,
+            'data_hash': data_hash,
+            **{column: metrics.get(column) for column in METRIC_COLUMNS},
+            'training_time': training_time,
+            'summary': json.dumps(summary or {}, separators=(',', ':')),
+            'result': json.dumps(result, separators=(',', ':')) if result is not None else None,
+        }
+        columns = ', '.join(row)
+        placeholders = ', '.join('?' for _ in row)
+        conn = self._connect()
+        try:
+            with conn:
+                cursor = conn.execute(f'INSERT INTO runs ({columns}) VALUES ({placeholders})',
+                                      tuple(row.values()))
+            return cursor.lastrowid
+        finally:
+            conn.close()
+
+    def last_run_id(self, pipeline=None, model=None, data_hash=None):
+        """Highest run_id matching the filters (0 if none); an index lookup."""
+        clauses, params = _filters(pipeline, model, data_hash)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        conn = self._connect()
+        try:
+            return conn.execute(f'SELECT COALESCE(MAX(run_id), 0) FROM runs {where}',
+                                params).fetchone()[0]
+        finally:
+            conn.close()
+
+    def runs(self, since=0, pipeline=None, model=None, data_hash=None, limit=1000):
+        """Summaries of runs with run_id > since, oldest first."""
+        clauses, params = _filters(pipeline, model, data_hash)
+        clauses.insert(0, 'run_id > ?')
+        params.insert(0, since)
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM runs "
+                f"WHERE {' AND '.join(clauses)} ORDER BY run_id LIMIT ?",
+                params + [limit],
+            ).fetchall()
+        finally:
+            conn.close()
+        return [{**dict(row), 'summary': json.loads(row['summary'])} for row in rows]
+
+    def get_result(self, run_id):
+        """Full result dict of one run (None if unknown)."""
+        conn = self._connect()
+        try:
+            row = conn.execute('SELECT result FROM runs WHERE run_id = ?', (run_id,)).fetchone()
+        finally:
+            conn.close()
+        if row is None or row['result'] is None:
+            return None
+        return json.loads(row['result'])
+
+    def compare_models(self, data_hash=None):
+        """Per (pipeline, model): run count, best/mean/latest macro F1 and mean training time."""
+        clauses, params = _filters(data_hash=data_hash)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                f"""
+                SELECT g.*, latest.macro_f1 AS last_macro_f1
+                FROM (
+                    SELECT pipeline, model, COUNT(*) AS runs,
+                           MAX(macro_f1) AS best_macro_f1, AVG(macro_f1) AS mean_macro_f1,
+                           AVG(training_time) AS mean_training_time, MAX(run_id) AS last_run_id
+                    FROM runs {where}
+                    GROUP BY pipeline, model
+                ) AS g
+                JOIN runs AS latest ON latest.run_id = g.last_run_id
+                ORDER BY g.best_macro_f1 DESC
+                """,
+                params,
+            ).fetchall()
+        finally:
+            conn.close()
+        return [dict(row) for row in rows]